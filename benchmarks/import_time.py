@@ -0,0 +1,95 @@
+"""
+Startup-time benchmark for `import qdrant_vector_aggregator`.
+
+Each measurement runs in a fresh interpreter. The dependencies a statement
+legitimately needs (e.g. qdrant-client for `aggregate_embeddings`) are
+imported first and timed separately, so the budget applies to the package's
+own import time and does not depend on how long those libraries take to load.
+The script fails (exit code 1) if a statement loads a heavy dependency eagerly
+or its own time exceeds the budget, so it can guard against import-time
+regressions in CI.
+
+Usage:
+    python benchmarks/import_time.py [--runs 10] [--budget-ms 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statement to time -> (dependencies imported beforehand, modules that must not be loaded)
+CASES = {
+    "import qdrant_vector_aggregator": ("", ["qdrant_client", "scipy", "sklearn", "dotenv"]),
+    "from qdrant_vector_aggregator import calculate_embedding": (
+        "import numpy", ["qdrant_client", "scipy", "sklearn"]
+    ),
+    "from qdrant_vector_aggregator import aggregate_embeddings": (
+        "import numpy, qdrant_client", ["scipy", "sklearn"]
+    ),
+}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{setup}
+setup = time.perf_counter()
+{statement}
+end = time.perf_counter()
+print(json.dumps({{
+    "seconds": end - start, "own_seconds": end - setup,
+    "loaded": [m for m in {forbidden!r} if m in sys.modules]
+}}))
+"""
+
+def measure(statement, setup, forbidden, runs):
+    """
+    Time a statement in `runs` fresh interpreters.
+
+    Returns:
+        tuple: Median total seconds (setup included), median seconds of the
+        statement alone, and the forbidden modules that were loaded
+    """
+    seconds = []
+    own_seconds = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement, setup=setup, forbidden=forbidden)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        seconds.append(result["seconds"])
+        own_seconds.append(result["own_seconds"])
+        loaded.update(result["loaded"])
+    return statistics.median(seconds), statistics.median(own_seconds), sorted(loaded)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per statement (default: 10)")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Maximum median own time of each statement, excluding the "
+                             "dependencies it needs (default: 50)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'total':>8}    {'own':>8}")
+    for statement, (setup, forbidden) in CASES.items():
+        median, own_median, loaded = measure(statement, setup, forbidden, args.runs)
+        print(f"{median * 1000:8.1f} ms {own_median * 1000:8.1f} ms  {statement}")
+        if loaded:
+            print(f"          ✗ eagerly loaded: {', '.join(loaded)}")
+            failed = True
+        if own_median * 1000 > args.budget_ms:
+            baseline = f" on top of `{setup}`" if setup else ""
+            print(f"          ✗ took {own_median * 1000:.1f} ms{baseline} (budget {args.budget_ms:.1f} ms)")
+            failed = True
+
+    print("✗ Import-time check failed" if failed else "✓ Import-time check passed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Stage-by-stage benchmark of the aggregation pipeline on a synthetic collection.
+
+A chunked collection with N points of dimension D is generated in an
+in-memory Qdrant (or on a server given with --url), with group sizes drawn
+uniformly or from a Zipf distribution and a page_content of configurable
+size. The stages of `aggregate_embeddings` are then run and timed one by one:
+
+    scroll      read every page of the input collection
+    grouping    compile the grouping key, intern keys and fill the vector matrix
+    aggregate   one entry per method, in the execution mode "auto" picks for it
+    metadata    collect first payloads, counts and ordered page_content, concatenate
+    points      build the columnar output batch
+    upload      create the output collection and upsert the batch
+
+Each stage reports wall time (fastest of --repeat runs), throughput (input points per second, output
+points for upload) and peak RSS. On Linux the peak is reset before every
+stage, so it is the stage's own high-water mark; elsewhere it is the
+process-wide peak so far.
+
+Results can be written as JSON and compared with a previous run; the
+comparison exits with code 1 if any stage got slower than the tolerance.
+
+Usage:
+    python benchmarks/pipeline.py [--points 20000] [--dim 256] [--groups 500]
+        [--distribution uniform|zipf] [--payload-bytes 1000]
+        [--methods average,median] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Batch, Distance, VectorParams
+from qdrant_vector_aggregator.aggregator import (
+    _MetadataCollector, _VectorBuffer, _aggregate_matrix, _resolve_execution, _scroll_pages
+)
+from qdrant_vector_aggregator.grouping import GroupIndex, compile_grouping
+from qdrant_vector_aggregator.qdrant_collection_helpers import create_qdrant_batch, get_vector_dimension
+from qdrant_vector_aggregator.utils import save_qdrant_collection
+
+DEFAULT_METHODS = "average,median,trimmed_mean,max_pooling,exemplar,pca,approx_median"
+
+
+def make_collection(client, name, n_points, dimension, n_groups, distribution="uniform",
+                    zipf_exponent=1.1, payload_bytes=1000, seed=0, batch_size=1000):
+    """Create a synthetic chunked collection; returns the group size of each group."""
+    rng = np.random.default_rng(seed)
+    if distribution == "zipf":
+        probabilities = 1.0 / np.arange(1, n_groups + 1) ** zipf_exponent
+        group_of = rng.choice(n_groups, size=n_points, p=probabilities / probabilities.sum())
+    else:
+        group_of = rng.integers(n_groups, size=n_points)
+    text = "x" * payload_bytes
+
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(name, vectors_config=VectorParams(size=dimension, distance=Distance.COSINE))
+    chunk_index = np.zeros(n_groups, dtype=np.int64)
+    for start in range(0, n_points, batch_size):
+        stop = min(start + batch_size, n_points)
+        payloads = []
+        for group in group_of[start:stop]:
+            payloads.append({
+                'metadata': {'doc': f'doc{group}', 'chunk_index': int(chunk_index[group])},
+                'page_content': text,
+            })
+            chunk_index[group] += 1
+        vectors = rng.random((stop - start, dimension), dtype=np.float32) + 0.01
+        client.upsert(name, Batch(ids=list(range(start, stop)), vectors=vectors.tolist(), payloads=payloads))
+    return np.bincount(group_of, minlength=n_groups)
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS of this process where the OS allows it (Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageTimer:
+    """
+    Collects wall time, throughput and peak RSS of named stages.
+
+    Each stage runs `repeat` times and the fastest run is kept, which is the
+    most stable statistic for comparing runs.
+    """
+
+    def __init__(self, repeat=3):
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, items, func, *args, **kwargs):
+        _reset_peak_rss()
+        seconds = float('inf')
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            value = func(*args, **kwargs)
+            seconds = min(seconds, time.perf_counter() - start)
+        self.results[name] = {
+            'seconds': seconds,
+            'items_per_second': items / seconds if seconds > 0 else float('inf'),
+            'peak_rss_bytes': _peak_rss(),
+        }
+        print(f"  {name:<28} {seconds:9.3f} s {items / seconds if seconds > 0 else 0:>12.0f} /s "
+              f"{self.results[name]['peak_rss_bytes'] / 2**20:>9.0f} MB")
+        return value
+
+
+def group_pages(pages, column_name, dtype, expected_rows):
+    """The grouping stage of `_collect_embedding_matrix`, without metadata."""
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    vectors = _VectorBuffer(dtype, expected_rows)
+    page_group_ids = []
+    for points in pages:
+        points, group_ids = groups.assign(points, key_of)
+        if points:
+            vectors.append([point.vector for point in points])
+            page_group_ids.append(group_ids)
+    return vectors.matrix(), np.concatenate(page_group_ids), groups.keys
+
+
+def collect_metadata(pages, column_name):
+    """The metadata stage of `_collect_embedding_matrix`, including concatenation."""
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    metadata = _MetadataCollector()
+    for points in pages:
+        points, group_ids = groups.assign(points, key_of)
+        for point, group_id in zip(points, group_ids.tolist()):
+            metadata.add(group_id, point.payload, point.id)
+    return metadata.finalize(groups.keys)
+
+
+def run_benchmark(client, args):
+    n_points = client.count(args.collection, exact=True).count
+    timer = StageTimer(args.repeat)
+
+    pages = timer.run('scroll', n_points, lambda: list(
+        _scroll_pages(client, args.collection, limit=args.scroll_batch_size)
+    ))
+    matrix, group_ids, column_values = timer.run(
+        'grouping', n_points, group_pages, pages, 'metadata.doc', np.float32, n_points
+    )
+
+    representative_embeddings = None
+    for method in args.methods:
+        # Modes that do not collect a matrix ("streaming", "out_of_core") run as "default" here
+        execution = _resolve_execution(
+            "auto", method, n_points, vector_bytes=matrix.shape[1] * matrix.itemsize
+        )
+        aggregated = timer.run(
+            f'aggregate[{method}]', n_points, _aggregate_matrix,
+            matrix, group_ids, column_values, method, execution
+        )
+        timer.results[f'aggregate[{method}]']['execution'] = execution
+        if representative_embeddings is None:
+            representative_embeddings = dict(zip(column_values, aggregated))
+
+    metadata_by_column = timer.run('metadata', n_points, collect_metadata, pages, 'metadata.doc')
+    points = timer.run(
+        'points', len(column_values), create_qdrant_batch, representative_embeddings, metadata_by_column
+    )
+    timer.run(
+        'upload', len(column_values), save_qdrant_collection,
+        client, args.output_collection, points, get_vector_dimension(representative_embeddings),
+        batch_size=args.upload_batch_size, show_progress=False
+    )
+    return timer.results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'peak_rss_per_stage': _reset_peak_rss(),
+    }
+
+
+def compare(results, baseline_path, tolerance, min_seconds=0.01):
+    """
+    Print time ratios against a previous run; return True if a stage regressed.
+
+    Stages faster than `min_seconds` in both runs are reported but never flagged,
+    since timer noise dominates them.
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    regressed = False
+    for stage, result in results.items():
+        previous = baseline['results'].get(stage)
+        if previous is None:
+            continue
+        ratio = result['seconds'] / previous['seconds'] if previous['seconds'] > 0 else float('inf')
+        measurable = max(result['seconds'], previous['seconds']) >= min_seconds
+        slower = measurable and ratio > 1 + tolerance
+        regressed = regressed or slower
+        print(f"  {stage:<28} {ratio:6.2f}x time {'✗ slower' if slower else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=20000, help="Number of chunks (default: 20000)")
+    parser.add_argument("--dim", type=int, default=256, help="Vector dimension (default: 256)")
+    parser.add_argument("--groups", type=int, default=500, help="Number of groups (default: 500)")
+    parser.add_argument("--distribution", choices=("uniform", "zipf"), default="uniform",
+                        help="Group size distribution (default: uniform)")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1, help="Zipf exponent (default: 1.1)")
+    parser.add_argument("--payload-bytes", type=int, default=1000, help="page_content size per chunk (default: 1000)")
+    parser.add_argument("--methods", default=DEFAULT_METHODS, help="Comma-separated methods to time")
+    parser.add_argument("--url", help="Qdrant server to use instead of an in-memory instance")
+    parser.add_argument("--collection", default="benchmark_input")
+    parser.add_argument("--output-collection", default="benchmark_output")
+    parser.add_argument("--reuse", action="store_true", help="Reuse an existing input collection on --url")
+    parser.add_argument("--scroll-batch-size", type=int, default=256)
+    parser.add_argument("--upload-batch-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is kept (default: 3)")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="JSON results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown per stage in --compare (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+    args.methods = [method.strip() for method in args.methods.split(',') if method.strip()]
+
+    client = QdrantClient(url=args.url, timeout=300) if args.url else QdrantClient(":memory:")
+    if not (args.reuse and args.url and client.collection_exists(args.collection)):
+        start = time.perf_counter()
+        sizes = make_collection(
+            client, args.collection, args.points, args.dim, args.groups, args.distribution,
+            args.zipf_exponent, args.payload_bytes, args.seed
+        )
+        print(f"Generated {args.points} chunks x {args.dim} dims in {time.perf_counter() - start:.1f}s; "
+              f"group sizes min={sizes.min()} median={int(np.median(sizes))} max={sizes.max()}")
+
+    results = run_benchmark(client, args)
+    report = {'config': vars(args), 'environment': environment(), 'results': results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Scroll and upsert throughput of the REST and gRPC transports.
+
+Bulk vector transfer over REST encodes every float as JSON text; gRPC sends
+packed floats. This benchmark generates a synthetic chunked collection on a
+Qdrant server (see `pipeline.make_collection`) and, for each transport,
+times a full scroll of it with vectors and payloads and an upsert of the
+scrolled points into a scratch collection:
+
+    rest        QdrantClient over HTTP/JSON
+    grpc        prefer_grpc=True
+    grpc+gzip   prefer_grpc=True with gzip-compressed messages
+
+Each stage reports wall time (fastest of --repeat runs), points per second and
+vector payload MB per second. Keep-alive and pool size can be set with
+--keepalive and --pool-size (see `utils.client_kwargs`).
+
+Usage:
+    python benchmarks/transport.py --url http://localhost:6333 [--points 50000] [--dim 768]
+        [--transports rest,grpc,grpc+gzip] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline import StageTimer, environment, make_collection
+from qdrant_client.models import Batch
+from qdrant_vector_aggregator.aggregator import _scroll_pages
+from qdrant_vector_aggregator.utils import load_qdrant_collection, save_qdrant_collection
+
+TRANSPORTS = {
+    'rest': {'prefer_grpc': False},
+    'grpc': {'prefer_grpc': True},
+    'grpc+gzip': {'prefer_grpc': True, 'grpc_compression': 'gzip'},
+}
+
+
+def scroll_all(client, collection_name, limit):
+    return [point for points in _scroll_pages(client, collection_name, limit=limit) for point in points]
+
+
+def run_transport(client, args, dimension):
+    timer = StageTimer(args.repeat)
+    n_points = client.count(args.collection, exact=True).count
+    points = timer.run('scroll', n_points, scroll_all, client, args.collection, args.scroll_batch_size)
+    batch = Batch(
+        ids=[point.id for point in points],
+        vectors=[point.vector for point in points],
+        payloads=[point.payload for point in points],
+    )
+    timer.run(
+        'upsert', n_points, save_qdrant_collection,
+        client, args.output_collection, batch, dimension,
+        batch_size=args.upload_batch_size, parallel=args.upload_parallel, show_progress=False
+    )
+    megabytes = n_points * dimension * 4 / 2**20
+    for result in timer.results.values():
+        result['vector_mb_per_second'] = megabytes / result['seconds'] if result['seconds'] > 0 else float('inf')
+    return timer.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="Qdrant server, e.g. http://localhost:6333")
+    parser.add_argument("--api-key", help="API key of the server")
+    parser.add_argument("--grpc-port", type=int, default=6334, help="gRPC port of the server (default: 6334)")
+    parser.add_argument("--points", type=int, default=50000, help="Number of chunks (default: 50000)")
+    parser.add_argument("--dim", type=int, default=768, help="Vector dimension (default: 768)")
+    parser.add_argument("--groups", type=int, default=1000, help="Number of groups (default: 1000)")
+    parser.add_argument("--payload-bytes", type=int, default=1000, help="page_content size per chunk (default: 1000)")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS),
+                        help=f"Comma-separated transports (default: {','.join(TRANSPORTS)})")
+    parser.add_argument("--keepalive", type=float, help="Keep-alive in seconds")
+    parser.add_argument("--pool-size", type=int, help="Number of gRPC channels or pooled REST connections")
+    parser.add_argument("--collection", default="benchmark_transport_input")
+    parser.add_argument("--output-collection", default="benchmark_transport_output")
+    parser.add_argument("--reuse", action="store_true", help="Reuse an existing input collection")
+    parser.add_argument("--scroll-batch-size", type=int, default=256)
+    parser.add_argument("--upload-batch-size", type=int, default=256)
+    parser.add_argument("--upload-parallel", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is kept (default: 3)")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON")
+    args = parser.parse_args()
+    transports = [name.strip() for name in args.transports.split(',') if name.strip()]
+    unknown = set(transports) - set(TRANSPORTS)
+    if unknown:
+        parser.error(f"unknown transports: {', '.join(sorted(unknown))}")
+
+    def connect(transport):
+        return load_qdrant_collection(
+            args.collection, args.url, args.api_key, grpc_port=args.grpc_port,
+            keepalive=args.keepalive, pool_size=args.pool_size, timeout=300,
+            **TRANSPORTS[transport]
+        )
+
+    setup_client = connect('rest')
+    if not (args.reuse and setup_client.collection_exists(args.collection)):
+        start = time.perf_counter()
+        make_collection(setup_client, args.collection, args.points, args.dim, args.groups,
+                        payload_bytes=args.payload_bytes)
+        print(f"Generated {args.points} chunks x {args.dim} dims in {time.perf_counter() - start:.1f}s")
+    dimension = setup_client.get_collection(args.collection).config.params.vectors.size
+
+    results = {}
+    for transport in transports:
+        print(f"\n{transport}:")
+        stages = run_transport(connect(transport), args, dimension)
+        for stage, result in stages.items():
+            results[f'{stage}[{transport}]'] = result
+
+    baseline = transports[0]
+    print(f"\nThroughput relative to {baseline}:")
+    for transport in transports[1:]:
+        for stage in ('scroll', 'upsert'):
+            ratio = results[f'{stage}[{baseline}]']['seconds'] / results[f'{stage}[{transport}]']['seconds']
+            print(f"  {stage:<8} {transport:<12} {ratio:6.2f}x")
+
+    setup_client.delete_collection(args.output_collection)
+    if args.json:
+        report = {'config': vars(args), 'environment': environment(), 'results': results}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
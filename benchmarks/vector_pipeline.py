@@ -0,0 +1,142 @@
+"""
+Memory and time of the vector path from scrolled pages to upload batches.
+
+Compares the list-based float64 pipeline the aggregator used before (per-group
+Python lists -> np.array -> `tolist()` into one Batch) with the current one
+(pages written in place into a preallocated buffer of the target dtype, groups
+as views, vectors converted per upload slice). Scrolled pages are simulated
+in memory, so no Qdrant server is needed and only client-side work is measured.
+
+Results are reported per million input vectors.
+
+Usage:
+    python benchmarks/vector_pipeline.py [--vectors 200000] [--dim 384] [--groups 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client.models import Batch
+from qdrant_vector_aggregator.aggregator import (
+    _collect_embedding_matrix, _create_aggregated_metadata, _iter_groups
+)
+from qdrant_vector_aggregator.embedding_methods import calculate_embedding
+from qdrant_vector_aggregator.qdrant_collection_helpers import create_qdrant_batch
+from qdrant_vector_aggregator.utils import _split_batches
+
+
+class _Point:
+    __slots__ = ('id', 'vector', 'payload')
+
+    def __init__(self, id, vector, payload):
+        self.id = id
+        self.vector = vector
+        self.payload = payload
+
+
+def make_pages(n_vectors, dimension, n_groups, page_size=100, seed=0):
+    """Scroll pages as the REST client returns them: vectors are lists of floats."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_vectors, dimension), dtype=np.float32).tolist()
+    groups = rng.integers(n_groups, size=n_vectors)
+    points = [
+        _Point(i, vector, {'metadata': {'doc': f'doc{group}', 'chunk_index': i}})
+        for i, (vector, group) in enumerate(zip(vectors, groups))
+    ]
+    return [points[i:i + page_size] for i in range(0, n_vectors, page_size)]
+
+
+def list_pipeline(pages, method, upload_batch_size):
+    """The previous pipeline: per-group lists, float64 arrays, one full tolist()."""
+    embeddings_by_column = {}
+    chunks_by_column = {}
+    for points in pages:
+        for point in points:
+            column_value = point.payload['metadata']['doc']
+            embeddings_by_column.setdefault(column_value, []).append(point.vector)
+            chunks_by_column.setdefault(column_value, []).append(point.payload)
+    for column_value in embeddings_by_column:
+        embeddings_by_column[column_value] = np.array(embeddings_by_column[column_value])
+    metadata_by_column = _create_aggregated_metadata(chunks_by_column)
+
+    representative_embeddings = {
+        column_value: calculate_embedding(embeddings, method)
+        for column_value, embeddings in embeddings_by_column.items()
+    }
+    ids = list(range(len(representative_embeddings)))
+    vectors = np.asarray(list(representative_embeddings.values())).tolist()
+    payloads = [metadata_by_column[value] for value in representative_embeddings]
+    points = Batch(ids=ids, vectors=vectors, payloads=payloads)
+    return sum(1 for _ in _split_batches(points, upload_batch_size))
+
+
+def array_pipeline(pages, method, upload_batch_size, dtype):
+    """The current pipeline: preallocated buffer of `dtype`, per-slice conversion."""
+    # aggregate_embeddings sizes the buffer from the collection's point count
+    expected_rows = sum(len(points) for points in pages)
+    matrix, group_ids, column_values, metadata_by_column = _collect_embedding_matrix(
+        None, None, 'metadata.doc', dtype=dtype, pages=pages, expected_rows=expected_rows
+    )
+    representative_embeddings = {
+        column_value: calculate_embedding(embeddings, method)
+        for column_value, embeddings in _iter_groups(matrix, group_ids, column_values)
+    }
+    points = create_qdrant_batch(representative_embeddings, metadata_by_column, dtype=dtype)
+    return sum(1 for _ in _split_batches(points, upload_batch_size))
+
+
+def measure(pipeline, pages, *args):
+    """Return (seconds, peak traced bytes) of one run, measured in separate runs."""
+    start = time.perf_counter()
+    pipeline(pages, *args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    pipeline(pages, *args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200000, help="Number of input vectors (default: 200000)")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension (default: 384)")
+    parser.add_argument("--groups", type=int, default=2000, help="Number of groups (default: 2000)")
+    parser.add_argument("--method", default="average", help="Aggregation method (default: average)")
+    parser.add_argument("--upload-batch-size", type=int, default=100)
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    pages = make_pages(args.vectors, args.dim, args.groups)
+    scale = 1_000_000 / args.vectors
+    runs = {
+        "lists, float64": (list_pipeline, args.method, args.upload_batch_size),
+        "buffer, float64": (array_pipeline, args.method, args.upload_batch_size, np.float64),
+        "buffer, float32": (array_pipeline, args.method, args.upload_batch_size, np.float32),
+    }
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.groups} groups, method={args.method}")
+    print(f"{'pipeline':<18} {'s / 1M vectors':>15} {'peak MB / 1M vectors':>22}")
+    results = {}
+    for name, (pipeline, *pipeline_args) in runs.items():
+        seconds, peak = measure(pipeline, pages, *pipeline_args)
+        results[name] = {
+            'seconds_per_million': seconds * scale,
+            'peak_bytes_per_million': peak * scale,
+        }
+        print(f"{name:<18} {seconds * scale:>15.2f} {peak * scale / 2**20:>22.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,32 @@
-from .aggregator import aggregate_embeddings
-from .embedding_methods import calculate_embedding
-from .utils import load_qdrant_collection, save_qdrant_collection
+"""
+Aggregate chunk embeddings in a Qdrant collection into one vector per group.
+
+Public names are imported on first access, so `import qdrant_vector_aggregator`
+does not load qdrant-client or scipy until they are needed.
+"""
+import importlib
+
+_EXPORTS = {
+    'aggregate_embeddings': '.aggregator',
+    'aggregate_embeddings_async': '.async_aggregator',
+    'aggregate_embeddings_incremental': '.incremental',
+    'aggregate_collections': '.batch',
+    'calculate_embedding': '.embedding_methods',
+    'DateBucket': '.grouping',
+    'Instrumentation': '.instrumentation',
+    'load_qdrant_collection': '.utils',
+    'save_qdrant_collection': '.utils',
+    'register_method': '.registry',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,17 @@
 import os
-from .utils import load_qdrant_collection, save_qdrant_collection, load_metadata, save_metadata
+import warnings
+import numpy as np
+from .utils import load_qdrant_collection, save_qdrant_collection, delete_stale_points, load_metadata, save_metadata
 from .embedding_methods import calculate_embedding
-from .qdrant_collection_helpers import create_qdrant_points, get_vector_dimension
-from .config import QDRANT_URL, QDRANT_API_KEY
+from .qdrant_collection_helpers import create_qdrant_batch, get_vector_dimension
+from .streaming import make_accumulator
+from .parallel_scroll import parallel_scroll
+from .grouped_methods import SharedGroups, calculate_grouped_embeddings, per_row_weights
+from .registry import get_method, select_execution
+from .grouping import GroupIndex, compile_grouping, grouping_fields
+from .content import CONTENT_IDS_KEY, DeferredContent, without_content_ids
+from .instrumentation import Instrumentation
+from . import config
 from qdrant_client.models import Distance
 
 def aggregate_embeddings(
@@ -12,145 +21,908 @@ def aggregate_embeddings(
     method="average",
     weights=None,
     trim_percentage=0.1,
+    sample_size=None,
     qdrant_url=None,
     api_key=None,
     distance_metric=Distance.COSINE,
     metadata_path=None,
-    output_metadata_path=None
+    output_metadata_path=None,
+    execution="auto",
+    scroll_batch_size=100,
+    scroll_workers=1,
+    scroll_segments=None,
+    scroll_filter=None,
+    payload_fields=None,
+    concatenate_content=True,
+    defer_content=False,
+    upload_batch_size=100,
+    upload_parallel=1,
+    upload_wait=True,
+    deterministic_ids=False,
+    job_id=None,
+    checkpoint_dir=".checkpoints",
+    checkpoint_every=100,
+    spill_dir=None,
+    workers=None,
+    dtype=np.float32,
+    named_vectors=None,
+    instrumentation=None,
+    client=None,
+    executor=None,
+    prefer_grpc=None
 ):
     """
     Aggregate embeddings from a Qdrant collection based on a metadata column.
 
     Parameters:
         input_collection_name (str): Name of the input Qdrant collection
-        column_name (str): Metadata field by which to aggregate embeddings
-        output_collection_name (str): Name of the output Qdrant collection
-        method (str): Aggregation method (default: "average")
+        column_name: Grouping spec (see `grouping.compile_grouping`): a payload
+            field such as "metadata.name" (nested fields separated by dots, list
+            items as "authors[0]"), a tuple of fields grouping by their
+            combination, a derived key such as `DateBucket("metadata.date", "month")`,
+            or a callable `key(payload)`. Points without a key are skipped
+        output_collection_name (str or dict): Name of the output Qdrant collection;
+            with several methods, a dict mapping each method to its own output
+            collection, or a name for one collection with a named vector per method
+        method (str or list): Aggregation method (default: "average"). A list of
+            methods aggregates every method from one scan and one grouping pass;
+            "streaming" methods fold each page into accumulators and the others
+            share one collected matrix and its per-group intermediates (see
+            `_aggregate_methods`). Resumable jobs, named_vectors and "out_of_core"
+            are not supported with several methods
         weights (list, optional): Weights for weighted_average method
         trim_percentage (float): Fraction to trim for trimmed_mean (default: 0.1)
+        sample_size (int, optional): Rows sampled per group by the approx_* methods
+            (default: embedding_methods.DEFAULT_SAMPLE_SIZE)
         qdrant_url (str, optional): URL of Qdrant server (default: from .env or "http://localhost:6333")
         api_key (str, optional): API key for Qdrant Cloud (default: from .env)
         distance_metric (Distance): Distance metric for the output collection (default: COSINE)
         metadata_path (str, optional): Path to load additional metadata
         output_metadata_path (str, optional): Path to save aggregated metadata
+        execution (str): Execution mode (default: "auto")
+            - "auto": pick the fastest mode from the method's capabilities and
+              the collection size, avoiding in-memory matrices for collections
+              above `registry.MATRIX_MEMORY_LIMIT_BYTES` (see `registry.select_execution`)
+            - "default": collect every chunk vector per group, then aggregate
+            - "streaming": fold each scrolled page into per-group running
+              accumulators so memory scales with the number of groups; methods
+              that cannot be computed in one pass fall back to "default" with a warning
+            - "batched": collect all vectors into one contiguous matrix
+              and reduce every group at once with segment reductions; methods
+              without a grouped implementation fall back to "default" with a warning
+            - "out_of_core": spill vectors to memory-mapped files on disk,
+              sort them by group and aggregate each group from a zero-copy slice,
+              so exact methods work on collections larger than RAM
+            - "process_pool": collect all vectors into one shared-memory
+              matrix and aggregate groups on a pool of worker processes, for
+              CPU-heavy methods such as median, trimmed_mean, tukeys_biweight,
+              exemplar and pca
+        scroll_batch_size (int): Number of points fetched per scroll call (default: 100)
+        scroll_workers (int): Number of concurrent reader threads (default: 1)
+        scroll_segments (list, optional): Disjoint segments of the input collection
+            scrolled concurrently by the workers, as `Filter` partitions or
+            `(start_id, end_id)` integer ID ranges (see `parallel_scroll`).
+            Required when scroll_workers > 1. Pages then arrive in no fixed
+            order, so chunk order within a group (used by weighted_average and
+            for the base payload) follows arrival order
+        scroll_filter (Filter, optional): Only aggregate the points matching this
+            filter; applied server-side by every scroll call
+        payload_fields (list, optional): Payload fields to read, e.g.
+            ["metadata.title", "metadata.source"]. The grouping and ordering
+            fields (and page_content when concatenating) are always added.
+            Default: the full payload, or only the grouping and ordering fields
+            when concatenate_content is False
+        concatenate_content (bool): Concatenate the page_content of each group's
+            chunks in order (default: True). With False, page_content is not
+            transferred at all and the output page_content is empty
+        defer_content (bool): Two-phase aggregation (default: False). The scan
+            reads only IDs, grouping and ordering fields (plus payload_fields)
+            and vectors; the page_content of each group is then fetched in
+            ordering-field order with batched `client.retrieve` calls while its
+            output batch is uploaded, so content is held for one upload batch at
+            a time. The output base payload is limited to the scanned fields, and
+            the metadata saved to output_metadata_path has no page_content
+        upload_batch_size (int): Number of points per upsert call (default: 100)
+        upload_parallel (int): Number of batches uploaded concurrently (default: 1)
+        upload_wait (bool): Wait for each upsert to be applied; with False a
+            final consistency barrier waits for all points (default: True)
+        deterministic_ids (bool): Derive point IDs from the output collection name
+            and group key (see `group_point_id`) instead of random UUIDs. The
+            output collection is then updated in place rather than recreated:
+            points are upserted over the previous ones and points of groups that
+            no longer exist are deleted, so reruns and resumed jobs are idempotent
+            and the collection stays searchable throughout (default: False)
+        job_id (str, optional): Run as a resumable job. Progress (scroll offset,
+            partial per-group state, acknowledged output batches) is checkpointed
+            under checkpoint_dir, and a restart with the same job_id resumes from
+            the last checkpoint. Implies deterministic_ids; the input is read with
+            a sequential scroll
+        checkpoint_dir (str): Directory for job checkpoints (default: ".checkpoints")
+        checkpoint_every (int): Number of scrolled pages between checkpoints (default: 100)
+        spill_dir (str, optional): Directory for the "out_of_core" spill files
+            (default: a temporary directory, removed afterwards)
+        workers (int, optional): Number of worker processes for the "process_pool"
+            execution mode (default: os.cpu_count()). With execution="auto",
+            worker processes are only used when this is set
+        dtype: Floating point type of the vectors from read to upload (default: float32,
+            the precision Qdrant stores vectors in). Use np.float64 to aggregate
+            in double precision
+        named_vectors (dict, optional): Aggregate several named vectors of the input
+            in one scan and write them as named vectors of the output collection.
+            Maps each vector name to its method (e.g. {"dense": "average",
+            "image": "max_pooling"}) or to a dict with "method" and/or "distance";
+            `method` and `distance_metric` are the defaults. Each vector uses the
+            execution mode resolved for its method; resumable jobs and
+            "out_of_core" are not supported. Points missing one of the vectors
+            are skipped
+        instrumentation (Instrumentation, optional): Records per-stage timing
+            histograms and counters and sends progress events (stage start/end,
+            points scrolled, groups finalized, batches uploaded) to its hooks and
+            logger; see `instrumentation.Instrumentation`. Resumable jobs are
+            timed as a single "job" stage
+        client (QdrantClient, optional): Client to use instead of connecting to
+            qdrant_url, e.g. to share one connection pool across many calls
+        executor (ProcessPoolExecutor, optional): Pool for the "process_pool"
+            execution mode instead of a pool started for this call, e.g. to share
+            one pool across many calls (see `batch.aggregate_collections`)
+        prefer_grpc (bool, optional): Talk to Qdrant over gRPC, which transfers
+            vectors as packed floats instead of JSON (default: QDRANT_PREFER_GRPC).
+            Port, compression, keep-alive and pool size come from the config
+            module (see `utils.client_kwargs`)
 
     Returns:
         tuple: (output_collection_name, output_metadata_path)
     """
+    methods = list(method) if isinstance(method, (list, tuple)) else None
+    if methods is not None:
+        _check_methods(methods, output_collection_name, named_vectors, job_id, execution, spill_dir)
+    elif isinstance(output_collection_name, dict):
+        raise ValueError("A dict of output collections requires a list of methods.")
+
     # Use environment variables if not provided
     if qdrant_url is None:
-        qdrant_url = QDRANT_URL
+        qdrant_url = config.QDRANT_URL
     if api_key is None:
-        api_key = QDRANT_API_KEY
+        api_key = config.QDRANT_API_KEY
 
     # Load Qdrant client
-    client = load_qdrant_collection(input_collection_name, qdrant_url, api_key)
-
-    # Collect embeddings by column value
-    embeddings_by_column, metadata_by_column = _collect_embeddings_by_column(
-        client, input_collection_name, column_name
-    )
-
-    # Calculate representative embeddings
-    representative_embeddings = {}
-    for column_value, embeddings in embeddings_by_column.items():
-        representative_embeddings[column_value] = calculate_embedding(
-            embeddings, method, weights, trim_percentage
+    if client is None:
+        client = load_qdrant_collection(input_collection_name, qdrant_url, api_key, prefer_grpc=prefer_grpc)
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+
+    if execution not in ("auto", "default", "streaming", "batched", "out_of_core", "process_pool"):
+        raise ValueError(f"Unknown execution mode: {execution}")
+
+    # Approximate size, used to preallocate vector buffers
+    n_points = client.count(
+        collection_name=input_collection_name, count_filter=scroll_filter, exact=False
+    ).count
+
+    if named_vectors is not None:
+        vector_methods, vector_distances = _named_vector_settings(
+            named_vectors, method, distance_metric
+        )
+        if job_id is not None or execution == "out_of_core" or spill_dir is not None:
+            raise ValueError(
+                "Named vectors are aggregated in memory; resumable jobs and the "
+                "out_of_core execution mode are not supported."
+            )
+    elif methods is None:
+        vector_bytes = None
+        if execution == "auto" and job_id is None:
+            vectors = client.get_collection(input_collection_name).config.params.vectors
+            if not isinstance(vectors, dict):
+                vector_bytes = vectors.size * np.dtype(dtype).itemsize
+        execution = _resolve_execution(execution, method, n_points, workers, spill_dir, vector_bytes)
+
+    if job_id is not None:
+        if scroll_segments is not None:
+            raise ValueError("Resumable jobs read the input sequentially; scroll_segments is not supported.")
+        from .checkpoint import run_checkpointed_job
+        with instrumentation.stage('job', method=method):
+            metadata_by_column = run_checkpointed_job(
+                client, job_id, checkpoint_dir,
+                input_collection_name, column_name, output_collection_name,
+                method, weights, trim_percentage, distance_metric,
+                sample_size=sample_size,
+                scroll_batch_size=scroll_batch_size,
+                scroll_filter=scroll_filter,
+                payload_fields=payload_fields,
+                concatenate_content=concatenate_content,
+                defer_content=defer_content,
+                upload_batch_size=upload_batch_size,
+                checkpoint_every=checkpoint_every
+            )
+        instrumentation.groups_finalized(len(metadata_by_column))
+        if output_metadata_path:
+            save_metadata(without_content_ids(metadata_by_column), output_metadata_path)
+        return output_collection_name, output_metadata_path
+
+    if scroll_workers > 1 and scroll_segments is None:
+        raise ValueError("scroll_segments must be provided when scroll_workers > 1.")
+
+    with_payload = _payload_selector(column_name, payload_fields, concatenate_content, defer_content)
+    with_vectors = list(named_vectors) if named_vectors is not None else True
+    if scroll_segments is not None:
+        pages = parallel_scroll(
+            client, input_collection_name, scroll_segments,
+            workers=scroll_workers, limit=scroll_batch_size,
+            scroll_filter=scroll_filter, with_payload=with_payload, with_vectors=with_vectors
+        )
+    else:
+        pages = _scroll_pages(
+            client, input_collection_name, limit=scroll_batch_size,
+            scroll_filter=scroll_filter, with_payload=with_payload, with_vectors=with_vectors
+        )
+    # Separates time waiting for Qdrant ("scroll") from time spent on each page ("page")
+    pages = instrumentation.pages(pages)
+
+    if methods is not None:
+        # Aggregate every method from the same scan
+        representative_embeddings, metadata_by_column = _aggregate_methods(
+            pages, column_name, methods, execution, weights, trim_percentage,
+            sample_size=sample_size, workers=workers, dtype=dtype, expected_rows=n_points,
+            concatenate_content=concatenate_content, defer_content=defer_content,
+            executor=executor, instrumentation=instrumentation
         )
+    elif named_vectors is not None:
+        # Aggregate every named vector in the same scan
+        with instrumentation.stage('scan', method=','.join(sorted(set(vector_methods.values())))):
+            representative_embeddings, metadata_by_column = _aggregate_named_vectors(
+                pages, column_name, vector_methods, execution, weights, trim_percentage,
+                sample_size=sample_size, workers=workers, dtype=dtype, expected_rows=n_points,
+                concatenate_content=concatenate_content, defer_content=defer_content,
+                executor=executor
+            )
+        distance_metric = vector_distances
+    elif execution == "streaming":
+        # Aggregate in a single pass with per-group running accumulators
+        with instrumentation.stage('scan', method=method, execution=execution):
+            representative_embeddings, metadata_by_column = _stream_embeddings_by_column(
+                client, input_collection_name, column_name, method, weights,
+                trim_percentage=trim_percentage, sample_size=sample_size, pages=pages,
+                concatenate_content=concatenate_content, defer_content=defer_content,
+                dtype=dtype
+            )
+    elif execution == "out_of_core":
+        # External group-by through memory-mapped spill files
+        from .external import aggregate_out_of_core
+        with instrumentation.stage('scan', method=method, execution=execution):
+            representative_embeddings, metadata_by_column = aggregate_out_of_core(
+                pages, column_name, method, weights, trim_percentage,
+                sample_size=sample_size, spill_dir=spill_dir, dtype=dtype,
+                concatenate_content=concatenate_content, defer_content=defer_content
+            )
+    else:
+        # Collect embeddings into one matrix, then reduce it group by group
+        # ("default"), all groups at once ("batched") or in worker processes
+        # ("process_pool")
+        with instrumentation.stage('scan'):
+            matrix, group_ids, column_values, metadata_by_column = _collect_embedding_matrix(
+                client, input_collection_name, column_name, dtype=dtype, pages=pages,
+                expected_rows=n_points, concatenate_content=concatenate_content,
+                defer_content=defer_content
+            )
+        with instrumentation.stage('aggregate', method=method, execution=execution):
+            aggregated = _aggregate_matrix(
+                matrix, group_ids, column_values, method, execution, weights,
+                trim_percentage, sample_size, workers, executor
+            )
+        representative_embeddings = dict(zip(column_values, aggregated))
+    instrumentation.groups_finalized(len(representative_embeddings))
 
-    # Create Qdrant points
-    points = create_qdrant_points(representative_embeddings, metadata_by_column)
-    vector_size = get_vector_dimension(representative_embeddings)
+    if isinstance(output_collection_name, dict):
+        # One output collection per method
+        outputs = [
+            (output_collection_name[name], {
+                column_value: vectors[name]
+                for column_value, vectors in representative_embeddings.items()
+            })
+            for name in methods
+        ]
+    else:
+        outputs = [(output_collection_name, representative_embeddings)]
 
-    # Save to new collection
-    save_qdrant_collection(
-        client, output_collection_name, points, vector_size, distance_metric
-    )
+    payload_loader = DeferredContent(client, input_collection_name) if defer_content else None
+    for collection_name, embeddings in outputs:
+        # Create Qdrant points as one columnar batch
+        id_namespace = collection_name if deterministic_ids else None
+        with instrumentation.stage('points'):
+            points = create_qdrant_batch(
+                embeddings, metadata_by_column, id_namespace, dtype, payload_loader
+            )
+        vector_size = get_vector_dimension(embeddings)
+
+        # Save to new collection, or update it in place with deterministic IDs
+        save_qdrant_collection(
+            client, collection_name, points, vector_size, distance_metric,
+            batch_size=upload_batch_size, parallel=upload_parallel, wait=upload_wait,
+            recreate=not deterministic_ids, progress_callback=instrumentation.batch_uploaded
+        )
+        if deterministic_ids:
+            with instrumentation.stage('cleanup'):
+                delete_stale_points(client, collection_name, points.ids)
 
     # Save metadata if path provided
     if output_metadata_path:
-        save_metadata(metadata_by_column, output_metadata_path)
+        save_metadata(without_content_ids(metadata_by_column), output_metadata_path)
 
     return output_collection_name, output_metadata_path
 
-def _collect_embeddings_by_column(client, collection_name, column_name):
+def _check_methods(methods, output_collection_name, named_vectors, job_id, execution, spill_dir):
+    """Validate the arguments of a multi-method aggregation."""
+    if not methods:
+        raise ValueError("method must name at least one method.")
+    if len(set(methods)) < len(methods):
+        raise ValueError(f"Duplicate methods: {methods}")
+    for name in methods:
+        get_method(name)
+    if named_vectors is not None:
+        raise ValueError("Several methods cannot be combined with named_vectors.")
+    if job_id is not None or execution == "out_of_core" or spill_dir is not None:
+        raise ValueError(
+            "Several methods are aggregated in memory; resumable jobs and the "
+            "out_of_core execution mode are not supported."
+        )
+    if isinstance(output_collection_name, dict) and set(output_collection_name) != set(methods):
+        raise ValueError("output_collection_name must map every method to a collection.")
+
+def _resolve_execution(execution, method, n_points=None, workers=None, spill_dir=None, vector_bytes=None):
+    """
+    Resolve "auto" and fall back to "default" for modes the method does not support.
+
+    Returns:
+        str: Execution mode to run
+    """
+    spec = get_method(method)
+    if execution == "auto":
+        execution = select_execution(method, n_points, workers, spill_dir, vector_bytes)
+
+    if execution == "streaming" and not spec.streaming:
+        warnings.warn(
+            f"Method '{method}' needs every vector of a group and cannot be streamed; "
+            "falling back to the default execution mode.",
+            RuntimeWarning
+        )
+        execution = "default"
+
+    if execution == "batched" and not spec.batched:
+        warnings.warn(
+            f"Method '{method}' has no grouped implementation; "
+            "falling back to the default execution mode.",
+            RuntimeWarning
+        )
+        execution = "default"
+
+    if execution == "process_pool" and not spec.parallel_safe:
+        warnings.warn(
+            f"Method '{method}' is not marked parallel-safe; "
+            "falling back to the default execution mode.",
+            RuntimeWarning
+        )
+        execution = "default"
+
+    return execution
+
+def _aggregate_matrix(
+    matrix, group_ids, column_values, method, execution, weights=None,
+    trim_percentage=0.1, sample_size=None, workers=None, executor=None
+):
     """
-    Collect embeddings from Qdrant collection grouped by a metadata column.
-    Also collects chunks with their metadata for smart content concatenation.
+    Aggregate the groups of a collected matrix (see `_collect_embedding_matrix`).
 
     Parameters:
-        client (QdrantClient): Qdrant client instance
-        collection_name (str): Name of the collection
-        column_name (str): Metadata field to group by
+        execution (str): "batched", "process_pool" or "default"
+        Other parameters: See `aggregate_embeddings`
+
+    Returns:
+        list or np.ndarray: One aggregated vector per group, in group ID order
+    """
+    if execution == "batched":
+        # Reduce all groups at once over one contiguous matrix
+        row_weights = None
+        if "weights" in get_method(method).options and weights is not None:
+            row_weights = per_row_weights(group_ids, weights)
+        return calculate_grouped_embeddings(matrix, group_ids, method, row_weights)
+
+    if execution == "process_pool":
+        # Aggregate groups in worker processes over a shared-memory matrix
+        from .parallel import calculate_embeddings_parallel
+        return calculate_embeddings_parallel(
+            matrix, group_ids, method, weights, trim_percentage,
+            sample_size=sample_size, workers=workers, executor=executor
+        )
+
+    return [
+        calculate_embedding(embeddings, method, weights, trim_percentage, sample_size)
+        for _, embeddings in _iter_groups(matrix, group_ids, column_values)
+    ]
+
+def _named_vector_settings(named_vectors, method, distance_metric):
+    """
+    Split a `named_vectors` spec into per-vector methods and distances.
+
+    Returns:
+        tuple: ({name: method}, {name: distance})
+    """
+    if not named_vectors:
+        raise ValueError("named_vectors must name at least one vector.")
+    vector_methods = {}
+    vector_distances = {}
+    for name, setting in named_vectors.items():
+        if setting is None:
+            setting = {}
+        elif isinstance(setting, str):
+            setting = {'method': setting}
+        unknown = set(setting) - {'method', 'distance'}
+        if unknown:
+            raise ValueError(f"Unknown settings for vector '{name}': {sorted(unknown)}")
+        vector_methods[name] = setting.get('method', method)
+        vector_distances[name] = setting.get('distance', distance_metric)
+        get_method(vector_methods[name])
+    return vector_methods, vector_distances
+
+def _aggregate_named_vectors(
+    pages, column_name, vector_methods, execution="auto", weights=None,
+    trim_percentage=0.1, sample_size=None, workers=None, dtype=np.float32,
+    expected_rows=0, concatenate_content=True, defer_content=False, executor=None
+):
+    """
+    Aggregate several named vectors of every point in a single scan.
+
+    Each vector is aggregated with its own method, in the execution mode
+    resolved for that method: vectors of streamable methods are folded into
+    running accumulators, the others are collected into one matrix per vector
+    sharing the same group IDs. Points missing one of the vectors are skipped.
+
+    Parameters:
+        pages (iterable): Pages of points scrolled with the named vectors
+        vector_methods (dict): Aggregation method per vector name
+        Other parameters: See `aggregate_embeddings`
+
+    Returns:
+        tuple: (representative_embeddings, metadata_by_column) where each
+        representative embedding is a dict mapping vector names to vectors
+    """
+    names = list(vector_methods)
+    modes = {
+        name: _resolve_execution(execution, vector_method, expected_rows, workers)
+        for name, vector_method in vector_methods.items()
+    }
+    accumulators = {
+        name: make_accumulator(vector_methods[name], weights, trim_percentage, sample_size)
+        for name in names if modes[name] == "streaming"
+    }
+    buffers = {
+        name: _VectorBuffer(dtype, expected_rows)
+        for name in names if name not in accumulators
+    }
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    metadata = _MetadataCollector(concatenate_content, defer_content)
+    page_group_ids = []
+
+    for points in pages:
+        points = [
+            point for point in points
+            if isinstance(point.vector, dict) and all(name in point.vector for name in names)
+        ]
+        points, group_ids = groups.assign(points, key_of)
+        if not points:
+            continue
+        for name in names:
+            vectors = [point.vector[name] for point in points]
+            if name in accumulators:
+                accumulators[name].update(group_ids, np.asarray(vectors, dtype=dtype))
+            else:
+                buffers[name].append(vectors)
+        page_group_ids.append(group_ids)
+        for point, group_id in zip(points, group_ids.tolist()):
+            metadata.add(group_id, point.payload, point.id)
+
+    if page_group_ids:
+        group_ids = np.concatenate(page_group_ids)
+    else:
+        group_ids = np.zeros(0, dtype=np.int64)
+
+    aggregated = {}
+    for name in names:
+        if name in accumulators:
+            aggregated[name] = accumulators[name].finalize()
+        else:
+            aggregated[name] = _aggregate_matrix(
+                buffers[name].matrix(), group_ids, groups.keys, vector_methods[name],
+                modes[name], weights, trim_percentage, sample_size, workers, executor
+            )
+            # Release each matrix once its vector is aggregated
+            del buffers[name]
+
+    representative_embeddings = {
+        column_value: {name: aggregated[name][group_id] for name in names}
+        for group_id, column_value in enumerate(groups.keys)
+    }
+    return representative_embeddings, metadata.finalize(groups.keys)
+
+def _aggregate_methods(
+    pages, column_name, methods, execution="auto", weights=None, trim_percentage=0.1,
+    sample_size=None, workers=None, dtype=np.float32, expected_rows=0,
+    concatenate_content=True, defer_content=False, executor=None, instrumentation=None
+):
+    """
+    Aggregate the vectors of one scan with several methods.
+
+    Methods resolved to "streaming" fold each page into their accumulators; the
+    others share one collected matrix, sorted by group once. Methods with a
+    `shared` implementation reuse the intermediates cached on it (group means,
+    medians, unit-length rows), so e.g. median and tukeys_biweight compute the
+    group medians once.
+
+    Parameters:
+        pages (iterable): Pages of scrolled points
+        methods (list): Aggregation methods
+        Other parameters: See `aggregate_embeddings`
 
     Returns:
-        tuple: (embeddings_by_column, metadata_by_column, chunks_by_column)
+        tuple: (representative_embeddings, metadata_by_column) where each
+        representative embedding is a dict mapping method names to vectors
+    """
+    instrumentation = instrumentation or Instrumentation()
+    modes = {
+        method: _resolve_execution(execution, method, expected_rows, workers)
+        for method in methods
+    }
+    accumulators = {
+        method: make_accumulator(method, weights, trim_percentage, sample_size)
+        for method in methods if modes[method] == "streaming"
+    }
+    collected = [method for method in methods if method not in accumulators]
+    buffer = _VectorBuffer(dtype, expected_rows) if collected else None
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    metadata = _MetadataCollector(concatenate_content, defer_content)
+    page_group_ids = []
+
+    with instrumentation.stage('scan'):
+        for points in pages:
+            points, group_ids = groups.assign(points, key_of)
+            if not points:
+                continue
+            vectors = [point.vector for point in points]
+            if accumulators:
+                page_matrix = np.asarray(vectors, dtype=dtype)
+                for accumulator in accumulators.values():
+                    accumulator.update(group_ids, page_matrix)
+            if buffer is not None:
+                buffer.append(vectors)
+                page_group_ids.append(group_ids)
+            for point, group_id in zip(points, group_ids.tolist()):
+                metadata.add(group_id, point.payload, point.id)
+
+    aggregated = {}
+    for method, accumulator in accumulators.items():
+        with instrumentation.stage('aggregate', method=method, execution="streaming"):
+            aggregated[method] = accumulator.finalize()
+
+    if buffer is not None:
+        group_ids = np.concatenate(page_group_ids) if page_group_ids else np.zeros(0, dtype=np.int64)
+        shared = SharedGroups(buffer.matrix(), group_ids)
+        del buffer
+        for method in collected:
+            spec = get_method(method)
+            # An explicit process pool still parallelizes the method
+            use_shared = spec.shared is not None and modes[method] != "process_pool"
+            with instrumentation.stage(
+                'aggregate', method=method, execution="shared" if use_shared else modes[method]
+            ):
+                if use_shared:
+                    aggregated[method] = spec.shared(
+                        shared, **spec.option_kwargs(weights, trim_percentage, sample_size)
+                    )
+                else:
+                    aggregated[method] = _aggregate_matrix(
+                        shared.embeddings, shared.group_ids, groups.keys, method, modes[method],
+                        weights, trim_percentage, sample_size, workers, executor
+                    )
+
+    representative_embeddings = {
+        column_value: {method: aggregated[method][group_id] for method in methods}
+        for group_id, column_value in enumerate(groups.keys)
+    }
+    return representative_embeddings, metadata.finalize(groups.keys)
+
+def _scroll_pages(
+    client, collection_name, limit=100, with_payload=True, with_vectors=True, scroll_filter=None
+):
     """
-    embeddings_by_column = {}
-    chunks_by_column = {}  # Store all chunks with their metadata
+    Scroll through all points of a collection, one page at a time.
 
-    # Scroll through all points in the collection
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        limit (int): Number of points per page (default: 100)
+        with_payload: Payload selector passed to `client.scroll`
+        with_vectors: Vector selector passed to `client.scroll`
+        scroll_filter (Filter, optional): Only scroll the points matching this filter
+
+    Yields:
+        list: Points of the next page
+    """
     offset = None
-    limit = 100  # Batch size
 
     while True:
-        # Retrieve points
         points, next_offset = client.scroll(
             collection_name=collection_name,
+            scroll_filter=scroll_filter,
             limit=limit,
             offset=offset,
-            with_payload=True,
-            with_vectors=True
+            with_payload=with_payload,
+            with_vectors=with_vectors
         )
 
         if not points:
             break
 
-        # Process each point
-        for point in points:
-            payload = point.payload
-            vector = point.vector
-
-            # Handle nested metadata fields (e.g., "metadata.name")
-            column_value = None
-            if payload:
-                if '.' in column_name:
-                    # Handle nested fields like "metadata.name"
-                    parts = column_name.split('.')
-                    temp = payload
-                    for part in parts:
-                        if isinstance(temp, dict) and part in temp:
-                            temp = temp[part]
-                        else:
-                            temp = None
-                            break
-                    column_value = temp
-                elif column_name in payload:
-                    # Direct field access
-                    column_value = payload[column_name]
-
-            if column_value is not None:
-                if column_value not in embeddings_by_column:
-                    embeddings_by_column[column_value] = []
-                    chunks_by_column[column_value] = []
-
-                embeddings_by_column[column_value].append(vector)
-                chunks_by_column[column_value].append(payload)
+        yield points
 
         # Check if there are more points
         if next_offset is None:
             break
         offset = next_offset
 
-    # Convert lists to numpy arrays
-    import numpy as np
-    for column_value in embeddings_by_column:
-        embeddings_by_column[column_value] = np.array(embeddings_by_column[column_value])
+def _payload_selector(column_name, payload_fields=None, concatenate_content=True, defer_content=False):
+    """
+    Build the payload selector of the input scroll.
+
+    Every field is read when concatenating content without an include list.
+    Otherwise only the requested fields, the fields of the grouping key, the
+    ordering fields and (when concatenating during the scan) page_content are
+    transferred. Deferred content is fetched after the scan.
+    Callable grouping keys may read any field, so they get the full payload
+    unless `payload_fields` lists what they need.
+
+    Returns:
+        bool or list: `with_payload` argument of `client.scroll`
+    """
+    concatenate_content = concatenate_content and not defer_content
+    if payload_fields is None and concatenate_content:
+        return True
+    key_fields = grouping_fields(column_name)
+    if key_fields is None:
+        if payload_fields is None:
+            return True
+        key_fields = []
+    fields = list(payload_fields or []) + key_fields
+    fields += ORDERING_FIELDS + [f'metadata.{field}' for field in ORDERING_FIELDS]
+    if concatenate_content:
+        fields.append('page_content')
+    return list(dict.fromkeys(fields))
+
+def _iter_groups(matrix, group_ids, column_values):
+    """
+    Yield (column_value, embeddings) for each group of a collected matrix.
+
+    Each group is copied out of the matrix only when it is reached, so
+    aggregating group by group needs memory for the matrix plus one group.
+    Rows of a group keep their scroll order.
+    """
+    order = np.argsort(group_ids, kind="stable")
+    offsets = np.r_[0, np.cumsum(np.bincount(group_ids, minlength=len(column_values)))]
+    for group_id, column_value in enumerate(column_values):
+        yield column_value, matrix[order[offsets[group_id]:offsets[group_id + 1]]]
+
+def _collect_embedding_matrix(
+    client, collection_name, column_name, dtype=np.float32, pages=None, expected_rows=0,
+    concatenate_content=True, defer_content=False
+):
+    """
+    Collect all embeddings into one contiguous matrix with an integer group ID per row.
+
+    Each scrolled page is written in place into a preallocated buffer of the
+    target dtype (see `_VectorBuffer`).
 
-    # Create aggregated metadata with smart content handling
-    metadata_by_column = _create_aggregated_metadata(chunks_by_column)
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        column_name: Grouping spec (see `grouping.compile_grouping`)
+        dtype: Floating point type of the matrix (default: float32)
+        pages (iterable, optional): Pages of points to read instead of scrolling the collection
+        expected_rows (int): Initial buffer capacity, e.g. the collection's point count
+        concatenate_content (bool): Collect page_content for concatenation (default: True)
+        defer_content (bool): Collect chunk IDs for deferred content instead (default: False)
+
+    Returns:
+        tuple: (matrix, group_ids, column_values, metadata_by_column) where
+        row i of `matrix` belongs to group `group_ids[i]` and group g has the
+        column value `column_values[g]`
+    """
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    metadata = _MetadataCollector(concatenate_content, defer_content)
+    vectors = _VectorBuffer(dtype, expected_rows)
+    page_group_ids = []
+
+    if pages is None:
+        pages = _scroll_pages(client, collection_name)
+
+    for points in pages:
+        points, group_ids = groups.assign(points, key_of)
+        if not points:
+            continue
+        vectors.append([point.vector for point in points])
+        page_group_ids.append(group_ids)
+        for point, group_id in zip(points, group_ids.tolist()):
+            metadata.add(group_id, point.payload, point.id)
+
+    matrix = vectors.matrix()
+    if page_group_ids:
+        group_ids = np.concatenate(page_group_ids)
+    else:
+        group_ids = np.zeros(0, dtype=np.int64)
+
+    return matrix, group_ids, groups.keys, metadata.finalize(groups.keys)
+
+def _stream_embeddings_by_column(
+    client, collection_name, column_name, method, weights=None,
+    trim_percentage=0.1, sample_size=None, pages=None, concatenate_content=True,
+    defer_content=False, dtype=np.float32
+):
+    """
+    Aggregate embeddings in a single pass without materializing all chunk vectors.
+
+    Each scrolled page is folded into per-group running accumulators, and only
+    the lightweight pieces of each chunk payload needed for content
+    concatenation are kept.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        column_name: Grouping spec (see `grouping.compile_grouping`)
+        method (str): Streamable aggregation method
+        weights (list, optional): Weights for weighted_average method
+        trim_percentage (float): Fraction to trim for approx_trimmed_mean (default: 0.1)
+        sample_size (int, optional): Reservoir size of the approx_* methods
+        pages (iterable, optional): Pages of points to read instead of scrolling the collection
+        concatenate_content (bool): Collect page_content for concatenation (default: True)
+        defer_content (bool): Collect chunk IDs for deferred content instead (default: False)
+        dtype: Floating point type of each page handed to the accumulator (default: float32)
+
+    Returns:
+        tuple: (representative_embeddings, metadata_by_column)
+    """
+    accumulator = make_accumulator(method, weights, trim_percentage, sample_size)
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    metadata = _MetadataCollector(concatenate_content, defer_content)
+
+    if pages is None:
+        pages = _scroll_pages(client, collection_name)
+
+    for points in pages:
+        points, group_ids = groups.assign(points, key_of)
+        if not points:
+            continue
+        accumulator.update(group_ids, np.asarray([point.vector for point in points], dtype=dtype))
+        for point, group_id in zip(points, group_ids.tolist()):
+            metadata.add(group_id, point.payload, point.id)
+
+    aggregated = accumulator.finalize()
+    representative_embeddings = dict(zip(groups.keys, aggregated))
+
+    return representative_embeddings, metadata.finalize(groups.keys)
+
+# Possible ordering field names to check
+ORDERING_FIELDS = [
+    'chunk_index', 'chunk_number', 'chunk_id', 'chunk',
+    'page', 'page_number', 'page_num',
+    'sequence', 'seq', 'order', 'index', 'position',
+    'id'  # Check id last as it might not be sequential
+]
+
+def _find_ordering_field(chunk):
+    """
+    Find the ordering field of a chunk payload.
+
+    Parameters:
+        chunk (dict): Chunk payload
+
+    Returns:
+        str or tuple: Top-level field name, ('metadata', field) for nested fields, or None
+    """
+    for field in ORDERING_FIELDS:
+        # Check in top-level metadata
+        if field in chunk:
+            return field
+        # Check in nested metadata
+        if 'metadata' in chunk and isinstance(chunk['metadata'], dict):
+            if field in chunk['metadata']:
+                return ('metadata', field)
+    return None
+
+def _get_ordering_value(chunk, ordering_field):
+    """Get the ordering value of a chunk payload."""
+    if isinstance(ordering_field, tuple):
+        # Nested field
+        return chunk.get(ordering_field[0], {}).get(ordering_field[1])
+    # Top-level field
+    return chunk.get(ordering_field)
+
+def _build_group_metadata(
+    first_chunk, chunk_count, ordering_field, ordered_contents, concatenate_content=True
+):
+    """
+    Build the aggregated metadata of one group.
+
+    Parameters:
+        first_chunk (dict): Payload of the first chunk of the group
+        chunk_count (int): Number of chunks in the group
+        ordering_field (str or tuple): Detected ordering field, or None
+        ordered_contents (list): (order_value, page_content) pairs, used when
+            the group has an ordering field and page_content
+        concatenate_content (bool): Concatenate page_content (default: True)
+
+    Returns:
+        dict: Aggregated metadata
+    """
+    # Start with the first chunk's metadata as base
+    aggregated_meta = first_chunk.copy() if first_chunk else {}
+
+    # Add chunk statistics
+    aggregated_meta['chunk_count'] = chunk_count
+
+    # Handle page_content concatenation
+    if concatenate_content and ordering_field and 'page_content' in first_chunk:
+        try:
+            # Sort by ordering value
+            ordered_contents = sorted(ordered_contents, key=lambda x: x[0])
+
+            # Concatenate page_content in order
+            concatenated_content = [content for _, content in ordered_contents if content]
+
+            aggregated_meta['page_content'] = '\n\n'.join(concatenated_content)
+            aggregated_meta['has_ordered_content'] = True
+            aggregated_meta['ordering_field'] = ordering_field if isinstance(ordering_field, str) else '.'.join(ordering_field)
+
+        except Exception as e:
+            # If sorting fails, set empty content
+            aggregated_meta['page_content'] = ''
+            aggregated_meta['has_ordered_content'] = False
+            aggregated_meta['ordering_error'] = str(e)
+    else:
+        # No ordering field found, set empty content
+        aggregated_meta['page_content'] = ''
+        aggregated_meta['has_ordered_content'] = False
+
+    return aggregated_meta
+
+def _build_deferred_metadata(first_chunk, chunk_count, ordering_field, ordered_ids):
+    """
+    Build the aggregated metadata of one group whose content is fetched at upload.
 
-    return embeddings_by_column, metadata_by_column
+    Like `_build_group_metadata`, but instead of the concatenated page_content
+    the metadata holds the chunk IDs in ordering-field order under
+    `content.CONTENT_IDS_KEY`.
+    """
+    aggregated_meta = _build_group_metadata(first_chunk, chunk_count, None, [])
+    try:
+        ordered_ids = sorted(ordered_ids, key=lambda x: x[0])
+    except Exception as e:
+        aggregated_meta['ordering_error'] = str(e)
+        return aggregated_meta
+
+    aggregated_meta[CONTENT_IDS_KEY] = [chunk_id for _, chunk_id in ordered_ids]
+    aggregated_meta['has_ordered_content'] = True
+    aggregated_meta['ordering_field'] = ordering_field if isinstance(ordering_field, str) else '.'.join(ordering_field)
+    return aggregated_meta
+
+def _ordered_contents(chunks, ordering_field):
+    """Extract (order_value, page_content) pairs from chunks that have an ordering value."""
+    contents = []
+    for chunk in chunks:
+        order_val = _get_ordering_value(chunk, ordering_field)
+        if order_val is not None:
+            contents.append((order_val, chunk.get('page_content', '')))
+    return contents
 
 def _create_aggregated_metadata(chunks_by_column):
     """
@@ -165,74 +937,170 @@ def _create_aggregated_metadata(chunks_by_column):
     """
     metadata_by_column = {}
 
-    # Possible ordering field names to check
-    ordering_fields = [
-        'chunk_index', 'chunk_number', 'chunk_id', 'chunk',
-        'page', 'page_number', 'page_num',
-        'sequence', 'seq', 'order', 'index', 'position',
-        'id'  # Check id last as it might not be sequential
-    ]
-
     for column_value, chunks in chunks_by_column.items():
-        # Start with the first chunk's metadata as base
-        aggregated_meta = chunks[0].copy() if chunks else {}
-
-        # Add chunk statistics
-        aggregated_meta['chunk_count'] = len(chunks)
-
         # Try to find ordering field
-        ordering_field = None
-        for field in ordering_fields:
-            # Check in top-level metadata
-            if field in chunks[0]:
-                ordering_field = field
-                break
-            # Check in nested metadata
-            if 'metadata' in chunks[0] and isinstance(chunks[0]['metadata'], dict):
-                if field in chunks[0]['metadata']:
-                    ordering_field = ('metadata', field)
-                    break
-
-        # Handle page_content concatenation
+        ordering_field = _find_ordering_field(chunks[0])
+        contents = []
         if ordering_field and 'page_content' in chunks[0]:
-            try:
-                # Extract ordering values and sort chunks
-                chunks_with_order = []
-                for chunk in chunks:
-                    if isinstance(ordering_field, tuple):
-                        # Nested field
-                        order_val = chunk.get(ordering_field[0], {}).get(ordering_field[1])
-                    else:
-                        # Top-level field
-                        order_val = chunk.get(ordering_field)
-
-                    if order_val is not None:
-                        chunks_with_order.append((order_val, chunk))
-
-                # Sort by ordering value
-                chunks_with_order.sort(key=lambda x: x[0])
-
-                # Concatenate page_content in order
-                concatenated_content = []
-                for _, chunk in chunks_with_order:
-                    content = chunk.get('page_content', '')
-                    if content:
-                        concatenated_content.append(content)
-
-                aggregated_meta['page_content'] = '\n\n'.join(concatenated_content)
-                aggregated_meta['has_ordered_content'] = True
-                aggregated_meta['ordering_field'] = ordering_field if isinstance(ordering_field, str) else '.'.join(ordering_field)
-
-            except Exception as e:
-                # If sorting fails, set empty content
-                aggregated_meta['page_content'] = ''
-                aggregated_meta['has_ordered_content'] = False
-                aggregated_meta['ordering_error'] = str(e)
-        else:
-            # No ordering field found, set empty content
-            aggregated_meta['page_content'] = ''
-            aggregated_meta['has_ordered_content'] = False
+            contents = _ordered_contents(chunks, ordering_field)
 
-        metadata_by_column[column_value] = aggregated_meta
+        metadata_by_column[column_value] = _build_group_metadata(
+            chunks[0], len(chunks), ordering_field, contents
+        )
 
     return metadata_by_column
+
+class _MetadataCollector:
+    """
+    Incrementally collect the metadata needed by `_build_group_metadata`.
+
+    Keeps only the first payload, the chunk count and the (order, content)
+    pairs of each group rather than every chunk payload. Groups are addressed
+    by their integer ID (see `grouping.GroupIndex`), so the per-group state is
+    held in lists indexed by ID.
+
+    Parameters:
+        concatenate_content (bool): Collect page_content for concatenation (default: True)
+        defer_content (bool): Collect (order, chunk ID) pairs instead of content, to
+            be resolved at upload time (see `content.DeferredContent`) (default: False)
+    """
+
+    def __init__(self, concatenate_content=True, defer_content=False):
+        self.concatenate_content = concatenate_content
+        self.defer_content = concatenate_content and defer_content
+        self.first_chunks = []
+        self.counts = []
+        self.ordering_fields = []
+        self.contents = []
+        # Per-group counts and content lengths at the last `state_delta`
+        self._saved = ([], [])
+
+    def add(self, group_id, payload, point_id=None):
+        if group_id == len(self.first_chunks):
+            ordering_field = _find_ordering_field(payload)
+            self.first_chunks.append(payload)
+            self.counts.append(0)
+            self.ordering_fields.append(ordering_field)
+            # Deferred scans do not read page_content, so every ordered group is a candidate
+            concatenate = self.concatenate_content and ordering_field and (
+                self.defer_content or 'page_content' in payload
+            )
+            self.contents.append([] if concatenate else None)
+
+        self.counts[group_id] += 1
+        contents = self.contents[group_id]
+        if contents is not None:
+            if self.defer_content:
+                order_val = _get_ordering_value(payload, self.ordering_fields[group_id])
+                if order_val is not None:
+                    contents.append((order_val, point_id))
+            else:
+                contents.extend(_ordered_contents([payload], self.ordering_fields[group_id]))
+
+    def state_delta(self):
+        """
+        Export the metadata collected since the previous call as JSON-serializable rows.
+
+        Returns:
+            dict: `groups`, one [first_chunk, count, ordering_field, contents] row per
+            group first seen since the previous call, and `updates`, one
+            [group_id, added count, added contents] row per earlier group seen again
+        """
+        saved_counts, saved_lengths = self._saved
+        updates = []
+        for group_id, saved_count in enumerate(saved_counts):
+            added = self.counts[group_id] - saved_count
+            if added:
+                contents = self.contents[group_id]
+                updates.append([
+                    group_id, added,
+                    None if contents is None else contents[saved_lengths[group_id]:]
+                ])
+        known = len(saved_counts)
+        groups = [
+            list(row) for row in zip(
+                self.first_chunks[known:], self.counts[known:],
+                self.ordering_fields[known:], self.contents[known:]
+            )
+        ]
+        self._mark_saved()
+        return {'groups': groups, 'updates': updates}
+
+    def load_state_deltas(self, deltas):
+        """Restore the metadata from the deltas exported by `state_delta`, in order."""
+        for delta in deltas:
+            for first_chunk, count, ordering_field, contents in delta['groups']:
+                self.first_chunks.append(first_chunk)
+                self.counts.append(count)
+                # JSON turns the nested ('metadata', field) tuple into a list
+                self.ordering_fields.append(
+                    tuple(ordering_field) if isinstance(ordering_field, list) else ordering_field
+                )
+                self.contents.append(None if contents is None else [tuple(pair) for pair in contents])
+            for group_id, added, contents in delta['updates']:
+                self.counts[group_id] += added
+                if contents is not None:
+                    self.contents[group_id].extend(tuple(pair) for pair in contents)
+        self._mark_saved()
+
+    def _mark_saved(self):
+        self._saved = (
+            list(self.counts),
+            [len(contents) if contents is not None else 0 for contents in self.contents],
+        )
+
+    def finalize(self, column_values):
+        """Build the aggregated metadata, keyed by the group keys in ID order."""
+        metadata_by_column = {}
+        for group_id, column_value in enumerate(column_values):
+            ordering_field = self.ordering_fields[group_id]
+            contents = self.contents[group_id]
+            if self.defer_content and contents is not None:
+                meta = _build_deferred_metadata(
+                    self.first_chunks[group_id], self.counts[group_id], ordering_field, contents
+                )
+            else:
+                meta = _build_group_metadata(
+                    self.first_chunks[group_id],
+                    self.counts[group_id],
+                    ordering_field,
+                    contents or [],
+                    self.concatenate_content
+                )
+            metadata_by_column[column_value] = meta
+        return metadata_by_column
+
+class _VectorBuffer:
+    """
+    Growable, preallocated (n, D) matrix filled in place page by page.
+
+    Scrolled vectors are written straight into one contiguous buffer of the
+    target dtype instead of being kept as per-point lists and stacked at the
+    end. The buffer doubles when full, so appends are amortized O(1).
+    """
+
+    def __init__(self, dtype=np.float32, capacity=0):
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.size = 0
+        self.buffer = None
+
+    def append(self, vectors):
+        n = len(vectors)
+        if self.buffer is None:
+            dimension = len(vectors[0])
+            self.capacity = max(self.capacity, n, 1024)
+            self.buffer = np.empty((self.capacity, dimension), dtype=self.dtype)
+        elif self.size + n > self.capacity:
+            self.capacity = max(self.size + n, 2 * self.capacity)
+            grown = np.empty((self.capacity, self.buffer.shape[1]), dtype=self.dtype)
+            grown[:self.size] = self.buffer[:self.size]
+            self.buffer = grown
+        self.buffer[self.size:self.size + n] = vectors
+        self.size += n
+
+    def matrix(self):
+        """Return a view of the filled rows."""
+        if self.buffer is None:
+            return np.zeros((0, 0), dtype=self.dtype)
+        return self.buffer[:self.size]
@@ -0,0 +1,292 @@
+import asyncio
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, VectorParams, PointIdsList
+from .aggregator import _MetadataCollector, _VectorBuffer, _payload_selector
+from .grouping import GroupIndex, compile_grouping
+from .embedding_methods import calculate_embedding
+from .qdrant_collection_helpers import create_qdrant_batch, group_point_id
+from .streaming import make_accumulator, supports_streaming
+from .utils import client_kwargs, save_metadata, _is_transient_error
+from . import config
+
+_DONE = object()
+
+async def aggregate_embeddings_async(
+    input_collection_name,
+    column_name,
+    output_collection_name,
+    method="average",
+    weights=None,
+    trim_percentage=0.1,
+    sample_size=None,
+    qdrant_url=None,
+    api_key=None,
+    distance_metric=Distance.COSINE,
+    output_metadata_path=None,
+    client=None,
+    executor=None,
+    scroll_batch_size=100,
+    scroll_filter=None,
+    payload_fields=None,
+    concatenate_content=True,
+    upload_batch_size=100,
+    max_in_flight=4,
+    prefetch_pages=4,
+    deterministic_ids=False,
+    dtype=np.float32,
+    prefer_grpc=None
+):
+    """
+    Aggregate embeddings without blocking the event loop.
+
+    Scrolling input pages, computing group embeddings and upserting output
+    batches run as overlapping stages on an `AsyncQdrantClient`. CPU-heavy
+    work (folding pages, reductions, building points) runs in an executor.
+
+    Parameters:
+        input_collection_name (str): Name of the input Qdrant collection
+        column_name: Grouping spec (see `grouping.compile_grouping`)
+        output_collection_name (str): Name of the output Qdrant collection
+        method (str): Aggregation method (default: "average")
+        weights (list, optional): Weights for weighted_average method
+        trim_percentage (float): Fraction to trim for trimmed_mean (default: 0.1)
+        sample_size (int, optional): Rows sampled per group by the approx_* methods
+        qdrant_url (str, optional): URL of Qdrant server (default: from .env or "http://localhost:6333")
+        api_key (str, optional): API key for Qdrant Cloud (default: from .env)
+        distance_metric (Distance): Distance metric for the output collection (default: COSINE)
+        output_metadata_path (str, optional): Path to save aggregated metadata
+        client (AsyncQdrantClient, optional): Client to use instead of connecting to qdrant_url
+        executor (concurrent.futures.Executor, optional): Executor for CPU-bound work
+            (default: the event loop's default executor)
+        scroll_batch_size (int): Number of points fetched per scroll call (default: 100)
+        scroll_filter, payload_fields, concatenate_content: See `aggregate_embeddings`
+        upload_batch_size (int): Number of points per upsert call (default: 100)
+        max_in_flight (int): Maximum number of concurrent upsert calls (default: 4)
+        prefetch_pages (int): Maximum number of scrolled pages buffered ahead of compute (default: 4)
+        deterministic_ids (bool): Derive point IDs from the group key and update the
+            output collection in place instead of recreating it (default: False)
+        dtype: Floating point type of the vectors from read to upload (default: float32)
+        prefer_grpc (bool, optional): See `aggregate_embeddings`
+
+    Returns:
+        tuple: (output_collection_name, output_metadata_path)
+
+    Raises:
+        ValueError: If the input collection has no points to aggregate
+    """
+    own_client = client is None
+    if own_client:
+        client = AsyncQdrantClient(
+            url=qdrant_url or config.QDRANT_URL,
+            api_key=api_key if api_key is not None else config.QDRANT_API_KEY,
+            **client_kwargs(prefer_grpc=prefer_grpc)
+        )
+
+    try:
+        loop = asyncio.get_running_loop()
+
+        def run(func, *args):
+            return loop.run_in_executor(executor, func, *args)
+
+        # Stage 1 + 2: scroll pages while the previous page is folded in the executor
+        pages = asyncio.Queue(maxsize=prefetch_pages)
+        with_payload = _payload_selector(column_name, payload_fields, concatenate_content)
+        reader = asyncio.ensure_future(_read_pages(
+            client, input_collection_name, scroll_batch_size, pages, scroll_filter, with_payload
+        ))
+
+        state = _GroupState(
+            column_name, method, weights, trim_percentage, sample_size, dtype, concatenate_content
+        )
+        try:
+            while True:
+                points = await pages.get()
+                if points is _DONE:
+                    break
+                if isinstance(points, Exception):
+                    raise points
+                await run(state.add_page, points)
+        finally:
+            if not reader.done():
+                reader.cancel()
+        await reader
+
+        if state.dimension is None:
+            raise ValueError(f"No points to aggregate in collection '{input_collection_name}'.")
+
+        column_values = state.groups.keys
+        metadata_by_column = state.metadata.finalize(column_values)
+
+        # Stage 3: compute output batches in the executor while earlier batches upload
+        vectors_config = VectorParams(size=state.dimension, distance=distance_metric)
+        if not deterministic_ids:
+            await client.recreate_collection(
+                collection_name=output_collection_name, vectors_config=vectors_config
+            )
+        elif not await client.collection_exists(output_collection_name):
+            await client.create_collection(
+                collection_name=output_collection_name, vectors_config=vectors_config
+            )
+        id_namespace = output_collection_name if deterministic_ids else None
+
+        in_flight = asyncio.Semaphore(max_in_flight)
+        uploads = []
+        try:
+            for start in range(0, len(column_values), upload_batch_size):
+                batch_values = column_values[start:start + upload_batch_size]
+                points = await run(
+                    state.build_points, batch_values, metadata_by_column, id_namespace
+                )
+                await in_flight.acquire()
+                uploads.append(asyncio.ensure_future(
+                    _upsert(client, output_collection_name, points, in_flight)
+                ))
+            await asyncio.gather(*uploads)
+        finally:
+            for upload in uploads:
+                upload.cancel()
+
+        if deterministic_ids:
+            # Drop points of groups that no longer exist
+            keep_ids = {group_point_id(output_collection_name, value) for value in column_values}
+            await _delete_stale_points(client, output_collection_name, keep_ids)
+
+        # Save metadata if path provided
+        if output_metadata_path:
+            await run(save_metadata, metadata_by_column, output_metadata_path)
+    finally:
+        if own_client:
+            await client.close()
+
+    return output_collection_name, output_metadata_path
+
+async def _read_pages(client, collection_name, limit, pages, scroll_filter=None, with_payload=True):
+    """Scroll a collection and put each page on the queue, then `_DONE` or the raised error."""
+    offset = None
+    try:
+        while True:
+            points, next_offset = await client.scroll(
+                collection_name=collection_name,
+                scroll_filter=scroll_filter,
+                limit=limit,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=True
+            )
+            if points:
+                await pages.put(points)
+            if not points or next_offset is None:
+                break
+            offset = next_offset
+    except Exception as e:
+        await pages.put(e)
+        return
+    await pages.put(_DONE)
+
+async def _upsert(client, collection_name, points, in_flight, max_retries=3, retry_backoff=0.5):
+    """Upsert one batch, retrying transient errors with exponential backoff (see `utils.upload_points`)."""
+    try:
+        for attempt in range(max_retries + 1):
+            try:
+                return await client.upsert(collection_name=collection_name, points=points, wait=True)
+            except Exception as e:
+                if attempt == max_retries or not _is_transient_error(e):
+                    raise
+                await asyncio.sleep(retry_backoff * 2 ** attempt)
+    finally:
+        in_flight.release()
+
+async def _delete_stale_points(client, collection_name, keep_ids, batch_size=1000):
+    offset = None
+    while True:
+        points, next_offset = await client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False
+        )
+        stale_ids = [point.id for point in points if str(point.id) not in keep_ids]
+        if stale_ids:
+            await client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=stale_ids),
+                wait=True
+            )
+        if not points or next_offset is None:
+            break
+        offset = next_offset
+
+class _GroupState:
+    """
+    Per-group state built page by page.
+
+    Streamable methods fold every page into running accumulators; other
+    methods append the vectors to one contiguous buffer, which is sorted by
+    group once for the final reduction.
+    """
+
+    def __init__(
+        self, column_name, method, weights, trim_percentage=0.1, sample_size=None,
+        dtype=np.float32, concatenate_content=True
+    ):
+        self.key_of = compile_grouping(column_name)
+        self.method = method
+        self.weights = weights
+        self.trim_percentage = trim_percentage
+        self.sample_size = sample_size
+        self.dtype = dtype
+        self.metadata = _MetadataCollector(concatenate_content)
+        self.groups = GroupIndex()
+        self.dimension = None
+        self.accumulator = (
+            make_accumulator(method, weights, trim_percentage, sample_size)
+            if supports_streaming(method) else None
+        )
+        self.buffer = None if self.accumulator is not None else _VectorBuffer(dtype)
+        self.page_group_ids = []
+        self.order = None
+        self.offsets = None
+        self.aggregated = None
+
+    def add_page(self, points):
+        points, group_ids = self.groups.assign(points, self.key_of)
+        if not points:
+            return
+        vectors = [point.vector for point in points]
+        for point, group_id in zip(points, group_ids.tolist()):
+            self.metadata.add(group_id, point.payload, point.id)
+
+        self.dimension = len(vectors[0])
+        if self.accumulator is not None:
+            self.accumulator.update(group_ids, np.asarray(vectors, dtype=self.dtype))
+        else:
+            self.buffer.append(vectors)
+            self.page_group_ids.append(group_ids)
+
+    def build_points(self, column_values, metadata_by_column, id_namespace=None):
+        representative_embeddings = {}
+        if self.accumulator is not None:
+            if self.aggregated is None:
+                self.aggregated = self.accumulator.finalize()
+            for column_value in column_values:
+                representative_embeddings[column_value] = self.aggregated[
+                    self.groups.ids_by_key[column_value]
+                ]
+        else:
+            if self.order is None:
+                group_ids = np.concatenate(self.page_group_ids)
+                self.page_group_ids = None
+                self.order = np.argsort(group_ids, kind='stable')
+                self.offsets = np.r_[0, np.cumsum(np.bincount(group_ids, minlength=len(self.groups.keys)))]
+            matrix = self.buffer.matrix()
+            for column_value in column_values:
+                group_id = self.groups.ids_by_key[column_value]
+                embeddings = matrix[self.order[self.offsets[group_id]:self.offsets[group_id + 1]]]
+                representative_embeddings[column_value] = calculate_embedding(
+                    embeddings, self.method, self.weights, self.trim_percentage, self.sample_size
+                )
+        return create_qdrant_batch(
+            representative_embeddings, metadata_by_column, id_namespace, self.dtype
+        ).to_batch()
@@ -0,0 +1,253 @@
+"""
+Batch runner aggregating many collections, e.g. one per tenant.
+
+`aggregate_collections` runs a list of `aggregate_embeddings` jobs
+concurrently on shared resources:
+
+    - one Qdrant client, so all jobs reuse the same connection pool;
+    - an optional limit on the Qdrant requests in flight across all jobs;
+    - an optional memory budget: a job starts only once its estimated
+      vector memory fits next to the jobs already running;
+    - one process pool for jobs using the "process_pool" execution mode.
+
+A failed job does not stop the others; every job gets a summary.
+"""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from .aggregator import aggregate_embeddings
+from .instrumentation import Instrumentation
+from .utils import load_qdrant_collection, _is_local_client
+from . import config
+
+_JOB_FIELDS = ('input_collection_name', 'column_name', 'output_collection_name', 'method')
+
+
+def aggregate_collections(
+    jobs,
+    qdrant_url=None,
+    api_key=None,
+    client=None,
+    prefer_grpc=None,
+    max_concurrent_jobs=4,
+    max_in_flight_requests=None,
+    memory_limit_bytes=None,
+    workers=None,
+    hooks=(),
+    **defaults
+):
+    """
+    Run several aggregation jobs concurrently with shared connections and workers.
+
+    Example:
+        summaries = aggregate_collections(
+            [(f"{tenant}_chunks", "metadata.doc_id", f"{tenant}_docs") for tenant in tenants],
+            max_concurrent_jobs=8, max_in_flight_requests=32,
+            memory_limit_bytes=8 * 2**30, execution="batched", upload_batch_size=256
+        )
+        failed = [summary for summary in summaries if summary['status'] == 'failed']
+
+    Parameters:
+        jobs (list): Jobs as tuples (input_collection_name, column_name,
+            output_collection_name[, method]) or as dicts of
+            `aggregate_embeddings` arguments
+        qdrant_url (str, optional): URL of Qdrant server (default: from .env)
+        api_key (str, optional): API key for Qdrant Cloud (default: from .env)
+        client (QdrantClient, optional): Client shared by all jobs (default: one
+            client connected to qdrant_url). Jobs on a local-mode client run one
+            at a time, since its storage is not thread-safe
+        prefer_grpc (bool, optional): Connect the shared client over gRPC
+            (default: QDRANT_PREFER_GRPC; see `utils.client_kwargs`)
+        max_concurrent_jobs (int): Number of jobs running at once (default: 4)
+        max_in_flight_requests (int, optional): Maximum number of Qdrant requests
+            in progress across all jobs, including parallel scroll and upload
+            threads (default: no limit)
+        memory_limit_bytes (int, optional): Budget for the vectors held by running
+            jobs. A job's share is estimated from its point count and vector size;
+            a job estimated above the whole budget runs alone (default: no limit)
+        workers (int, optional): Size of a process pool shared by jobs using the
+            "process_pool" execution mode; also passed to each job so "auto" can
+            select that mode (default: no pool)
+        hooks (list, optional): Callables invoked as `hook(event, fields)` for the
+            instrumentation events of every job (see `instrumentation`), with the
+            job index added as `fields['job']`, plus a final "job_end" event
+            whose fields are the job summary
+        **defaults: `aggregate_embeddings` arguments applied to every job unless
+            the job sets them. An `instrumentation` is used as a template: each
+            job records into a new `Instrumentation` with its hooks, logger and
+            buckets, and the job's timings and counters are in its summary
+
+    Returns:
+        list: One summary dict per job, in job order, with the job's collections
+        and method, `status` ("ok" or "failed"), `error`, `seconds`, `queued_seconds`,
+        `estimated_bytes`, `counters` and `stages` (see `Instrumentation.summary`)
+    """
+    if max_concurrent_jobs < 1:
+        raise ValueError("max_concurrent_jobs must be at least 1.")
+    jobs = [_job_arguments(job, defaults) for job in jobs]
+
+    if client is None:
+        client = load_qdrant_collection(
+            None,
+            qdrant_url if qdrant_url is not None else config.QDRANT_URL,
+            api_key if api_key is not None else config.QDRANT_API_KEY,
+            prefer_grpc=prefer_grpc
+        )
+    if _is_local_client(client):
+        max_concurrent_jobs = 1
+    shared_client = client
+    if max_in_flight_requests is not None:
+        shared_client = _ThrottledClient(client, max_in_flight_requests)
+    budget = _MemoryBudget(memory_limit_bytes) if memory_limit_bytes is not None else None
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers is not None and workers > 1 else None
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="aggregation-job") as pool:
+            futures = [
+                pool.submit(
+                    _run_job, index, arguments, shared_client, budget, executor, workers, hooks
+                )
+                for index, arguments in enumerate(jobs)
+            ]
+            return [future.result() for future in futures]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _job_arguments(job, defaults):
+    """Normalize a job tuple or dict into `aggregate_embeddings` keyword arguments."""
+    if isinstance(job, dict):
+        arguments = dict(job)
+    else:
+        if not 3 <= len(job) <= 4:
+            raise ValueError(
+                "Jobs must be (input_collection_name, column_name, "
+                f"output_collection_name[, method]) tuples or dicts, got {job!r}"
+            )
+        arguments = dict(zip(_JOB_FIELDS, job))
+    missing = [field for field in _JOB_FIELDS[:3] if field not in arguments]
+    if missing:
+        raise ValueError(f"Job {job!r} is missing {', '.join(missing)}")
+    for key, value in defaults.items():
+        arguments.setdefault(key, value)
+    return arguments
+
+
+def _run_job(index, arguments, client, budget, executor, workers, hooks):
+    arguments = dict(arguments)
+    job_hooks = [
+        (lambda event, fields, hook=hook: hook(event, dict(fields, job=index)))
+        for hook in hooks
+    ]
+    # A given instrumentation (usually one of `defaults`) is only a template: each job
+    # records into its own, so jobs neither share counters nor stack their hooks
+    template = arguments.pop('instrumentation', None) or Instrumentation()
+    instrumentation = Instrumentation(
+        hooks=template.hooks + job_hooks, logger=template.logger, buckets=template.buckets
+    )
+    if workers is not None:
+        arguments.setdefault('workers', workers)
+
+    summary = {
+        'job': index,
+        'input_collection_name': arguments['input_collection_name'],
+        'output_collection_name': arguments['output_collection_name'],
+        'method': arguments.get('method', "average"),
+        'status': 'ok',
+        'error': None,
+        'estimated_bytes': None,
+    }
+    queued = time.perf_counter()
+    reserved = 0
+    try:
+        if budget is not None:
+            summary['estimated_bytes'] = _estimate_vector_bytes(client, arguments)
+            reserved = budget.acquire(summary['estimated_bytes'])
+        start = time.perf_counter()
+        summary['queued_seconds'] = start - queued
+        try:
+            aggregate_embeddings(
+                client=client, executor=executor, instrumentation=instrumentation, **arguments
+            )
+        finally:
+            summary['seconds'] = time.perf_counter() - start
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['error'] = f"{type(e).__name__}: {e}"
+        summary.setdefault('queued_seconds', time.perf_counter() - queued)
+        summary.setdefault('seconds', 0.0)
+    finally:
+        if budget is not None:
+            budget.release(reserved)
+
+    summary.update(instrumentation.summary())
+    for hook in job_hooks:
+        hook('job_end', summary)
+    return summary
+
+
+def _estimate_vector_bytes(client, arguments):
+    """
+    Rough size of the vectors a job holds: its point count times its vector size.
+
+    The collected matrix and one reordered copy of it are counted, which bounds
+    the "default", "batched" and "process_pool" modes; "streaming" and
+    "out_of_core" need less.
+    """
+    name = arguments['input_collection_name']
+    n_points = client.count(
+        collection_name=name, count_filter=arguments.get('scroll_filter'), exact=False
+    ).count
+    vectors = client.get_collection(name).config.params.vectors
+    if isinstance(vectors, dict):
+        names = arguments.get('named_vectors') or vectors
+        dimension = sum(vectors[vector_name].size for vector_name in names)
+    else:
+        dimension = vectors.size
+    itemsize = np.dtype(arguments.get('dtype', np.float32)).itemsize
+    return 2 * n_points * dimension * itemsize
+
+
+class _MemoryBudget:
+    """Counting budget of bytes; reservations larger than the budget wait for it to be free."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        """Block until `size` bytes fit; return the amount reserved."""
+        size = min(size, self.limit)
+        with self._condition:
+            self._condition.wait_for(lambda: self.used + size <= self.limit)
+            self.used += size
+        return size
+
+    def release(self, size):
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+class _ThrottledClient:
+    """Client proxy allowing at most `limit` concurrent calls of its methods."""
+
+    def __init__(self, client, limit):
+        if limit < 1:
+            raise ValueError("max_in_flight_requests must be at least 1.")
+        self._wrapped = client
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def __getattr__(self, name):
+        value = getattr(self._wrapped, name)
+        if name.startswith('_') or not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with self._slots:
+                return value(*args, **kwargs)
+
+        return call
@@ -0,0 +1,321 @@
+"""
+Checkpointed, resumable aggregation jobs.
+
+Progress of a job is persisted under `<checkpoint_dir>/<job_id>/`:
+
+    progress.json       settings, scroll offset, group keys, uploaded output rows
+    accumulator.npz     streaming accumulator state (one-pass methods)
+
+and, under `<checkpoint_dir>/<job_id>.segments/`:
+
+    metadata-<k>.json   append-only deltas of the per-group metadata needed
+                        for content concatenation
+    vectors-<k>.npy     append-only float32 vector segments and
+    group_ids-<k>.npy   their int64 group IDs (methods needing the full group)
+
+Vectors and accumulators are stored as raw NumPy binaries, never pickled.
+Each checkpoint is written to a temporary directory and swapped in, so a
+crash while saving leaves the previous checkpoint intact. Segments are never
+rewritten; a checkpoint only adds the segments of pages read since the
+previous one, and progress.json records how many of them are complete.
+"""
+import json
+import os
+import shutil
+import numpy as np
+from .aggregator import _MetadataCollector, _payload_selector
+from .content import DeferredContent
+from .grouping import GroupIndex, compile_grouping, describe_grouping, freeze_key
+from .embedding_methods import calculate_embedding
+from .qdrant_collection_helpers import create_qdrant_batch
+from .streaming import make_accumulator, supports_streaming
+from .utils import ensure_qdrant_collection, upload_points, delete_stale_points, _batch_at, _count_points
+
+CHECKPOINT_VERSION = 3
+
+
+class CheckpointStore:
+    """
+    Files of one job's checkpoint.
+
+    Parameters:
+        checkpoint_dir (str): Root directory of all job checkpoints
+        job_id (str): Job identifier; a restart with the same ID resumes the job
+    """
+
+    def __init__(self, checkpoint_dir, job_id):
+        self.path = os.path.join(checkpoint_dir, job_id)
+        self.segments_path = self.path + '.segments'
+        self.tmp_path = self.path + '.tmp'
+        self.old_path = self.path + '.old'
+
+    def load(self):
+        """
+        Load the last complete checkpoint.
+
+        Returns:
+            dict: Progress and accumulator arrays, or None if there is no checkpoint
+        """
+        path = self.path
+        if not os.path.exists(path) and os.path.exists(self.old_path):
+            # Crashed between swapping the old checkpoint out and the new one in
+            path = self.old_path
+        if not os.path.exists(path):
+            return None
+
+        with open(os.path.join(path, 'progress.json'), 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+        accumulator_state = None
+        accumulator_path = os.path.join(path, 'accumulator.npz')
+        if os.path.exists(accumulator_path):
+            with np.load(accumulator_path) as arrays:
+                accumulator_state = {name: arrays[name] for name in arrays.files}
+
+        return {
+            'progress': progress,
+            'accumulator_state': accumulator_state,
+        }
+
+    def save(self, progress, accumulator_state=None):
+        """Atomically replace the checkpoint."""
+        if os.path.exists(self.tmp_path):
+            shutil.rmtree(self.tmp_path)
+        os.makedirs(self.tmp_path)
+
+        with open(os.path.join(self.tmp_path, 'progress.json'), 'w', encoding='utf-8') as f:
+            json.dump(progress, f)
+        if accumulator_state is not None:
+            np.savez(os.path.join(self.tmp_path, 'accumulator.npz'), **accumulator_state)
+
+        if os.path.exists(self.path):
+            if os.path.exists(self.old_path):
+                shutil.rmtree(self.old_path)
+            os.rename(self.path, self.old_path)
+        os.rename(self.tmp_path, self.path)
+        if os.path.exists(self.old_path):
+            shutil.rmtree(self.old_path)
+
+    def save_progress(self, progress):
+        """Update only progress.json, e.g. after each acknowledged upload batch."""
+        progress_path = os.path.join(self.path, 'progress.json')
+        with open(progress_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(progress, f)
+        os.replace(progress_path + '.tmp', progress_path)
+
+    def write_segment(self, index, vectors, group_ids):
+        """Write one append-only segment of raw vectors and their group IDs."""
+        os.makedirs(self.segments_path, exist_ok=True)
+        np.save(os.path.join(self.segments_path, f'vectors-{index}.npy'), vectors)
+        np.save(os.path.join(self.segments_path, f'group_ids-{index}.npy'), group_ids)
+
+    def read_segments(self, n_segments):
+        """Read the first `n_segments` segments as (vectors, group_ids) pairs."""
+        for index in range(n_segments):
+            yield (
+                np.load(os.path.join(self.segments_path, f'vectors-{index}.npy')),
+                np.load(os.path.join(self.segments_path, f'group_ids-{index}.npy')),
+            )
+
+    def write_metadata_segment(self, index, delta):
+        """Write one append-only segment of metadata rows (see `_MetadataCollector.state_delta`)."""
+        os.makedirs(self.segments_path, exist_ok=True)
+        with open(os.path.join(self.segments_path, f'metadata-{index}.json'), 'w', encoding='utf-8') as f:
+            json.dump(delta, f)
+
+    def read_metadata_segments(self, n_segments):
+        """Read the first `n_segments` metadata segments."""
+        for index in range(n_segments):
+            with open(os.path.join(self.segments_path, f'metadata-{index}.json'), 'r', encoding='utf-8') as f:
+                yield json.load(f)
+
+    def remove(self):
+        for path in (self.path, self.segments_path, self.tmp_path, self.old_path):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+
+def run_checkpointed_job(
+    client,
+    job_id,
+    checkpoint_dir,
+    input_collection_name,
+    column_name,
+    output_collection_name,
+    method,
+    weights,
+    trim_percentage,
+    distance_metric,
+    sample_size=None,
+    scroll_batch_size=100,
+    scroll_filter=None,
+    payload_fields=None,
+    concatenate_content=True,
+    defer_content=False,
+    upload_batch_size=100,
+    checkpoint_every=100
+):
+    """
+    Run an aggregation job that can resume after a crash.
+
+    The input is scrolled sequentially; every `checkpoint_every` pages the
+    scroll offset and partial per-group state are checkpointed. Output points
+    get deterministic IDs and each acknowledged upload batch is recorded, so a
+    resumed job neither rescans finished pages nor duplicates points. The
+    checkpoint is removed once the job completes.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        job_id (str): Job identifier; a restart with the same ID resumes the job
+        checkpoint_dir (str): Root directory for job checkpoints
+        checkpoint_every (int): Number of scrolled pages between checkpoints (default: 100)
+        Other parameters: See `aggregate_embeddings`
+
+    Returns:
+        dict: Dictionary mapping column values to aggregated metadata
+    """
+    store = CheckpointStore(checkpoint_dir, job_id)
+    settings = {
+        'version': CHECKPOINT_VERSION,
+        'input_collection': input_collection_name,
+        'column_name': describe_grouping(column_name),
+        'output_collection': output_collection_name,
+        'method': method,
+        'weights': list(weights) if weights is not None else None,
+        'trim_percentage': trim_percentage,
+        'sample_size': sample_size,
+        'scroll_filter': repr(scroll_filter) if scroll_filter is not None else None,
+        'payload_fields': list(payload_fields) if payload_fields is not None else None,
+        'concatenate_content': concatenate_content,
+        'defer_content': defer_content,
+    }
+
+    streaming = supports_streaming(method)
+    accumulator = make_accumulator(method, weights, trim_percentage, sample_size) if streaming else None
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    metadata = _MetadataCollector(concatenate_content, defer_content)
+    with_payload = _payload_selector(column_name, payload_fields, concatenate_content, defer_content)
+    progress = {
+        'settings': settings,
+        'phase': 'scan',
+        'offset': None,
+        'pages': 0,
+        'segments': 0,
+        'metadata_segments': 0,
+        'group_keys': [],
+        'uploaded_rows': 0,
+    }
+
+    checkpoint = store.load()
+    if checkpoint is not None:
+        progress = checkpoint['progress']
+        if progress['settings'] != settings:
+            raise ValueError(
+                f"Checkpoint of job '{job_id}' was created with different settings; "
+                "use a new job_id or remove the checkpoint."
+            )
+        # JSON turns composite (tuple) group keys into lists
+        groups = GroupIndex(freeze_key(key) for key in progress['group_keys'])
+        metadata.load_state_deltas(store.read_metadata_segments(progress['metadata_segments']))
+        if streaming and checkpoint['accumulator_state'] is not None:
+            accumulator.load_state_dict(checkpoint['accumulator_state'])
+
+    def save_checkpoint(pending_vectors, pending_group_ids):
+        if not streaming and pending_vectors:
+            store.write_segment(
+                progress['segments'],
+                np.concatenate(pending_vectors),
+                np.concatenate(pending_group_ids)
+            )
+            progress['segments'] += 1
+        delta = metadata.state_delta()
+        if delta['groups'] or delta['updates']:
+            store.write_metadata_segment(progress['metadata_segments'], delta)
+            progress['metadata_segments'] += 1
+        progress['group_keys'] = list(groups.keys)
+        store.save(progress, accumulator.state_dict() if streaming else None)
+
+    # Scan phase: resume scrolling from the checkpointed offset
+    if progress['phase'] == 'scan':
+        pending_vectors = []
+        pending_group_ids = []
+        pages_since_checkpoint = 0
+        offset = progress['offset']
+
+        while True:
+            points, next_offset = client.scroll(
+                collection_name=input_collection_name,
+                scroll_filter=scroll_filter,
+                limit=scroll_batch_size,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=True
+            )
+
+            grouped_points, group_ids = groups.assign(points, key_of)
+            if grouped_points:
+                vectors = [point.vector for point in grouped_points]
+                if streaming:
+                    accumulator.update(group_ids, np.array(vectors))
+                else:
+                    pending_vectors.append(np.asarray(vectors, dtype=np.float32))
+                    pending_group_ids.append(group_ids)
+                for point, group_id in zip(grouped_points, group_ids.tolist()):
+                    metadata.add(group_id, point.payload, point.id)
+
+            progress['pages'] += 1
+            progress['offset'] = next_offset
+            pages_since_checkpoint += 1
+
+            if not points or next_offset is None:
+                progress['phase'] = 'upload'
+                save_checkpoint(pending_vectors, pending_group_ids)
+                break
+            if pages_since_checkpoint >= checkpoint_every:
+                save_checkpoint(pending_vectors, pending_group_ids)
+                pending_vectors = []
+                pending_group_ids = []
+                pages_since_checkpoint = 0
+            offset = next_offset
+
+    # Compute phase: rebuilt from the checkpoint on every (re)start
+    column_values = groups.keys
+    if streaming:
+        aggregated = accumulator.finalize()
+        representative_embeddings = dict(zip(column_values, aggregated))
+    else:
+        vectors_by_group = {}
+        for vectors, group_ids in store.read_segments(progress['segments']):
+            for group_id, vector in zip(group_ids, vectors):
+                vectors_by_group.setdefault(int(group_id), []).append(vector)
+        representative_embeddings = {
+            column_value: calculate_embedding(
+                np.array(vectors_by_group[group_id], dtype=np.float64),
+                method, weights, trim_percentage, sample_size
+            )
+            for group_id, column_value in enumerate(column_values)
+        }
+    metadata_by_column = metadata.finalize(column_values)
+
+    # Upload phase: skip rows acknowledged before a restart
+    points = create_qdrant_batch(
+        representative_embeddings, metadata_by_column, id_namespace=output_collection_name,
+        payload_loader=DeferredContent(client, input_collection_name) if defer_content else None
+    )
+    if column_values:
+        vector_size = len(next(iter(representative_embeddings.values())))
+        ensure_qdrant_collection(client, output_collection_name, vector_size, distance_metric)
+    # Acknowledged rows are not sliced at all, so their deferred content is not reloaded.
+    # The position is a row offset, so a resume may use another batch size
+    n_points = _count_points(points)
+    for start in range(progress['uploaded_rows'], n_points, upload_batch_size):
+        batch = _batch_at(points, start, upload_batch_size)
+        upload_points(client, output_collection_name, batch, batch_size=upload_batch_size, show_progress=False)
+        progress['uploaded_rows'] = min(start + upload_batch_size, n_points)
+        store.save_progress(progress)
+
+    if column_values:
+        delete_stale_points(client, output_collection_name, points.ids)
+    store.remove()
+
+    return metadata_by_column
@@ -1,21 +1,56 @@
 """
 Configuration module for loading environment variables.
+
+The .env file is read on first access of a setting rather than at import
+time, so importing the package stays cheap.
 """
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
 # Load .env file from the project root
 env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
 
-# Qdrant configuration
-QDRANT_URL = os.getenv('QDRANT_URL', 'http://localhost:6333')
-QDRANT_API_KEY = os.getenv('QDRANT_API_KEY', None)
+_settings = None
+
+_CONNECTION_SETTINGS = (
+    'QDRANT_PREFER_GRPC', 'QDRANT_GRPC_PORT', 'QDRANT_GRPC_COMPRESSION',
+    'QDRANT_KEEPALIVE', 'QDRANT_POOL_SIZE', 'QDRANT_TIMEOUT',
+)
+
+def _optional(value, convert):
+    """Convert an environment value; unset or empty means None."""
+    if value is None or value.strip() == '':
+        return None
+    return convert(value)
+
+def _load_settings():
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=env_path)
+
+    # Convert empty string to None for API key
+    api_key = os.getenv('QDRANT_API_KEY', None)
+    if api_key == '':
+        api_key = None
 
-# Convert empty string to None for API key
-if QDRANT_API_KEY == '':
-    QDRANT_API_KEY = None
+    return {
+        # Qdrant configuration
+        'QDRANT_URL': os.getenv('QDRANT_URL', 'http://localhost:6333'),
+        'QDRANT_API_KEY': api_key,
+        # Default distance metric
+        'DEFAULT_DISTANCE_METRIC': os.getenv('DEFAULT_DISTANCE_METRIC', 'COSINE'),
+        # Connection tuning (see `utils.client_kwargs`)
+        'QDRANT_PREFER_GRPC': os.getenv('QDRANT_PREFER_GRPC', '').strip().lower() in ('1', 'true', 'yes', 'on'),
+        'QDRANT_GRPC_PORT': _optional(os.getenv('QDRANT_GRPC_PORT'), int) or 6334,
+        'QDRANT_GRPC_COMPRESSION': _optional(os.getenv('QDRANT_GRPC_COMPRESSION'), str.lower),
+        'QDRANT_KEEPALIVE': _optional(os.getenv('QDRANT_KEEPALIVE'), float),
+        'QDRANT_POOL_SIZE': _optional(os.getenv('QDRANT_POOL_SIZE'), int),
+        'QDRANT_TIMEOUT': _optional(os.getenv('QDRANT_TIMEOUT'), int) or 120,
+    }
 
-# Default distance metric
-DEFAULT_DISTANCE_METRIC = os.getenv('DEFAULT_DISTANCE_METRIC', 'COSINE')
+def __getattr__(name):
+    global _settings
+    if name in ('QDRANT_URL', 'QDRANT_API_KEY', 'DEFAULT_DISTANCE_METRIC') + _CONNECTION_SETTINGS:
+        if _settings is None:
+            _settings = _load_settings()
+        return _settings[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,77 @@
+"""
+Deferred page_content concatenation.
+
+In two-phase aggregation the input scroll reads only IDs, grouping and
+ordering fields and vectors. The aggregated metadata of each group then holds
+the IDs of its chunks in ordering-field order under `CONTENT_IDS_KEY`, and
+`DeferredContent` fetches their page_content with batched `client.retrieve`
+calls only when the output batch containing the group is uploaded. Concatenated
+content is therefore held for one upload batch at a time rather than for the
+whole corpus.
+"""
+
+CONTENT_IDS_KEY = '_content_chunk_ids'
+
+
+class DeferredContent:
+    """
+    Payload loader filling in the page_content of deferred groups.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the input collection
+        batch_size (int): Number of chunks retrieved per call (default: 256)
+    """
+
+    def __init__(self, client, collection_name, batch_size=256):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+
+    def __call__(self, payloads):
+        """Return the payloads with deferred content resolved; the inputs are not modified."""
+        return [
+            self.load(payload) if CONTENT_IDS_KEY in payload else payload
+            for payload in payloads
+        ]
+
+    def load(self, payload):
+        payload = dict(payload)
+        chunk_ids = payload.pop(CONTENT_IDS_KEY)
+        contents = []
+        found = False
+
+        for start in range(0, len(chunk_ids), self.batch_size):
+            batch_ids = chunk_ids[start:start + self.batch_size]
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=batch_ids,
+                with_payload=['page_content'],
+                with_vectors=False
+            )
+            # Records come back in no particular order
+            content_by_id = {}
+            for record in records:
+                if record.payload and 'page_content' in record.payload:
+                    content_by_id[record.id] = record.payload['page_content']
+            found = found or bool(content_by_id)
+            contents.extend(content_by_id.get(chunk_id) for chunk_id in batch_ids)
+
+        if found:
+            payload['page_content'] = '\n\n'.join(content for content in contents if content)
+        else:
+            # Chunks without page_content: nothing to concatenate
+            payload['has_ordered_content'] = False
+            payload.pop('ordering_field', None)
+        return payload
+
+
+def without_content_ids(metadata_by_column):
+    """Return the aggregated metadata without the deferred chunk ID lists."""
+    return {
+        column_value: (
+            {key: value for key, value in meta.items() if key != CONTENT_IDS_KEY}
+            if CONTENT_IDS_KEY in meta else meta
+        )
+        for column_value, meta in metadata_by_column.items()
+    }
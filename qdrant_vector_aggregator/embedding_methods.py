@@ -1,217 +1,307 @@
-import numpy as np
-from scipy.stats import gmean, hmean
-from scipy.stats import entropy as scipy_entropy
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
-from scipy.spatial.distance import cdist
-
-def calculate_embedding(embeddings, method, weights=None, trim_percentage=0.1):
-    """
-    Aggregate embeddings using the specified method.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings with shape (n_samples, n_dimensions).
-        method (str): Aggregation method to use.
-        weights (np.ndarray, optional): Weights for weighted methods. Defaults to None.
-        trim_percentage (float, optional): Fraction to trim from each end for trimmed mean. Defaults to 0.1.
-
-    Returns:
-        np.ndarray: Aggregated embedding vector with shape (n_dimensions,).
-    """
-    if method == "average":
-        return np.mean(embeddings, axis=0)
-    elif method == "weighted_average":
-        if weights is not None:
-            return np.average(embeddings, axis=0, weights=weights)
-        else:
-            raise ValueError("Weights must be provided for weighted average.")
-    elif method == "median":
-        return np.median(embeddings, axis=0)
-    elif method == "geometric_mean":
-        return calculate_geometric_mean(embeddings)
-    elif method == "harmonic_mean":
-        return calculate_harmonic_mean(embeddings)
-    elif method == "trimmed_mean":
-        return calculate_trimmed_mean(embeddings, trim_percentage)
-    elif method == "centroid":
-        return calculate_centroid(embeddings)
-    elif method == "pca":
-        return calculate_pca(embeddings)
-    elif method == "exemplar":
-        return calculate_exemplar(embeddings)
-    elif method == "max_pooling":
-        return np.max(embeddings, axis=0)
-    elif method == "min_pooling":
-        return np.min(embeddings, axis=0)
-    elif method == "entropy_weighted_average":
-        return calculate_entropy_weighted_average(embeddings)
-    elif method == "attentive_pooling":
-        return calculate_attentive_pooling(embeddings)
-    elif method == "tukeys_biweight":
-        return calculate_tukeys_biweight(embeddings)
-    else:
-        raise ValueError(f"Unknown method: {method}")
-
-def calculate_geometric_mean(embeddings):
-    """
-    Calculate the geometric mean of embeddings.
-
-    Note:
-        Geometric mean is only defined for positive numbers.
-        This method will raise an error if embeddings contain non-positive values.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Geometric mean of embeddings.
-    """
-    if np.any(embeddings <= 0):
-        raise ValueError("Geometric mean is only defined for positive numbers.")
-    return gmean(embeddings, axis=0)
-
-def calculate_harmonic_mean(embeddings):
-    """
-    Calculate the harmonic mean of embeddings.
-
-    Note:
-        Harmonic mean is only defined for positive numbers.
-        This method will raise an error if embeddings contain non-positive values.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Harmonic mean of embeddings.
-    """
-    if np.any(embeddings <= 0):
-        raise ValueError("Harmonic mean is only defined for positive numbers.")
-    return hmean(embeddings, axis=0)
-
-def calculate_trimmed_mean(embeddings, trim_percentage):
-    """
-    Calculate the trimmed mean of embeddings.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-        trim_percentage (float): Fraction to trim from each end (0 <= trim_percentage < 0.5).
-
-    Returns:
-        np.ndarray: Trimmed mean of embeddings.
-    """
-    if not 0 <= trim_percentage < 0.5:
-        raise ValueError("trim_percentage must be between 0 and less than 0.5.")
-    n = embeddings.shape[0]
-    lower = int(n * trim_percentage)
-    upper = n - lower
-    if lower >= upper:
-        raise ValueError("Not enough data points to trim with the given trim_percentage.")
-    sorted_embeddings = np.sort(embeddings, axis=0)
-    trimmed_embeddings = sorted_embeddings[lower:upper]
-    return np.mean(trimmed_embeddings, axis=0)
-
-def calculate_centroid(embeddings):
-    """
-    Calculate the centroid of embeddings using KMeans clustering with one cluster.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Centroid of the embeddings.
-    """
-    kmeans = KMeans(n_clusters=1, random_state=0, n_init='auto').fit(embeddings)
-    return kmeans.cluster_centers_[0]
-
-def calculate_pca(embeddings):
-    """
-    Aggregate embeddings using PCA by projecting onto the first principal component.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Aggregated embedding vector reconstructed from the first principal component.
-    """
-    pca = PCA(n_components=1)
-    pca.fit(embeddings)
-    pc1 = pca.components_[0]  # First principal component
-    projections = embeddings @ pc1  # Project embeddings onto pc1
-    mean_projection = projections.mean()
-    aggregated_embedding = mean_projection * pc1  # Reconstruct the aggregated embedding
-    return aggregated_embedding
-
-def calculate_exemplar(embeddings):
-    """
-    Select the exemplar embedding that minimizes the average cosine distance to other embeddings.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Exemplar embedding.
-    """
-    distances = cdist(embeddings, embeddings, metric='cosine')
-    mean_distances = distances.mean(axis=1)
-    idx = np.argmin(mean_distances)
-    return embeddings[idx]
-
-def calculate_entropy_weighted_average(embeddings):
-    """
-    Calculate the entropy-weighted average of embeddings.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Aggregated embedding.
-    """
-    # Shift embeddings to positive values
-    min_val = embeddings.min()
-    shifted_embeddings = embeddings - min_val + 1e-6  # Ensure all values are positive
-    # Compute entropy along the feature dimension
-    entropies = scipy_entropy(shifted_embeddings.T)
-    # Normalize entropies to sum to 1
-    weights = entropies / entropies.sum()
-    return np.average(embeddings, axis=0, weights=weights)
-
-def calculate_attentive_pooling(embeddings):
-    """
-    Calculate the attentive pooling of embeddings.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Aggregated embedding.
-    """
-    mean_embedding = np.mean(embeddings, axis=0)
-    similarities = embeddings @ mean_embedding
-    exp_similarities = np.exp(similarities - np.max(similarities))  # For numerical stability
-    attention_weights = exp_similarities / exp_similarities.sum()
-    return np.sum(embeddings * attention_weights[:, np.newaxis], axis=0)
-
-def calculate_tukeys_biweight(embeddings):
-    """
-    Calculate Tukey's biweight of embeddings.
-
-    Parameters:
-        embeddings (np.ndarray): Array of embeddings.
-
-    Returns:
-        np.ndarray: Aggregated embedding.
-    """
-    median_embedding = np.median(embeddings, axis=0)
-    diff = embeddings - median_embedding
-    mad = np.median(np.abs(diff), axis=0)
-    mad[mad == 0] = 1e-6  # Avoid division by zero
-    u = diff / (9 * mad)
-    u2 = u ** 2
-    mask = u2 < 1
-    weights = (1 - u2) ** 2
-    weights[~mask] = 0
-    numerator = np.sum(embeddings * weights[:, np.newaxis], axis=0)
-    denominator = np.sum(weights)
-    if denominator == 0:
-        return median_embedding
-    return numerator / denominator
+import numpy as np
+
+# scipy is imported inside the methods that need it, so importing this module
+# (and the package) only loads NumPy
+
+# Default reservoir size of the approximate methods (see `sample_rows`)
+DEFAULT_SAMPLE_SIZE = 1024
+
+def calculate_embedding(embeddings, method, weights=None, trim_percentage=0.1, sample_size=None):
+    """
+    Aggregate embeddings using the specified method.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings with shape (n_samples, n_dimensions).
+        method (str): Aggregation method to use (see `registry.available_methods`).
+        weights (np.ndarray, optional): Weights for weighted methods. Defaults to None.
+        trim_percentage (float, optional): Fraction to trim from each end for trimmed mean. Defaults to 0.1.
+        sample_size (int, optional): Number of rows sampled by the approx_* methods.
+            Defaults to DEFAULT_SAMPLE_SIZE.
+
+    Returns:
+        np.ndarray: Aggregated embedding vector with shape (n_dimensions,).
+    """
+    from .registry import get_method
+    return get_method(method).compute(embeddings, weights, trim_percentage, sample_size)
+
+def calculate_average(embeddings):
+    """Calculate the mean of embeddings."""
+    return np.mean(embeddings, axis=0)
+
+def calculate_weighted_average(embeddings, weights=None):
+    """Calculate the weighted mean of embeddings; weight i applies to row i."""
+    if weights is None:
+        raise ValueError("Weights must be provided for weighted average.")
+    return np.average(embeddings, axis=0, weights=weights)
+
+def calculate_median(embeddings):
+    """Calculate the per-dimension median of embeddings."""
+    return np.median(embeddings, axis=0)
+
+def calculate_max_pooling(embeddings):
+    """Calculate the per-dimension maximum of embeddings."""
+    return np.max(embeddings, axis=0)
+
+def calculate_min_pooling(embeddings):
+    """Calculate the per-dimension minimum of embeddings."""
+    return np.min(embeddings, axis=0)
+
+def calculate_approx_median(embeddings, sample_size=None):
+    """Median of a uniform sample of rows (see `sample_rows`)."""
+    return np.median(sample_rows(embeddings, sample_size), axis=0)
+
+def calculate_approx_trimmed_mean(embeddings, trim_percentage=0.1, sample_size=None):
+    """Trimmed mean of a uniform sample of rows (see `sample_rows`)."""
+    return calculate_trimmed_mean(sample_rows(embeddings, sample_size), trim_percentage)
+
+def calculate_approx_tukeys_biweight(embeddings, sample_size=None):
+    """Tukey's biweight of a uniform sample of rows (see `sample_rows`)."""
+    return calculate_tukeys_biweight(sample_rows(embeddings, sample_size))
+
+def sample_rows(embeddings, sample_size=None, seed=0):
+    """
+    Draw a uniform random sample of rows without replacement.
+
+    Used by the approx_* methods: per-dimension quantiles of a uniform sample
+    of k rows are within rank error sqrt(ln(2 / delta) / (2 * k)) of the exact
+    quantiles with probability 1 - delta (Dvoretzky-Kiefer-Wolfowitz).
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+        sample_size (int, optional): Number of rows to keep. Defaults to DEFAULT_SAMPLE_SIZE.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        np.ndarray: The sampled rows, or all rows if there are at most sample_size.
+    """
+    if sample_size is None:
+        sample_size = DEFAULT_SAMPLE_SIZE
+    if embeddings.shape[0] <= sample_size:
+        return embeddings
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(embeddings.shape[0], size=sample_size, replace=False))
+    return embeddings[rows]
+
+def calculate_geometric_mean(embeddings):
+    """
+    Calculate the geometric mean of embeddings.
+
+    Note:
+        Geometric mean is only defined for positive numbers.
+        This method will raise an error if embeddings contain non-positive values.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+
+    Returns:
+        np.ndarray: Geometric mean of embeddings.
+    """
+    if np.any(embeddings <= 0):
+        raise ValueError("Geometric mean is only defined for positive numbers.")
+    from scipy.stats import gmean
+    return gmean(embeddings, axis=0)
+
+def calculate_harmonic_mean(embeddings):
+    """
+    Calculate the harmonic mean of embeddings.
+
+    Note:
+        Harmonic mean is only defined for positive numbers.
+        This method will raise an error if embeddings contain non-positive values.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+
+    Returns:
+        np.ndarray: Harmonic mean of embeddings.
+    """
+    if np.any(embeddings <= 0):
+        raise ValueError("Harmonic mean is only defined for positive numbers.")
+    from scipy.stats import hmean
+    return hmean(embeddings, axis=0)
+
+def calculate_trimmed_mean(embeddings, trim_percentage):
+    """
+    Calculate the trimmed mean of embeddings.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+        trim_percentage (float): Fraction to trim from each end (0 <= trim_percentage < 0.5).
+
+    Returns:
+        np.ndarray: Trimmed mean of embeddings.
+    """
+    if not 0 <= trim_percentage < 0.5:
+        raise ValueError("trim_percentage must be between 0 and less than 0.5.")
+    n = embeddings.shape[0]
+    lower = int(n * trim_percentage)
+    upper = n - lower
+    if lower >= upper:
+        raise ValueError("Not enough data points to trim with the given trim_percentage.")
+    sorted_embeddings = np.sort(embeddings, axis=0)
+    trimmed_embeddings = sorted_embeddings[lower:upper]
+    return np.mean(trimmed_embeddings, axis=0)
+
+def calculate_centroid(embeddings):
+    """
+    Calculate the centroid of embeddings.
+
+    A one-cluster K-Means converges to the arithmetic mean, so it is computed
+    directly.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+
+    Returns:
+        np.ndarray: Centroid of the embeddings.
+    """
+    return np.mean(embeddings, axis=0)
+
+def calculate_pca(embeddings):
+    """
+    Aggregate embeddings using PCA by projecting onto the first principal component.
+
+    The first principal component is the top right singular vector of the
+    centered embeddings. When there are fewer embeddings than dimensions it is
+    taken from the eigendecomposition of the small n x n Gram matrix instead.
+    The result does not depend on the sign of the component.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+
+    Returns:
+        np.ndarray: Aggregated embedding vector reconstructed from the first principal component.
+    """
+    pc1 = _first_principal_component(embeddings)
+    projections = embeddings @ pc1  # Project embeddings onto pc1
+    mean_projection = projections.mean()
+    aggregated_embedding = mean_projection * pc1  # Reconstruct the aggregated embedding
+    return aggregated_embedding
+
+def _first_principal_component(embeddings):
+    centered = embeddings - embeddings.mean(axis=0)
+    n_samples, n_dimensions = centered.shape
+    if n_samples < n_dimensions:
+        _, eigenvectors = np.linalg.eigh(centered @ centered.T)
+        pc1 = centered.T @ eigenvectors[:, -1]
+        norm = np.linalg.norm(pc1)
+        if norm > 0:
+            return pc1 / norm
+    _, _, vt = np.linalg.svd(centered, full_matrices=False)
+    return vt[0]
+
+def calculate_exemplar(embeddings, metric='cosine', top_k=None, block_size=1024):
+    """
+    Select the exemplar embedding that minimizes the average distance to other embeddings.
+
+    For cosine (and squared Euclidean) distance the mean distance of every row
+    to all rows is computed in linear time from the normalized vectors and their
+    sum, without building the n x n distance matrix. Other metrics fall back to
+    a blocked distance computation holding only block_size x n distances at once.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+        metric (str, optional): Any scipy.spatial.distance.cdist metric. Defaults to 'cosine'.
+        top_k (int, optional): Return the k most central embeddings instead of one. Defaults to None.
+        block_size (int, optional): Rows per block for the blocked fallback. Defaults to 1024.
+
+    Returns:
+        np.ndarray: Exemplar embedding, or array of shape (top_k, n_dimensions)
+        ordered from most to least central when top_k is given.
+    """
+    mean_distances = _mean_distances(embeddings, metric, block_size)
+    if top_k is None:
+        return embeddings[np.argmin(mean_distances)]
+    order = np.argsort(mean_distances, kind='stable')[:top_k]
+    return embeddings[order]
+
+def _mean_distances(embeddings, metric, block_size):
+    """Mean distance of every row to all rows (including itself)."""
+    n = embeddings.shape[0]
+    if metric == 'cosine':
+        return _mean_cosine_distances(_unit_rows(embeddings))
+    if metric == 'sqeuclidean':
+        # mean_j |x_i - x_j|^2 = |x_i|^2 - 2 x_i . mean(x) + mean_j |x_j|^2
+        squared_norms = np.einsum('ij,ij->i', embeddings, embeddings)
+        return squared_norms - 2.0 * embeddings @ embeddings.mean(axis=0) + squared_norms.mean()
+
+    from scipy.spatial.distance import cdist
+    mean_distances = np.empty(n)
+    for start in range(0, n, block_size):
+        block = embeddings[start:start + block_size]
+        mean_distances[start:start + len(block)] = cdist(block, embeddings, metric=metric).mean(axis=1)
+    return mean_distances
+
+def _unit_rows(embeddings):
+    """Rows scaled to unit length; zero rows stay zero."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.divide(embeddings, norms, out=np.zeros(embeddings.shape), where=norms > 0)
+
+def _mean_cosine_distances(unit):
+    # mean_j (1 - u_i . u_j) = 1 - u_i . (sum_j u_j) / n for unit vectors u
+    return 1.0 - unit @ (unit.sum(axis=0) / unit.shape[0])
+
+def calculate_entropy_weighted_average(embeddings):
+    """
+    Calculate the entropy-weighted average of embeddings.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+
+    Returns:
+        np.ndarray: Aggregated embedding.
+    """
+    # Shift embeddings to positive values
+    min_val = embeddings.min()
+    shifted_embeddings = embeddings - min_val + 1e-6  # Ensure all values are positive
+    from scipy.stats import entropy as scipy_entropy
+    # Compute entropy along the feature dimension
+    entropies = scipy_entropy(shifted_embeddings.T)
+    # Normalize entropies to sum to 1
+    weights = entropies / entropies.sum()
+    return np.average(embeddings, axis=0, weights=weights)
+
+def calculate_attentive_pooling(embeddings):
+    """
+    Calculate the attentive pooling of embeddings.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+
+    Returns:
+        np.ndarray: Aggregated embedding.
+    """
+    mean_embedding = np.mean(embeddings, axis=0)
+    similarities = embeddings @ mean_embedding
+    exp_similarities = np.exp(similarities - np.max(similarities))  # For numerical stability
+    attention_weights = exp_similarities / exp_similarities.sum()
+    return np.sum(embeddings * attention_weights[:, np.newaxis], axis=0)
+
+def calculate_tukeys_biweight(embeddings):
+    """
+    Calculate Tukey's biweight of embeddings.
+
+    Parameters:
+        embeddings (np.ndarray): Array of embeddings.
+
+    Returns:
+        np.ndarray: Aggregated embedding.
+    """
+    return _tukeys_biweight(embeddings, np.median(embeddings, axis=0))
+
+def _tukeys_biweight(embeddings, median_embedding):
+    """Tukey's biweight given the per-dimension median of the embeddings."""
+    diff = embeddings - median_embedding
+    mad = np.median(np.abs(diff), axis=0)
+    mad[mad == 0] = 1e-6  # Avoid division by zero
+    u = diff / (9 * mad)
+    u2 = u ** 2
+    mask = u2 < 1
+    weights = (1 - u2) ** 2
+    weights[~mask] = 0
+    # Weights are per element, so each dimension gets its own weighted mean
+    numerator = np.sum(embeddings * weights, axis=0)
+    denominator = np.sum(weights, axis=0)
+    zero = denominator == 0
+    denominator[zero] = 1
+    return np.where(zero, median_embedding, numerator / denominator)
@@ -0,0 +1,240 @@
+"""
+Out-of-core external group-by.
+
+Scrolled vectors are appended to a raw file on disk together with a group-ID
+column. After the scan, rows are reordered by group with a bucketed external
+sort: one sequential pass partitions them by group-ID range into bucket
+files, then each bucket is sorted in memory and appended to the sorted file.
+Each group is handed to `calculate_embedding` as a zero-copy `np.memmap`
+slice of that file. Of the vectors, only one bucket at a time lives in RAM,
+next to the per-row index arrays (16 bytes per chunk), so exact methods such
+as `median`, `trimmed_mean`, `tukeys_biweight` and `exemplar` work on
+collections larger than memory. The collected metadata still holds every
+chunk's page_content unless `defer_content` is set.
+"""
+import glob
+import os
+import shutil
+import tempfile
+import numpy as np
+from .aggregator import _MetadataCollector
+from .grouping import GroupIndex, compile_grouping
+from .embedding_methods import calculate_embedding
+
+# Bucket files open at once while partitioning
+_MAX_BUCKETS = 256
+
+
+class SpilledEmbeddings:
+    """
+    Embeddings spilled to memory-mapped files, sorted by group.
+
+    Parameters:
+        spill_dir (str, optional): Directory for the spill files (default: a new temporary directory)
+        dtype: Floating point type of the spilled vectors (default: float32)
+        sort_block_rows (int): Number of rows read per block when partitioning (default: 65536)
+        sort_memory_bytes (int): Target size of a bucket sorted in memory; a group
+            larger than this gets a bucket of its own, which is copied through
+            without loading it (default: 256 MiB)
+    """
+
+    def __init__(self, spill_dir=None, dtype=np.float32, sort_block_rows=65536, sort_memory_bytes=256 * 2**20):
+        self._owns_dir = spill_dir is None
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="qdrant-aggregator-")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.sort_block_rows = sort_block_rows
+        self.sort_memory_bytes = sort_memory_bytes
+        self.dimension = None
+        self.n_rows = 0
+        self.vectors = None
+        self.offsets = None
+        self._vectors_path = os.path.join(self.spill_dir, "vectors.raw")
+        self._group_ids_path = os.path.join(self.spill_dir, "group_ids.raw")
+        self._sorted_path = os.path.join(self.spill_dir, "vectors.sorted.raw")
+        self._vectors_file = open(self._vectors_path, "wb")
+        self._group_ids_file = open(self._group_ids_path, "wb")
+
+    def append(self, vectors, group_ids):
+        """
+        Append a batch of vectors and their group IDs to the spill files.
+
+        Parameters:
+            vectors (array-like): Batch of vectors, shape (n, n_dimensions)
+            group_ids (array-like): Integer group ID of each vector, shape (n,)
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Vector dimension mismatch: expected {self.dimension}, got {vectors.shape[1]}."
+            )
+        self._vectors_file.write(vectors.tobytes())
+        self._group_ids_file.write(np.ascontiguousarray(group_ids, dtype=np.int64).tobytes())
+        self.n_rows += vectors.shape[0]
+
+    def sort(self):
+        """
+        Reorder the spilled rows by group into a new memory-mapped file.
+
+        Rows of a group keep their append order. Both passes read and write
+        the spill files sequentially. The unsorted file is deleted afterwards.
+        """
+        self._vectors_file.close()
+        self._group_ids_file.close()
+        if self.n_rows == 0:
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        group_ids = np.fromfile(self._group_ids_path, dtype=np.int64)
+        self.offsets = np.r_[0, np.cumsum(np.bincount(group_ids))].astype(np.int64)
+        bounds = self._bucket_bounds()
+        bucket_paths = [
+            os.path.join(self.spill_dir, f"bucket-{bucket}.raw") for bucket in range(len(bounds) - 1)
+        ]
+
+        # Pass 1: partition the rows by group-ID range, appending to one file per bucket
+        source = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(self.n_rows, self.dimension))
+        bucket_files = [open(path, "wb") for path in bucket_paths]
+        try:
+            for start in range(0, self.n_rows, self.sort_block_rows):
+                stop = min(start + self.sort_block_rows, self.n_rows)
+                buckets = np.searchsorted(bounds, group_ids[start:stop], side="right") - 1
+                order = np.argsort(buckets, kind="stable")
+                block = source[start:stop][order]
+                splits = np.searchsorted(buckets[order], np.arange(1, len(bucket_paths)))
+                for bucket, rows in enumerate(np.split(block, splits)):
+                    if len(rows):
+                        bucket_files[bucket].write(rows.tobytes())
+        finally:
+            for f in bucket_files:
+                f.close()
+        del source
+        os.remove(self._vectors_path)
+        os.remove(self._group_ids_path)
+
+        # Group IDs of every bucket's rows, in the order they were appended
+        row_buckets = np.searchsorted(bounds, group_ids, side="right") - 1
+        bucketed_ids = group_ids[np.argsort(row_buckets, kind="stable")]
+        del group_ids, row_buckets
+
+        # Pass 2: sort each bucket in memory and append it to the sorted file
+        with open(self._sorted_path, "wb") as target:
+            for bucket, path in enumerate(bucket_paths):
+                first_group, end_group = bounds[bucket], bounds[bucket + 1]
+                if end_group - first_group == 1:
+                    # A single group is already in append order
+                    with open(path, "rb") as f:
+                        shutil.copyfileobj(f, target)
+                else:
+                    ids = bucketed_ids[self.offsets[first_group]:self.offsets[end_group]]
+                    rows = np.fromfile(path, dtype=self.dtype).reshape(-1, self.dimension)
+                    target.write(rows[np.argsort(ids, kind="stable")].tobytes())
+                    del rows
+                os.remove(path)
+
+        self.vectors = np.memmap(self._sorted_path, dtype=self.dtype, mode="r", shape=(self.n_rows, self.dimension))
+
+    def _bucket_bounds(self):
+        """
+        First group ID of every bucket, plus the number of groups.
+
+        Buckets hold at most about twice `bucket_rows` rows, except that every
+        group larger than `bucket_rows` is a bucket of its own.
+        """
+        n_groups = len(self.offsets) - 1
+        row_bytes = self.dimension * self.dtype.itemsize
+        bucket_rows = max(1, self.sort_memory_bytes // row_bytes, -(-self.n_rows // _MAX_BUCKETS))
+        # Start a new bucket at the group in progress at every multiple of bucket_rows
+        cuts = np.searchsorted(self.offsets, np.arange(bucket_rows, self.n_rows, bucket_rows), side="right") - 1
+        # and around every oversized group, so it is streamed rather than loaded
+        oversized = np.flatnonzero(np.diff(self.offsets) > bucket_rows)
+        return np.unique(np.r_[0, cuts, oversized, oversized + 1, n_groups])
+
+    def group(self, group_id):
+        """
+        Zero-copy view of one group's vectors.
+
+        Parameters:
+            group_id (int): Group ID
+
+        Returns:
+            np.memmap: Array of shape (n_group_rows, n_dimensions)
+        """
+        return self.vectors[self.offsets[group_id]:self.offsets[group_id + 1]]
+
+    def close(self):
+        """Release the memory maps and delete the spill files."""
+        for f in (self._vectors_file, self._group_ids_file):
+            if not f.closed:
+                f.close()
+        self.vectors = None
+        if self._owns_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        else:
+            bucket_paths = glob.glob(os.path.join(self.spill_dir, "bucket-*.raw"))
+            for path in [self._vectors_path, self._group_ids_path, self._sorted_path] + bucket_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def aggregate_out_of_core(
+    pages,
+    column_name,
+    method,
+    weights=None,
+    trim_percentage=0.1,
+    sample_size=None,
+    spill_dir=None,
+    dtype=np.float32,
+    concatenate_content=True,
+    defer_content=False
+):
+    """
+    Aggregate pages of points with an external, disk-backed group-by.
+
+    Parameters:
+        pages (iterable): Pages of points (e.g. from `_scroll_pages`)
+        column_name: Grouping spec (see `grouping.compile_grouping`)
+        method (str): Aggregation method
+        weights (list, optional): Weights for weighted_average method
+        trim_percentage (float): Fraction to trim for trimmed_mean (default: 0.1)
+        sample_size (int, optional): Rows sampled per group by the approx_* methods
+        spill_dir (str, optional): Directory for the spill files (default: a temporary directory)
+        dtype: Floating point type of the spilled vectors (default: float32)
+        concatenate_content (bool): Collect page_content for concatenation (default: True)
+        defer_content (bool): Collect chunk IDs for deferred content instead (default: False)
+
+    Returns:
+        tuple: (representative_embeddings, metadata_by_column)
+    """
+    key_of = compile_grouping(column_name)
+    groups = GroupIndex()
+    metadata = _MetadataCollector(concatenate_content, defer_content)
+
+    with SpilledEmbeddings(spill_dir, dtype) as spilled:
+        for points in pages:
+            points, group_ids = groups.assign(points, key_of)
+            if not points:
+                continue
+            spilled.append([point.vector for point in points], group_ids)
+            for point, group_id in zip(points, group_ids.tolist()):
+                metadata.add(group_id, point.payload, point.id)
+
+        spilled.sort()
+
+        representative_embeddings = {}
+        for group_id, column_value in enumerate(groups.keys):
+            # Copy the result: methods such as exemplar return a view into the map
+            representative_embeddings[column_value] = np.array(calculate_embedding(
+                spilled.group(group_id), method, weights, trim_percentage, sample_size
+            ), dtype=np.float64)
+
+    return representative_embeddings, metadata.finalize(groups.keys)
@@ -0,0 +1,207 @@
+"""
+Vectorized aggregation of many groups at once.
+
+Instead of calling `calculate_embedding` once per group, these functions take
+one contiguous (N, D) matrix plus an integer group ID per row and reduce every
+group with segment-reduction primitives (`np.add.reduceat`,
+`np.maximum.reduceat`, ...) over rows sorted by group ID.
+
+`SharedGroups` holds the sorted matrix together with per-group intermediates
+(means, medians, unit-length rows) computed on first use, so several methods
+aggregated from the same matrix share them (see the `shared` capability of
+`registry.AggregationMethod`).
+"""
+import numpy as np
+
+
+def calculate_grouped_embeddings(embeddings, group_ids, method, weights=None):
+    """
+    Aggregate all groups of a matrix with the specified method.
+
+    Parameters:
+        embeddings (np.ndarray): Matrix of embeddings with shape (n_samples, n_dimensions).
+        group_ids (np.ndarray): Integer group ID of each row, shape (n_samples,).
+        method (str): Aggregation method to use.
+        weights (np.ndarray, optional): Per-row weights for weighted_average, shape (n_samples,).
+
+    Returns:
+        np.ndarray: Matrix of shape (n_groups, n_dimensions), one row per distinct
+        group ID in ascending order. With group IDs 0..G-1, row g is group g.
+    """
+    from .registry import get_method
+    spec = get_method(method)
+    if not spec.batched:
+        raise ValueError(f"Method '{method}' has no grouped implementation.")
+
+    embeddings = np.ascontiguousarray(embeddings)
+    group_ids = np.asarray(group_ids)
+    if embeddings.ndim != 2 or group_ids.shape != (embeddings.shape[0],):
+        raise ValueError("embeddings must be (n_samples, n_dimensions) with one group ID per row.")
+    if embeddings.shape[0] == 0:
+        return np.zeros((0, embeddings.shape[1]))
+
+    # Sort rows by group so every group is one contiguous segment
+    order = None
+    if np.any(group_ids[1:] < group_ids[:-1]):
+        order = np.argsort(group_ids, kind="stable")
+        embeddings = embeddings[order]
+        group_ids = group_ids[order]
+        if weights is not None:
+            weights = np.asarray(weights)[order]
+
+    starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(group_ids)])
+
+    return spec.grouped(embeddings, starts, counts, weights)
+
+
+def per_row_weights(group_ids, weights):
+    """
+    Expand per-chunk weights into one weight per row.
+
+    Weight i applies to the i-th row of each group in row order. As with
+    `np.average`, every group must have exactly `len(weights)` rows.
+
+    Parameters:
+        group_ids (np.ndarray): Integer group ID of each row
+        weights (list): Weights for the chunks of a group
+
+    Returns:
+        np.ndarray: Weight of each row, shape (n_samples,)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    group_ids = np.asarray(group_ids)
+    order = np.argsort(group_ids, kind="stable")
+    sorted_ids = group_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_ids)])
+    if np.any(counts != len(weights)):
+        raise ValueError(
+            "Length of weights not compatible with the number of chunks in a group."
+        )
+    positions = np.empty(len(group_ids), dtype=np.int64)
+    positions[order] = np.arange(len(sorted_ids)) - np.repeat(starts, counts)
+    return weights[positions]
+
+
+# Segment reductions over rows sorted by group: group g is
+# embeddings[starts[g]:starts[g] + counts[g]], weights hold one weight per row
+
+def segment_mean(embeddings, starts, counts, weights=None):
+    sums = np.add.reduceat(embeddings, starts, axis=0, dtype=np.float64)
+    return sums / counts[:, np.newaxis]
+
+
+def segment_weighted_mean(embeddings, starts, counts, weights=None):
+    if weights is None:
+        raise ValueError("Weights must be provided for weighted average.")
+    weights = np.asarray(weights, dtype=np.float64)
+    weight_sums = np.add.reduceat(weights, starts)
+    if np.any(weight_sums == 0):
+        raise ZeroDivisionError("Weights sum to zero, can't be normalized")
+    weighted_sums = np.add.reduceat(embeddings * weights[:, np.newaxis], starts, axis=0)
+    return weighted_sums / weight_sums[:, np.newaxis]
+
+
+def segment_max(embeddings, starts, counts, weights=None):
+    return np.maximum.reduceat(embeddings, starts, axis=0).astype(np.float64)
+
+
+def segment_min(embeddings, starts, counts, weights=None):
+    return np.minimum.reduceat(embeddings, starts, axis=0).astype(np.float64)
+
+
+def segment_attentive_pooling(embeddings, starts, counts, weights=None):
+    return _attentive_pooling(embeddings, starts, counts, segment_mean(embeddings, starts, counts))
+
+
+def _attentive_pooling(embeddings, starts, counts, means):
+    segment_index = np.repeat(np.arange(len(starts)), counts)
+    # Similarity of every row to the mean of its own group
+    similarities = np.einsum("ij,ij->i", embeddings, means[segment_index])
+    # Subtract the per-group maximum for numerical stability
+    exp_similarities = np.exp(similarities - np.maximum.reduceat(similarities, starts)[segment_index])
+    attention_weights = exp_similarities / np.add.reduceat(exp_similarities, starts)[segment_index]
+    return np.add.reduceat(embeddings * attention_weights[:, np.newaxis], starts, axis=0)
+
+
+class SharedGroups:
+    """
+    Rows of a matrix sorted by group, with intermediates shared between methods.
+
+    Parameters:
+        embeddings (np.ndarray): Matrix of embeddings with shape (n_samples, n_dimensions)
+        group_ids (np.ndarray): Integer group ID of each row, in [0, n_groups),
+            where every group has at least one row
+    """
+
+    def __init__(self, embeddings, group_ids):
+        group_ids = np.asarray(group_ids, dtype=np.int64)
+        # Rows of a group keep their original order
+        order = np.argsort(group_ids, kind="stable")
+        self.embeddings = np.ascontiguousarray(np.asarray(embeddings)[order])
+        self.group_ids = group_ids[order]
+        self.counts = np.bincount(self.group_ids)
+        self.starts = np.cumsum(self.counts) - self.counts
+        # Intermediates, computed on first use
+        self._means = None
+        self._medians = None
+        self._unit_rows = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    def group(self, group_id):
+        """Rows of one group, as a view."""
+        start = self.starts[group_id]
+        return self.embeddings[start:start + self.counts[group_id]]
+
+    @property
+    def means(self):
+        if self._means is None:
+            self._means = segment_mean(self.embeddings, self.starts, self.counts)
+        return self._means
+
+    @property
+    def medians(self):
+        if self._medians is None:
+            self._medians = np.array([np.median(self.group(g), axis=0) for g in range(len(self))])
+        return self._medians
+
+    @property
+    def unit_rows(self):
+        if self._unit_rows is None:
+            from .embedding_methods import _unit_rows
+            self._unit_rows = _unit_rows(self.embeddings)
+        return self._unit_rows
+
+
+# Implementations over SharedGroups: each returns shape (n_groups, D)
+
+def shared_mean(groups):
+    return groups.means
+
+
+def shared_median(groups):
+    return groups.medians
+
+
+def shared_attentive_pooling(groups):
+    return _attentive_pooling(groups.embeddings, groups.starts, groups.counts, groups.means)
+
+
+def shared_tukeys_biweight(groups):
+    from .embedding_methods import _tukeys_biweight
+    return np.array([
+        _tukeys_biweight(groups.group(g), groups.medians[g]) for g in range(len(groups))
+    ])
+
+
+def shared_exemplar(groups):
+    from .embedding_methods import _mean_cosine_distances
+    exemplars = []
+    for g in range(len(groups)):
+        start, stop = groups.starts[g], groups.starts[g] + groups.counts[g]
+        mean_distances = _mean_cosine_distances(groups.unit_rows[start:stop])
+        exemplars.append(groups.embeddings[start + np.argmin(mean_distances)])
+    return np.array(exemplars)
@@ -0,0 +1,283 @@
+"""
+Group key specs compiled into payload extractors.
+
+A grouping spec says how the group key of a point is derived from its payload:
+
+    "metadata.doc_id"                         one field; dots separate nested keys
+    "metadata.authors[0].name"                fields inside lists, by index
+    ("metadata.tenant", "metadata.doc_id")    several fields; the key is a tuple
+    DateBucket("metadata.created_at", "month")  a derived key
+    lambda payload: ...                       any callable returning a hashable key
+
+`compile_grouping` parses the spec once into a plain function applied to
+every payload. Keys are interned by a `GroupIndex` into compact integer IDs
+(0, 1, 2, ... in order of first appearance), so per-group state downstream is
+indexed by ID rather than keyed by payload values.
+"""
+import re
+from datetime import datetime, timezone
+import numpy as np
+
+_MISSING = object()
+_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+
+class Field:
+    """
+    A payload field addressed by a path such as "metadata.authors[0].name".
+
+    Parameters:
+        path (str): Dot-separated keys, with `[i]` to index into lists
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.steps = _parse_path(path)
+
+    def __repr__(self):
+        return f"Field({self.path!r})"
+
+
+class DateBucket:
+    """
+    Derived key: the date or timestamp in a field, truncated to a calendar bucket.
+
+    Values may be ISO 8601 strings or Unix timestamps in seconds. Points whose
+    value is missing or cannot be parsed get no group.
+
+    Parameters:
+        path (str): Field holding the date (see `Field`)
+        unit (str): "year", "month", "week" (ISO week), "day" or "hour" (default: "day")
+    """
+
+    FORMATS = {
+        'year': '%Y',
+        'month': '%Y-%m',
+        'week': '%G-W%V',
+        'day': '%Y-%m-%d',
+        'hour': '%Y-%m-%dT%H',
+    }
+
+    def __init__(self, path, unit="day"):
+        if unit not in self.FORMATS:
+            raise ValueError(f"Unknown date bucket unit: {unit}")
+        self.field = Field(path)
+        self.unit = unit
+
+    def __repr__(self):
+        return f"DateBucket({self.field.path!r}, {self.unit!r})"
+
+
+def compile_grouping(spec):
+    """
+    Compile a grouping spec into a key extractor.
+
+    Parameters:
+        spec: Field path, `Field`, `DateBucket`, callable, or a tuple/list of these
+
+    Returns:
+        callable: `key_of(payload)` returning a hashable group key, or None if
+        the point has no group (a field is missing)
+    """
+    if isinstance(spec, (tuple, list)):
+        if not spec:
+            raise ValueError("A grouping spec needs at least one field.")
+        extractors = tuple(compile_grouping(part) for part in spec)
+
+        def key_of(payload):
+            key = tuple(extract(payload) for extract in extractors)
+            return None if None in key else key
+
+        return key_of
+
+    if isinstance(spec, str):
+        spec = Field(spec)
+
+    if isinstance(spec, Field):
+        return _compile_field(spec.steps)
+
+    if isinstance(spec, DateBucket):
+        get_value = _compile_field(spec.field.steps)
+        date_format = DateBucket.FORMATS[spec.unit]
+
+        def key_of(payload):
+            value = _parse_datetime(get_value(payload))
+            return None if value is None else value.strftime(date_format)
+
+        return key_of
+
+    if callable(spec):
+        return lambda payload: _freeze(spec(payload)) if payload else None
+
+    raise TypeError(f"Unsupported grouping spec: {spec!r}")
+
+
+def field_path(spec):
+    """Return the dotted path of a spec that is a single plain field, else None."""
+    if isinstance(spec, str):
+        spec = Field(spec)
+    if isinstance(spec, Field) and all(isinstance(step, str) for step in spec.steps):
+        return spec.path
+    return None
+
+
+def grouping_fields(spec):
+    """
+    Return the payload fields a grouping spec reads, for payload projection.
+
+    List indices are dropped, so "metadata.authors[0].name" reads the whole
+    "metadata.authors" field.
+
+    Returns:
+        list: Dotted payload paths, or None for callables, which may read any field
+    """
+    if isinstance(spec, (tuple, list)):
+        fields = [grouping_fields(part) for part in spec]
+        if None in fields:
+            return None
+        return [field for part in fields for field in part]
+    if isinstance(spec, str):
+        spec = Field(spec)
+    if isinstance(spec, DateBucket):
+        spec = spec.field
+    if isinstance(spec, Field):
+        names = []
+        for step in spec.steps:
+            if not isinstance(step, str):
+                break
+            names.append(step)
+        return ['.'.join(names)] if names else None
+    return None
+
+
+def describe_grouping(spec):
+    """
+    Return a JSON-serializable description of a grouping spec.
+
+    Used to recognize the same spec across runs, e.g. in job checkpoints.
+    Callables are described by their qualified name.
+    """
+    if isinstance(spec, (tuple, list)):
+        return [describe_grouping(part) for part in spec]
+    if isinstance(spec, str):
+        return spec
+    if isinstance(spec, Field):
+        return spec.path
+    if isinstance(spec, DateBucket):
+        return {'date_bucket': spec.field.path, 'unit': spec.unit}
+    return f"{getattr(spec, '__module__', '')}.{getattr(spec, '__qualname__', repr(spec))}"
+
+
+class GroupIndex:
+    """
+    Interns group keys to compact integer IDs in order of first appearance.
+
+    Parameters:
+        keys (iterable, optional): Keys to intern upfront, e.g. from a checkpoint
+    """
+
+    def __init__(self, keys=()):
+        self.ids_by_key = {}
+        self.keys = []
+        for key in keys:
+            self.intern(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def intern(self, key):
+        """Return the ID of `key`, assigning the next free ID to a new key."""
+        group_id = self.ids_by_key.get(key)
+        if group_id is None:
+            group_id = self.ids_by_key[key] = len(self.keys)
+            self.keys.append(key)
+        return group_id
+
+    def assign(self, points, key_of):
+        """
+        Group one page of points.
+
+        Parameters:
+            points (list): Points with a `payload` attribute
+            key_of (callable): Compiled key extractor (see `compile_grouping`)
+
+        Returns:
+            tuple: (grouped_points, group_ids) with the points that have a group
+            key and their group IDs as an int64 array
+        """
+        grouped_points = []
+        group_ids = []
+        intern = self.intern
+        for point in points:
+            key = key_of(point.payload)
+            if key is not None:
+                grouped_points.append(point)
+                group_ids.append(intern(key))
+        return grouped_points, np.asarray(group_ids, dtype=np.int64)
+
+
+def freeze_key(key):
+    """Restore a group key decoded from JSON (lists back to tuples)."""
+    return _freeze(key)
+
+
+def _parse_path(path):
+    steps = []
+    for part in path.split('.'):
+        tokens = _PATH_TOKEN.findall(part)
+        if not tokens or ''.join(
+            name if name else f'[{index}]' for name, index in tokens
+        ) != part:
+            raise ValueError(f"Invalid field path: {path!r}")
+        for name, index in tokens:
+            steps.append(name if name else int(index))
+    return tuple(steps)
+
+
+def _compile_field(steps):
+    if len(steps) == 1 and isinstance(steps[0], str):
+        name = steps[0]
+
+        def key_of(payload):
+            return _freeze(payload.get(name)) if payload else None
+
+        return key_of
+
+    def key_of(payload):
+        value = payload
+        for step in steps:
+            if isinstance(step, str):
+                if not isinstance(value, dict):
+                    return None
+                value = value.get(step, _MISSING)
+            else:
+                if not isinstance(value, list) or step >= len(value):
+                    return None
+                value = value[step]
+            if value is _MISSING or value is None:
+                return None
+        return _freeze(value)
+
+    return key_of
+
+
+def _freeze(value):
+    """Make list and dict values usable as dictionary keys."""
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def _parse_datetime(value):
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, OverflowError, OSError):
+        return None
+    return None
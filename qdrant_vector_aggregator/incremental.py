@@ -0,0 +1,336 @@
+"""
+Incremental re-aggregation.
+
+A local JSON state file records, for every group, the chunk IDs (and their
+version field values, if any) seen on the last run together with a content
+hash. Each run scans only IDs and the grouping/version fields, diffs them
+against the state, re-aggregates the new and changed groups and deletes the
+output points of groups that disappeared. Output point IDs are derived from
+the group key (see `group_point_id`), so upserts replace the previous points.
+
+The state file stores every chunk ID of the input collection, so it grows
+linearly with the collection (roughly the size of the ID, version and JSON
+quoting per chunk) and is read and rewritten in full on every run.
+
+A run without a usable state file (the first one, or after a state format
+change) recomputes every group and then deletes every other point of the
+output collection, e.g. the random-ID points of an earlier full aggregation.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from qdrant_client.models import (
+    Distance, Filter, FieldCondition, MatchAny, MatchValue, PointIdsList, Range
+)
+from .aggregator import _scroll_pages, _create_aggregated_metadata
+from .embedding_methods import calculate_embedding
+from .grouping import compile_grouping, describe_grouping, field_path, freeze_key
+from .qdrant_collection_helpers import create_qdrant_batch, group_point_id
+from .utils import load_qdrant_collection, upload_points, ensure_qdrant_collection, delete_stale_points
+from . import config
+
+STATE_VERSION = 1
+
+def aggregate_embeddings_incremental(
+    input_collection_name,
+    column_name,
+    output_collection_name,
+    state_path,
+    method="average",
+    weights=None,
+    trim_percentage=0.1,
+    sample_size=None,
+    version_field=None,
+    qdrant_url=None,
+    api_key=None,
+    distance_metric=Distance.COSINE,
+    client=None,
+    scroll_batch_size=100,
+    upload_batch_size=100,
+    groups_per_fetch=64,
+    dtype=np.float32,
+    prefer_grpc=None
+):
+    """
+    Re-aggregate only the groups whose chunks changed since the last run.
+
+    Without a usable state file every group is recomputed, and any output point
+    that is not one of the groups' points is deleted, so an output collection
+    written by an earlier full aggregation holds no duplicates afterwards.
+
+    Parameters:
+        input_collection_name (str): Name of the input Qdrant collection
+        column_name (str or tuple): Payload field by which to aggregate embeddings,
+            or a tuple of fields grouping by their combination. Affected groups
+            are fetched with a payload filter, so each field must be a plain
+            dotted path (no list indices, derived keys or callables)
+        output_collection_name (str): Name of the output Qdrant collection
+        state_path (str): Path of the local JSON state file; it lists every
+            chunk ID, so its size grows linearly with the input collection
+        method (str): Aggregation method (default: "average")
+        weights (list, optional): Weights for weighted_average method
+        trim_percentage (float): Fraction to trim for trimmed_mean (default: 0.1)
+        sample_size (int, optional): Rows sampled per group by the approx_* methods
+        version_field (str, optional): Payload field (e.g., "metadata.updated_at")
+            that changes whenever a chunk is modified. Without it, only added
+            and removed chunk IDs are detected
+        qdrant_url (str, optional): URL of Qdrant server (default: from .env or "http://localhost:6333")
+        api_key (str, optional): API key for Qdrant Cloud (default: from .env)
+        distance_metric (Distance): Distance metric for the output collection (default: COSINE)
+        client (QdrantClient, optional): Client to use instead of connecting to qdrant_url
+        scroll_batch_size (int): Number of points fetched per scroll call (default: 100)
+        upload_batch_size (int): Number of points per upsert call (default: 100)
+        groups_per_fetch (int): Number of affected groups fetched per filtered scroll (default: 64)
+        dtype: Floating point type of the vectors from read to upload (default: float32)
+        prefer_grpc (bool, optional): See `aggregate_embeddings`
+
+    Returns:
+        dict: Number of `new`, `changed`, `deleted` and `unchanged` groups
+    """
+    filter_fields = _filter_fields(column_name)
+
+    if client is None:
+        client = load_qdrant_collection(
+            input_collection_name,
+            qdrant_url or config.QDRANT_URL,
+            api_key if api_key is not None else config.QDRANT_API_KEY,
+            prefer_grpc=prefer_grpc
+        )
+
+    settings = {
+        'input_collection': input_collection_name,
+        'column_name': describe_grouping(column_name),
+        'output_collection': output_collection_name,
+        'method': method,
+        'weights': list(weights) if weights is not None else None,
+        'trim_percentage': trim_percentage,
+        'sample_size': sample_size,
+        'version_field': version_field,
+    }
+    previous_groups = _load_state(state_path, settings)
+
+    # Cheap pass: IDs plus the grouping and version fields only
+    current_groups = _scan_chunk_versions(
+        client, input_collection_name, column_name, filter_fields, version_field, scroll_batch_size
+    )
+
+    previous_hashes = {key: group['hash'] for key, group in previous_groups.items()}
+    current_hashes = {key: _group_hash(chunks) for key, chunks in current_groups.items()}
+    new_keys = [key for key in current_hashes if key not in previous_hashes]
+    changed_keys = [
+        key for key, group_hash in current_hashes.items()
+        if key in previous_hashes and previous_hashes[key] != group_hash
+    ]
+    deleted_keys = [key for key in previous_hashes if key not in current_hashes]
+
+    # Re-aggregate affected groups, a few groups per filtered scroll
+    affected = [freeze_key(json.loads(key)) for key in new_keys + changed_keys]
+    for start in range(0, len(affected), groups_per_fetch):
+        column_values = affected[start:start + groups_per_fetch]
+        embeddings_by_column, chunks_by_column = _fetch_groups(
+            client, input_collection_name, column_name, filter_fields, column_values,
+            scroll_batch_size, dtype
+        )
+        if not embeddings_by_column:
+            continue
+
+        representative_embeddings = {
+            column_value: calculate_embedding(
+                embeddings, method, weights, trim_percentage, sample_size
+            )
+            for column_value, embeddings in embeddings_by_column.items()
+        }
+        metadata_by_column = _create_aggregated_metadata(chunks_by_column)
+
+        vector_size = len(next(iter(representative_embeddings.values())))
+        ensure_qdrant_collection(client, output_collection_name, vector_size, distance_metric)
+        points = create_qdrant_batch(
+            representative_embeddings, metadata_by_column,
+            id_namespace=output_collection_name, dtype=dtype
+        )
+        upload_points(
+            client, output_collection_name, points,
+            batch_size=upload_batch_size, show_progress=False
+        )
+
+    # Without a state, the output may hold points of an earlier full run under other IDs
+    if not previous_groups and client.collection_exists(output_collection_name):
+        delete_stale_points(client, output_collection_name, [
+            group_point_id(output_collection_name, freeze_key(json.loads(key))) for key in current_hashes
+        ])
+
+    # Remove output points of groups that no longer exist
+    if deleted_keys and client.collection_exists(output_collection_name):
+        client.delete(
+            collection_name=output_collection_name,
+            points_selector=PointIdsList(points=[
+                group_point_id(output_collection_name, freeze_key(json.loads(key))) for key in deleted_keys
+            ]),
+            wait=True
+        )
+
+    _save_state(state_path, settings, {
+        key: {'count': len(chunks), 'hash': current_hashes[key], 'chunks': chunks}
+        for key, chunks in current_groups.items()
+    })
+
+    return {
+        'new': len(new_keys),
+        'changed': len(changed_keys),
+        'deleted': len(deleted_keys),
+        'unchanged': len(current_hashes) - len(new_keys) - len(changed_keys),
+    }
+
+def _filter_fields(column_name):
+    """
+    Return the payload fields of a grouping spec that can be matched by a filter.
+
+    Raises:
+        ValueError: If the spec is not a plain field path or a tuple of them
+    """
+    parts = column_name if isinstance(column_name, (tuple, list)) else [column_name]
+    fields = [field_path(part) for part in parts]
+    if not fields or None in fields:
+        raise ValueError(
+            "Incremental aggregation needs a payload field or a tuple of payload "
+            f"fields to group by, got {column_name!r}."
+        )
+    return fields
+
+def _scan_chunk_versions(client, collection_name, column_name, filter_fields, version_field, limit):
+    """
+    Scan chunk IDs and versions grouped by column value.
+
+    Returns:
+        dict: JSON-encoded column value -> {chunk ID (str): version}
+    """
+    key_of = compile_grouping(column_name)
+    version_of = compile_grouping(version_field) if version_field else None
+    fields = filter_fields + ([version_field] if version_field else [])
+    groups = {}
+
+    for points in _scroll_pages(
+        client, collection_name, limit=limit, with_payload=fields, with_vectors=False
+    ):
+        for point in points:
+            column_value = key_of(point.payload)
+            if column_value is None:
+                continue
+            version = version_of(point.payload) if version_of else None
+            key = json.dumps(column_value, sort_keys=True)
+            groups.setdefault(key, {})[str(point.id)] = version
+
+    return groups
+
+def _group_hash(chunks):
+    """Content hash of a group over its sorted chunk IDs and versions."""
+    digest = hashlib.sha1()
+    for chunk_id in sorted(chunks):
+        digest.update(json.dumps([chunk_id, chunks[chunk_id]], default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+def _fetch_groups(
+    client, collection_name, column_name, filter_fields, column_values, limit, dtype=np.float32
+):
+    """Fetch the vectors and payloads of the given groups with a filtered scroll."""
+    key_of = compile_grouping(column_name)
+    if len(filter_fields) == 1:
+        values_by_field = [column_values]
+    else:
+        # The filter matches every combination of the requested field values;
+        # points of other groups are dropped below
+        values_by_field = [
+            list({column_value[i] for column_value in column_values})
+            for i in range(len(filter_fields))
+        ]
+    scroll_filter = Filter(must=[
+        _match_values(field, values) for field, values in zip(filter_fields, values_by_field)
+    ])
+    requested = set(column_values)
+    embeddings_by_column = {}
+    chunks_by_column = {}
+    offset = None
+
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=limit,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        for point in points:
+            column_value = key_of(point.payload)
+            if column_value not in requested:
+                continue
+            embeddings_by_column.setdefault(column_value, []).append(point.vector)
+            chunks_by_column.setdefault(column_value, []).append(point.payload)
+        if not points or next_offset is None:
+            break
+        offset = next_offset
+
+    embeddings_by_column = {
+        column_value: np.array(vectors, dtype=dtype) for column_value, vectors in embeddings_by_column.items()
+    }
+    return embeddings_by_column, chunks_by_column
+
+def _match_values(field, values):
+    """
+    Build a condition matching any of the given values of a payload field.
+
+    MatchAny only takes strings or integers of one type, so booleans are
+    matched one by one and floats by a closed range on the value.
+
+    Raises:
+        ValueError: If a value is not a string, integer, boolean or float
+    """
+    strings, integers, conditions = [], [], []
+    for value in values:
+        if isinstance(value, bool):
+            conditions.append(FieldCondition(key=field, match=MatchValue(value=value)))
+        elif isinstance(value, int):
+            integers.append(value)
+        elif isinstance(value, str):
+            strings.append(value)
+        elif isinstance(value, float):
+            conditions.append(FieldCondition(key=field, range=Range(gte=value, lte=value)))
+        else:
+            raise ValueError(
+                f"Incremental aggregation can only filter groups by string, integer, boolean "
+                f"or float values of '{field}', got {value!r}."
+            )
+    for group in (strings, integers):
+        if group:
+            conditions.append(FieldCondition(key=field, match=MatchAny(any=group)))
+    return conditions[0] if len(conditions) == 1 else Filter(should=conditions)
+
+def _load_state(state_path, settings):
+    """
+    Load the per-group state of the previous run.
+
+    Returns an empty state if the file does not exist. If it was written with
+    different aggregation settings, every group is marked as changed so it is
+    recomputed, while groups that disappeared are still deleted.
+    """
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return {}
+    groups = state['groups']
+    if state.get('settings') != settings:
+        groups = {key: dict(group, hash=None) for key, group in groups.items()}
+    return groups
+
+def _save_state(state_path, settings, groups):
+    """Write the state file atomically so an interrupted run keeps the previous state."""
+    directory = os.path.dirname(state_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'settings': settings, 'groups': groups}, f)
+    os.replace(tmp_path, state_path)
@@ -0,0 +1,221 @@
+"""
+Instrumentation of aggregation runs.
+
+An `Instrumentation` passed to `aggregate_embeddings(instrumentation=...)`
+records a timing histogram per stage (and per method for the aggregation
+stage) plus counters of scrolled points, finalized groups and uploaded
+batches, and forwards every event to hooks and, optionally, to `logging`.
+
+Stages:
+    scan        reading the input and grouping it; for "streaming" and
+                "out_of_core" this includes the aggregation itself
+    scroll      one observation per page: time spent waiting for Qdrant
+    page        one observation per page: time spent grouping the page and
+                collecting its payloads
+    aggregate   reducing the collected groups (labels: method, execution)
+    points      building the output batch
+    prepare     one observation per upload batch: slicing it, converting its
+                vectors and loading deferred page_content
+    upload      one observation per upload batch: the upsert call
+    cleanup     deleting stale output points
+
+Events, passed to each hook as `hook(event, fields)`:
+    stage_start, stage_end      fields: stage, labels (and seconds at the end)
+    points_scrolled             fields: count, total
+    groups_finalized            fields: count
+    batch_uploaded              fields: count, prepare_seconds, upsert_seconds, total
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Events logged at INFO; the per-page and per-batch ones are logged at DEBUG
+_INFO_EVENTS = ('stage_start', 'stage_end', 'groups_finalized')
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+        }
+
+
+class Instrumentation:
+    """
+    Timing histograms, counters and event hooks of an aggregation run.
+
+    Example:
+        instrumentation = Instrumentation(hooks=[print], logger=logging.getLogger("aggregation"))
+        aggregate_embeddings(..., instrumentation=instrumentation)
+        print(instrumentation.summary())
+        instrumentation.write_openmetrics("metrics/aggregation.prom")
+
+    Parameters:
+        hooks (list, optional): Callables invoked as `hook(event, fields)` for every event
+        logger (logging.Logger, optional): Logger receiving every event
+        buckets (tuple): Upper bounds of the histogram buckets in seconds
+    """
+
+    def __init__(self, hooks=(), logger=None, buckets=DEFAULT_BUCKETS):
+        self.hooks = list(hooks)
+        self.logger = logger
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.counters = {}
+        # Upload batches may be reported from several threads
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        """Send an event to the hooks and the logger."""
+        for hook in self.hooks:
+            hook(event, fields)
+        if self.logger is not None:
+            level = logging.INFO if event in _INFO_EVENTS else logging.DEBUG
+            self.logger.log(level, "%s %s", event, fields)
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration of a stage."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1):
+        """Add to a counter and return its new total."""
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+        return total
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """Time a block as one observation of a stage."""
+        self.emit('stage_start', stage=name, labels=labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(name, seconds, **labels)
+            self.emit('stage_end', stage=name, labels=labels, seconds=seconds)
+
+    def pages(self, pages):
+        """
+        Wrap an iterable of scrolled pages.
+
+        The time spent waiting for the next page is recorded as the `scroll`
+        stage and the time the consumer spends on a page as the `page` stage.
+        """
+        iterator = iter(pages)
+        while True:
+            start = time.perf_counter()
+            try:
+                points = next(iterator)
+            except StopIteration:
+                return
+            received = time.perf_counter()
+            self.observe('scroll', received - start)
+            total = self.increment('points_scrolled', len(points))
+            self.emit('points_scrolled', count=len(points), total=total)
+            yield points
+            self.observe('page', time.perf_counter() - received)
+
+    def groups_finalized(self, count):
+        self.increment('groups_finalized', count)
+        self.emit('groups_finalized', count=count)
+
+    def batch_uploaded(self, count, prepare_seconds, upsert_seconds):
+        """Upload progress callback (see `utils.upload_points`)."""
+        self.observe('prepare', prepare_seconds)
+        self.observe('upload', upsert_seconds)
+        self.increment('batches_uploaded')
+        total = self.increment('points_uploaded', count)
+        self.emit(
+            'batch_uploaded', count=count, prepare_seconds=prepare_seconds,
+            upsert_seconds=upsert_seconds, total=total
+        )
+
+    def summary(self):
+        """
+        Return the recorded timings and counters.
+
+        Returns:
+            dict: `stages` maps "stage" or "stage{label=value,...}" to count,
+            sum, mean, min and max seconds; `counters` holds the counters
+        """
+        with self._lock:
+            stages = {
+                _series_name(name, labels): histogram.summary()
+                for (name, labels), histogram in self.histograms.items()
+            }
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+    def to_openmetrics(self, prefix="qdrant_aggregator"):
+        """Render the histograms and counters in the OpenMetrics text format."""
+        lines = [
+            f"# TYPE {prefix}_stage_seconds histogram",
+            f"# UNIT {prefix}_stage_seconds seconds",
+            f"# HELP {prefix}_stage_seconds Duration of aggregation stages.",
+        ]
+        with self._lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                label_pairs = [('stage', name)] + list(labels)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.bucket_counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    lines.append(
+                        f"{prefix}_stage_seconds_bucket{_labels(label_pairs + [('le', le)])} {cumulative}"
+                    )
+                lines.append(f"{prefix}_stage_seconds_count{_labels(label_pairs)} {histogram.count}")
+                lines.append(f"{prefix}_stage_seconds_sum{_labels(label_pairs)} {histogram.sum!r}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def write_openmetrics(self, path, prefix="qdrant_aggregator"):
+        """Write `to_openmetrics()` to a file, e.g. for the node_exporter textfile collector."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_openmetrics(prefix))
+
+
+def _series_name(name, labels):
+    if not labels:
+        return name
+    return f"{name}{{{','.join(f'{key}={value}' for key, value in labels)}}}"
+
+
+def _labels(pairs):
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
@@ -0,0 +1,189 @@
+"""
+Process-pool execution of aggregation methods across groups.
+
+The collected vectors are copied once, sorted by group, into a shared-memory
+block holding one contiguous (N, D) matrix of the same dtype. Worker processes
+attach to the block by name and read their groups as zero-copy views, so no
+vectors are pickled; only group offsets go to the workers and one (D,) result
+per group comes back, into a float64 result matrix. Small groups are batched into chunks of at least `chunk_rows` rows to amortize
+scheduling overhead.
+
+By default each call starts its own pool whose workers attach to the block
+once. A long-lived `executor` can be passed instead, e.g. to share one pool
+across many aggregations; its workers then attach to the block for each task
+and detach when it ends, so a finished aggregation leaves no memory mapped.
+
+`multiprocessing.shared_memory` needs Python 3.8. On Python 3.7 the sorted
+groups are pickled to the workers in chunks instead.
+"""
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .registry import get_method
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python 3.7
+    shared_memory = None
+
+_worker_state = {}
+
+
+def calculate_embeddings_parallel(
+    matrix,
+    group_ids,
+    method,
+    weights=None,
+    trim_percentage=0.1,
+    sample_size=None,
+    workers=None,
+    chunk_rows=4096,
+    executor=None
+):
+    """
+    Aggregate the groups of a matrix on a process pool.
+
+    Parameters:
+        matrix (np.ndarray): Floating point matrix of shape (n_samples, n_dimensions)
+        group_ids (np.ndarray): Integer group ID of each row, in [0, n_groups)
+        method (str): Aggregation method
+        weights (list, optional): Weights for weighted_average method
+        trim_percentage (float): Fraction to trim for trimmed_mean (default: 0.1)
+        sample_size (int, optional): Rows sampled per group by the approx_* methods
+        workers (int, optional): Number of worker processes (default: os.cpu_count())
+        chunk_rows (int): Minimum number of rows per scheduled task (default: 4096)
+        executor (ProcessPoolExecutor, optional): Existing pool to run the tasks on;
+            `workers` is then ignored and the pool is left running
+
+    Returns:
+        np.ndarray: Matrix of shape (n_groups, n_dimensions), row g is group g
+    """
+    matrix = np.asarray(matrix)
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+    if len(group_ids) == 0:
+        return np.zeros((0, matrix.shape[1]), dtype=np.float64)
+
+    # Rows of a group keep their original order, as in the default path
+    order = np.argsort(group_ids, kind="stable")
+    offsets = np.r_[0, np.cumsum(np.bincount(group_ids))].astype(np.int64)
+    n_groups = len(offsets) - 1
+    tasks = _chunk_groups(offsets, chunk_rows)
+    spec = get_method(method)
+
+    kwargs = spec.option_kwargs(weights, trim_percentage, sample_size)
+    # Results are collected in float64 whatever the matrix dtype
+    results = np.zeros((n_groups, matrix.shape[1]), dtype=np.float64)
+
+    if shared_memory is None:
+        sorted_matrix = matrix[order]
+        del order
+        chunks = [
+            (first_group, sorted_matrix[offsets[first_group]:offsets[end_group]],
+             offsets[first_group:end_group + 1] - offsets[first_group], spec.func, kwargs)
+            for first_group, end_group in tasks
+        ]
+        if executor is not None:
+            _collect(executor.map(_aggregate_pickled_chunk, chunks), results)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                _collect(pool.map(_aggregate_pickled_chunk, chunks), results)
+        return results
+
+    shape = (len(group_ids), matrix.shape[1])
+    dtype = matrix.dtype
+    shm = shared_memory.SharedMemory(create=True, size=max(shape[0] * shape[1] * dtype.itemsize, 1))
+    try:
+        shared = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        np.take(matrix, order, axis=0, out=shared)
+        del shared, order
+
+        if executor is not None:
+            shared_tasks = [
+                (shm.name, shape, dtype.str, offsets[first_group:end_group + 1],
+                 first_group, spec.func, kwargs)
+                for first_group, end_group in tasks
+            ]
+            _collect(executor.map(_aggregate_shared_chunk, shared_tasks), results)
+            return results
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach,
+            # Pass the function itself so methods registered at runtime also
+            # work under the "spawn" start method
+            initargs=(shm.name, shape, dtype.str, offsets, spec.func, kwargs)
+        ) as pool:
+            _collect(pool.map(_aggregate_chunk, tasks), results)
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _collect(chunk_results, results):
+    for first_group, chunk in chunk_results:
+        results[first_group:first_group + len(chunk)] = chunk
+
+
+def _chunk_groups(offsets, chunk_rows):
+    """Split groups into (first_group, end_group) ranges of at least chunk_rows rows."""
+    tasks = []
+    first_group = 0
+    n_groups = len(offsets) - 1
+    for group in range(n_groups):
+        if offsets[group + 1] - offsets[first_group] >= chunk_rows or group == n_groups - 1:
+            tasks.append((first_group, group + 1))
+            first_group = group + 1
+    return tasks
+
+
+def _attach(shm_name, shape, dtype, offsets, func, kwargs):
+    """Worker initializer: attach to the shared matrix once per process."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_state.update(
+        shm=shm,
+        matrix=np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf),
+        offsets=offsets,
+        func=func,
+        kwargs=kwargs,
+    )
+
+
+def _aggregate_shared_chunk(task):
+    """Task of a long-lived pool: attach to the block by name for this task only."""
+    shm_name, shape, dtype, offsets, first_group, func, kwargs = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        return first_group, _reduce_groups(matrix, offsets, func, kwargs)
+    except BaseException as e:
+        # Release the views of the block held by the failed frames, so it can be closed
+        traceback.clear_frames(e.__traceback__)
+        raise
+    finally:
+        matrix = None
+        shm.close()
+
+
+def _aggregate_chunk(task):
+    first_group, end_group = task
+    offsets = _worker_state['offsets'][first_group:end_group + 1]
+    return first_group, _reduce_groups(
+        _worker_state['matrix'], offsets, _worker_state['func'], _worker_state['kwargs']
+    )
+
+
+def _aggregate_pickled_chunk(task):
+    first_group, matrix, offsets, func, kwargs = task
+    return first_group, _reduce_groups(matrix, offsets, func, kwargs)
+
+
+def _reduce_groups(matrix, offsets, func, kwargs):
+    """Aggregate the groups matrix[offsets[i]:offsets[i + 1]] into a new array."""
+    # np.array copies, so no result is a view into the (shared) matrix
+    return np.array([
+        func(matrix[offsets[i]:offsets[i + 1]], **kwargs)
+        for i in range(len(offsets) - 1)
+    ])
@@ -0,0 +1,242 @@
+"""
+Parallel multi-worker scroll of a Qdrant collection.
+
+The collection is split into disjoint segments, each scrolled by a worker
+thread. Pages are merged through a bounded queue, so a slow consumer applies
+back-pressure instead of letting the readers buffer the whole collection.
+
+A segment is either:
+    - a `Filter`, e.g. one payload-filtered partition of the collection, or
+    - a `(start_id, end_id)` tuple, the half-open range of integer point IDs
+      [start_id, end_id). `None` leaves the range open on that side. ID ranges
+      need integer point IDs; a collection with UUID IDs raises a ValueError
+      and should be split with payload filter segments instead.
+"""
+import queue
+import threading
+from qdrant_client.models import Filter, FieldCondition, MatchValue, Range
+
+_DONE = object()
+
+
+def parallel_scroll(
+    client,
+    collection_name,
+    segments,
+    workers=4,
+    limit=100,
+    queue_size=None,
+    with_payload=True,
+    with_vectors=True,
+    scroll_filter=None
+):
+    """
+    Scroll disjoint segments of a collection concurrently.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        segments (list): Disjoint segments covering the points to read (see module docstring)
+        workers (int): Number of reader threads (default: 4)
+        limit (int): Number of points per page (default: 100)
+        queue_size (int, optional): Maximum number of buffered pages (default: 2 * workers)
+        with_payload: Payload selector passed to `client.scroll`
+        with_vectors: Vector selector passed to `client.scroll`
+        scroll_filter (Filter, optional): Only scroll the points matching this
+            filter, combined with the filter of each segment
+
+    Yields:
+        list: Points of the next page, in no particular order across segments
+    """
+    segments = list(segments)
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    if not segments:
+        return
+
+    pages = queue.Queue(maxsize=queue_size or 2 * workers)
+    pending = queue.Queue()
+    for segment in segments:
+        pending.put(segment)
+    stop = threading.Event()
+
+    def put(item):
+        # Block while the queue is full, but give up once the consumer stops
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            while not stop.is_set():
+                try:
+                    segment = pending.get_nowait()
+                except queue.Empty:
+                    break
+                for points in scroll_segment(
+                    client, collection_name, segment, limit, with_payload, with_vectors,
+                    scroll_filter
+                ):
+                    if not put(points):
+                        return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    n_workers = min(workers, len(segments))
+    threads = [
+        threading.Thread(target=worker, name=f"qdrant-scroll-{i}", daemon=True)
+        for i in range(n_workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        finished = 0
+        while finished < n_workers:
+            item = pages.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def scroll_segment(
+    client, collection_name, segment, limit=100, with_payload=True, with_vectors=True,
+    scroll_filter=None
+):
+    """
+    Scroll through the points of one segment, one page at a time.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        segment: A `Filter` or a `(start_id, end_id)` integer ID range
+        limit (int): Number of points per page (default: 100)
+        with_payload: Payload selector passed to `client.scroll`
+        with_vectors: Vector selector passed to `client.scroll`
+        scroll_filter (Filter, optional): Only scroll the points of the segment
+            matching this filter
+
+    Yields:
+        list: Points of the next page
+
+    Raises:
+        ValueError: If the segment is a bounded ID range and the collection has
+            non-integer (UUID) point IDs
+    """
+    end_id = None
+    offset = None
+    bounded = False
+    if isinstance(segment, tuple):
+        offset, end_id = segment
+        bounded = offset is not None or end_id is not None
+    elif segment is not None:
+        scroll_filter = segment if scroll_filter is None else Filter(must=[segment, scroll_filter])
+
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=limit,
+            offset=offset,
+            with_payload=with_payload,
+            with_vectors=with_vectors
+        )
+
+        if bounded:
+            _check_integer_ids(points, segment)
+
+        # Points are returned in ID order, so the range ends at the first ID past end_id
+        if end_id is not None:
+            in_range = [point for point in points if point.id < end_id]
+            if len(in_range) < len(points):
+                next_offset = None
+            points = in_range
+
+        if points:
+            yield points
+
+        if next_offset is None or (end_id is not None and next_offset >= end_id):
+            break
+        offset = next_offset
+
+
+def _check_integer_ids(points, segment):
+    # UUIDs cannot be compared with integer bounds; Qdrant would also ignore an
+    # integer offset on them, so every segment would read the whole collection
+    for point in points:
+        if not isinstance(point.id, int):
+            raise ValueError(
+                f"ID range segment {segment!r} requires integer point IDs, got {point.id!r}; "
+                "use payload_value_segments or payload_range_segments instead."
+            )
+
+
+def id_range_segments(start_id, end_id, n_segments):
+    """
+    Split the integer point ID range [start_id, end_id) into contiguous segments.
+
+    The first segment starts at None and the last one is open-ended, so points
+    outside the given range are still read.
+
+    Parameters:
+        start_id (int): Lowest expected point ID
+        end_id (int): One past the highest expected point ID
+        n_segments (int): Number of segments
+
+    Returns:
+        list: (start_id, end_id) tuples
+    """
+    if n_segments < 1:
+        raise ValueError("n_segments must be at least 1.")
+    bounds = [start_id + (end_id - start_id) * i // n_segments for i in range(1, n_segments)]
+    bounds = sorted(set(bounds))
+    starts = [None] + bounds
+    ends = bounds + [None]
+    return list(zip(starts, ends))
+
+
+def payload_value_segments(key, values):
+    """
+    Build one segment per value of a payload field.
+
+    Parameters:
+        key (str): Payload field, nested fields separated by dots (e.g., "metadata.tenant")
+        values (list): Field values; together they should cover the collection
+
+    Returns:
+        list: Filter segments
+    """
+    return [
+        Filter(must=[FieldCondition(key=key, match=MatchValue(value=value))])
+        for value in values
+    ]
+
+
+def payload_range_segments(key, bounds):
+    """
+    Build segments over consecutive ranges of a numeric payload field.
+
+    Parameters:
+        key (str): Numeric payload field
+        bounds (list): Sorted boundaries; segment i covers [bounds[i], bounds[i + 1])
+
+    Returns:
+        list: Filter segments
+    """
+    return [
+        Filter(must=[FieldCondition(key=key, range=Range(gte=low, lt=high))])
+        for low, high in zip(bounds[:-1], bounds[1:])
+    ]
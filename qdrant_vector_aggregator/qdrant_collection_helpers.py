@@ -1,36 +1,143 @@
-from qdrant_client.models import PointStruct
+from qdrant_client.models import PointStruct, Batch
 import numpy as np
+import json
 import uuid
 
-def create_qdrant_points(representative_embeddings, metadata_by_column):
+def group_point_id(collection_name, column_value):
+    """
+    Derive a deterministic point ID for a group.
+
+    The ID is a UUIDv5 over the collection name and the JSON-encoded column
+    value, so the same group always maps to the same point and reruns can
+    upsert in place.
+
+    Parameters:
+        collection_name (str): Name of the output collection
+        column_value: Group key
+
+    Returns:
+        str: Point ID
+    """
+    name = f"{collection_name}/{json.dumps(column_value, sort_keys=True, default=str)}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+
+def create_qdrant_points(representative_embeddings, metadata_by_column, id_namespace=None):
     """
     Create Qdrant points from representative embeddings and metadata.
 
+    Builds the points from `create_qdrant_batch`; prefer the columnar batch
+    for large uploads.
+
     Parameters:
         representative_embeddings (dict): Dictionary mapping column values to embeddings
         metadata_by_column (dict): Dictionary mapping column values to metadata
+        id_namespace (str, optional): Output collection name used to derive
+            deterministic point IDs with `group_point_id`; random IDs if None
 
     Returns:
         list: List of PointStruct objects ready for Qdrant upload
     """
-    points = []
+    batch = create_qdrant_batch(
+        representative_embeddings, metadata_by_column, id_namespace, dtype=np.float64
+    )
+    if isinstance(batch.vectors, dict):
+        vectors = [
+            {name: matrix[row].tolist() for name, matrix in batch.vectors.items()}
+            for row in range(len(batch.ids))
+        ]
+    else:
+        vectors = batch.vectors.tolist()
+    return [
+        PointStruct(id=point_id, vector=vector, payload=payload)
+        for point_id, vector, payload in zip(batch.ids, vectors, batch.payloads)
+    ]
+
+class VectorBatch:
+    """
+    Columnar batch of output points whose vectors stay one contiguous NumPy matrix.
+
+    Vectors are converted to the request format only per upload slice (see
+    `to_batch`), so the full set of output vectors never exists as Python lists.
 
-    for idx, (column_value, embedding) in enumerate(representative_embeddings.items()):
-        # Get the metadata from metadata_by_column
-        meta = metadata_by_column.get(column_value, {'id': column_value})
+    Parameters:
+        ids (list): Point IDs
+        vectors (np.ndarray or dict): Matrix of shape (n_points, n_dimensions), or a
+            dict mapping vector names to such matrices for named vectors
+        payloads (list): Point payloads
+        payload_loader (callable, optional): `payload_loader(payloads) -> payloads`
+            applied to each upload slice, e.g. to fetch deferred content
+            (see `content.DeferredContent`)
+    """
+
+    def __init__(self, ids, vectors, payloads, payload_loader=None):
+        self.ids = ids
+        self.vectors = vectors
+        self.payloads = payloads
+        self.payload_loader = payload_loader
+
+    def __len__(self):
+        return len(self.ids)
+
+    def to_batch(self, start=0, stop=None):
+        """Return points[start:stop] as a qdrant `Batch`."""
+        payloads = self.payloads[start:stop]
+        if self.payload_loader is not None:
+            payloads = self.payload_loader(payloads)
+        # tolist() on the slice is far cheaper than letting pydantic validate the array
+        if isinstance(self.vectors, dict):
+            vectors = {name: matrix[start:stop].tolist() for name, matrix in self.vectors.items()}
+        else:
+            vectors = self.vectors[start:stop].tolist()
+        return Batch(ids=self.ids[start:stop], vectors=vectors, payloads=payloads)
+
+def create_qdrant_batch(
+    representative_embeddings, metadata_by_column, id_namespace=None, dtype=np.float32,
+    payload_loader=None
+):
+    """
+    Create a columnar batch from representative embeddings and metadata.
+
+    Parameters:
+        representative_embeddings (dict): Dictionary mapping column values to embeddings,
+            or to dicts mapping vector names to embeddings
+        metadata_by_column (dict): Dictionary mapping column values to metadata
+        id_namespace (str, optional): Output collection name used to derive
+            deterministic point IDs with `group_point_id`; random IDs if None
+        dtype: Floating point type of the vector matrix (default: float32)
+        payload_loader (callable, optional): Applied to the payloads of each
+            upload slice (see `VectorBatch`)
+
+    Returns:
+        VectorBatch: Batch with parallel `ids`, `vectors` and `payloads` columns
+    """
+    ids = []
+    payloads = []
+    n_points = len(representative_embeddings)
+    vectors = None
 
-        # Create a unique ID for the point
-        point_id = str(uuid.uuid4())
+    for row, (column_value, embedding) in enumerate(representative_embeddings.items()):
+        if isinstance(embedding, dict):
+            if vectors is None:
+                vectors = {
+                    name: np.empty((n_points, len(vector)), dtype=dtype)
+                    for name, vector in embedding.items()
+                }
+            for name, vector in embedding.items():
+                vectors[name][row] = vector
+        else:
+            if vectors is None:
+                vectors = np.empty((n_points, len(embedding)), dtype=dtype)
+            vectors[row] = embedding
+        if id_namespace is None:
+            ids.append(str(uuid.uuid4()))
+        else:
+            ids.append(group_point_id(id_namespace, column_value))
+        payloads.append(metadata_by_column.get(column_value, {'id': column_value}))
 
-        # Create PointStruct
-        point = PointStruct(
-            id=point_id,
-            vector=embedding.tolist(),
-            payload=meta
-        )
-        points.append(point)
+    if vectors is None:
+        vectors = np.zeros((0, 0), dtype=dtype)
 
-    return points
+    return VectorBatch(ids, vectors, payloads, payload_loader)
 
 def get_vector_dimension(representative_embeddings):
     """
@@ -40,7 +147,9 @@ def get_vector_dimension(representative_embeddings):
         representative_embeddings (dict): Dictionary mapping column values to embeddings
 
     Returns:
-        int: Vector dimension
+        int or dict: Vector dimension, or the dimension of each named vector
     """
-    first_embedding = list(representative_embeddings.values())[0]
-    return first_embedding.shape[0]
+    first_embedding = next(iter(representative_embeddings.values()))
+    if isinstance(first_embedding, dict):
+        return {name: len(vector) for name, vector in first_embedding.items()}
+    return len(first_embedding)
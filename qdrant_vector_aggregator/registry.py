@@ -0,0 +1,275 @@
+"""
+Registry of aggregation methods and their capabilities.
+
+Every method name maps to an `AggregationMethod` that declares how the method
+can be executed: whether it is exact, whether it has a single-pass streaming
+accumulator or a vectorized multi-group implementation, how much memory it
+needs per group, and whether it may run in worker processes.
+`aggregate_embeddings(execution="auto")` uses these flags to pick the fastest
+execution mode, and custom methods registered with `register_method` get the
+same treatment as the built-in ones.
+"""
+import functools
+from . import embedding_methods as em
+from . import grouped_methods as gm
+from . import streaming as st
+
+# Memory needed per group while aggregating
+MEMORY_CONSTANT = "constant"  # O(D): running accumulator
+MEMORY_BOUNDED = "bounded"    # O(sample_size * D): reservoir sample
+MEMORY_LINEAR = "linear"      # O(n * D): every vector of the group
+
+OPTIONS = ("weights", "trim_percentage", "sample_size")
+
+# Collections with fewer points are aggregated in-process by "auto"; below
+# this size process startup and data transfer outweigh the parallel speedup
+PROCESS_POOL_MIN_POINTS = 20000
+
+# Above this estimated size of the collected vectors (the matrix and its copy
+# sorted by group), "auto" avoids the modes that hold every vector in memory
+MATRIX_MEMORY_LIMIT_BYTES = 4 * 2**30
+
+_METHODS = {}
+
+
+class AggregationMethod:
+    """
+    An aggregation method and its capabilities.
+
+    Parameters:
+        name (str): Method name passed as `method=`
+        func (callable): `func(embeddings, **options) -> np.ndarray` aggregating one
+            group of shape (n, D) into a vector of shape (D,)
+        options (tuple): Names of the options (`weights`, `trim_percentage`,
+            `sample_size`) passed to `func` and `accumulator` as keyword arguments
+        exact (bool): False if the result is an approximation of another method
+        accumulator (callable, optional): `accumulator(**options) -> StreamingAccumulator`
+            computing the method in a single pass
+        grouped (callable, optional): `grouped(embeddings, starts, counts, weights)`
+            reducing all groups of a matrix whose rows are sorted by group, where
+            group g is `embeddings[starts[g]:starts[g] + counts[g]]` and `weights`
+            holds one weight per row (or None). Returns shape (n_groups, D)
+        shared (callable, optional): `shared(groups, **options)` aggregating all
+            groups of a `grouped_methods.SharedGroups`, reusing the intermediates
+            it caches (group means, medians, unit-length rows). Used when several
+            methods are aggregated from one matrix. Returns shape (n_groups, D)
+        memory (str): Per-group memory, one of MEMORY_CONSTANT, MEMORY_BOUNDED or
+            MEMORY_LINEAR (default: derived from the other capabilities)
+        parallel_safe (bool): True if `func` is a pure, picklable top-level
+            function that can run in worker processes
+    """
+
+    def __init__(
+        self,
+        name,
+        func,
+        options=(),
+        exact=True,
+        accumulator=None,
+        grouped=None,
+        memory=None,
+        parallel_safe=False,
+        shared=None
+    ):
+        unknown = set(options) - set(OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown options for method '{name}': {sorted(unknown)}")
+        if memory is None:
+            if accumulator is None:
+                memory = MEMORY_LINEAR
+            else:
+                memory = MEMORY_CONSTANT if exact else MEMORY_BOUNDED
+        if memory not in (MEMORY_CONSTANT, MEMORY_BOUNDED, MEMORY_LINEAR):
+            raise ValueError(f"Unknown memory complexity: {memory}")
+        self.name = name
+        self.func = func
+        self.options = tuple(options)
+        self.exact = exact
+        self.accumulator = accumulator
+        self.grouped = grouped
+        self.shared = shared
+        self.memory = memory
+        self.parallel_safe = parallel_safe
+
+    @property
+    def streaming(self):
+        return self.accumulator is not None
+
+    @property
+    def batched(self):
+        return self.grouped is not None
+
+    def option_kwargs(self, weights=None, trim_percentage=0.1, sample_size=None):
+        """Keyword arguments of `func` and `accumulator` for the given options."""
+        values = {'weights': weights, 'trim_percentage': trim_percentage, 'sample_size': sample_size}
+        return {option: values[option] for option in self.options}
+
+    def compute(self, embeddings, weights=None, trim_percentage=0.1, sample_size=None):
+        """Aggregate one group of embeddings."""
+        return self.func(embeddings, **self.option_kwargs(weights, trim_percentage, sample_size))
+
+    def make_accumulator(self, weights=None, trim_percentage=0.1, sample_size=None):
+        """Create the streaming accumulator of the method."""
+        if self.accumulator is None:
+            raise ValueError(f"Method '{self.name}' does not support streaming aggregation.")
+        return self.accumulator(**self.option_kwargs(weights, trim_percentage, sample_size))
+
+    def __repr__(self):
+        return (
+            f"AggregationMethod({self.name!r}, exact={self.exact}, streaming={self.streaming}, "
+            f"batched={self.batched}, memory={self.memory!r}, parallel_safe={self.parallel_safe})"
+        )
+
+
+def register_method(
+    name,
+    func,
+    options=(),
+    exact=True,
+    accumulator=None,
+    grouped=None,
+    memory=None,
+    parallel_safe=False,
+    shared=None,
+    replace=False
+):
+    """
+    Register an aggregation method.
+
+    Example:
+        def calculate_l2_normalized_mean(embeddings):
+            mean = embeddings.mean(axis=0)
+            return mean / np.linalg.norm(mean)
+
+        register_method("normalized_mean", calculate_l2_normalized_mean, parallel_safe=True)
+        aggregate_embeddings(..., method="normalized_mean")
+
+    Parameters:
+        replace (bool): Allow overriding an already registered method (default: False)
+        Other parameters: See `AggregationMethod`
+
+    Returns:
+        AggregationMethod: The registered method
+    """
+    if name in _METHODS and not replace:
+        raise ValueError(f"Method '{name}' is already registered.")
+    method = AggregationMethod(
+        name, func, options=options, exact=exact, accumulator=accumulator,
+        grouped=grouped, memory=memory, parallel_safe=parallel_safe, shared=shared
+    )
+    _METHODS[name] = method
+    return method
+
+
+def unregister_method(name):
+    """Remove a registered method."""
+    get_method(name)
+    del _METHODS[name]
+
+
+def get_method(name):
+    """
+    Look up a registered method.
+
+    Raises:
+        ValueError: If no method with this name is registered
+    """
+    try:
+        return _METHODS[name]
+    except KeyError:
+        raise ValueError(f"Unknown method: {name}") from None
+
+
+def available_methods():
+    """Return the names of all registered methods."""
+    return list(_METHODS)
+
+
+def select_execution(
+    method, n_points=None, workers=None, spill_dir=None, vector_bytes=None, memory_limit_bytes=None
+):
+    """
+    Pick the fastest execution mode of `aggregate_embeddings` for a method.
+
+    If the collected vectors would exceed the memory limit, "streaming" is
+    picked when the method has an accumulator and "out_of_core" otherwise.
+    Else, in order of preference:
+        - "batched" if the method has a vectorized multi-group implementation
+        - "streaming" if it has a single-pass accumulator (exact or bounded-memory)
+        - "out_of_core" if a spill directory is given
+        - "process_pool" if the method is parallel-safe, more than one worker
+          was requested and the collection has at least PROCESS_POOL_MIN_POINTS points
+        - "default" otherwise
+
+    Worker processes are only used when `workers` is given explicitly, since
+    under the "spawn" start method they require the caller's script to guard
+    its entry point with `if __name__ == "__main__":`.
+
+    Parameters:
+        method (str): Aggregation method
+        n_points (int, optional): Number of points in the input collection, if known
+        workers (int, optional): Number of worker processes requested
+        spill_dir (str, optional): Spill directory requested for out-of-core execution
+        vector_bytes (int, optional): Size of one collected vector in bytes, if known
+        memory_limit_bytes (int, optional): Memory limit of the collected vectors
+            (default: MATRIX_MEMORY_LIMIT_BYTES)
+
+    Returns:
+        str: Execution mode
+    """
+    spec = get_method(method)
+    if memory_limit_bytes is None:
+        memory_limit_bytes = MATRIX_MEMORY_LIMIT_BYTES
+    if n_points is not None and vector_bytes is not None and 2 * n_points * vector_bytes > memory_limit_bytes:
+        return "streaming" if spec.streaming else "out_of_core"
+    if spec.batched:
+        return "batched"
+    if spec.streaming:
+        return "streaming"
+    if spill_dir is not None:
+        return "out_of_core"
+    if (
+        spec.parallel_safe
+        and workers is not None and workers > 1
+        and n_points is not None and n_points >= PROCESS_POOL_MIN_POINTS
+    ):
+        return "process_pool"
+    return "default"
+
+
+def _register_builtin_methods():
+    builtin = functools.partial(register_method, parallel_safe=True)
+
+    builtin("average", em.calculate_average,
+            accumulator=st.MeanAccumulator, grouped=gm.segment_mean, shared=gm.shared_mean)
+    builtin("weighted_average", em.calculate_weighted_average, options=("weights",),
+            accumulator=st.WeightedMeanAccumulator, grouped=gm.segment_weighted_mean)
+    builtin("median", em.calculate_median, shared=gm.shared_median)
+    builtin("geometric_mean", em.calculate_geometric_mean, accumulator=st.GeometricMeanAccumulator)
+    builtin("harmonic_mean", em.calculate_harmonic_mean, accumulator=st.HarmonicMeanAccumulator)
+    builtin("trimmed_mean", em.calculate_trimmed_mean, options=("trim_percentage",))
+    # A one-cluster K-Means converges to the mean of the group
+    builtin("centroid", em.calculate_centroid,
+            accumulator=st.MeanAccumulator, grouped=gm.segment_mean, shared=gm.shared_mean)
+    builtin("pca", em.calculate_pca)
+    builtin("exemplar", em.calculate_exemplar, shared=gm.shared_exemplar)
+    builtin("max_pooling", em.calculate_max_pooling,
+            accumulator=st.MaxAccumulator, grouped=gm.segment_max)
+    builtin("min_pooling", em.calculate_min_pooling,
+            accumulator=st.MinAccumulator, grouped=gm.segment_min)
+    builtin("entropy_weighted_average", em.calculate_entropy_weighted_average)
+    builtin("attentive_pooling", em.calculate_attentive_pooling,
+            grouped=gm.segment_attentive_pooling, shared=gm.shared_attentive_pooling)
+    builtin("tukeys_biweight", em.calculate_tukeys_biweight, shared=gm.shared_tukeys_biweight)
+
+    # Bounded-memory approximations backed by a per-group reservoir sample
+    builtin("approx_median", em.calculate_approx_median, options=("sample_size",),
+            exact=False, accumulator=functools.partial(st.ReservoirAccumulator, "median"))
+    builtin("approx_trimmed_mean", em.calculate_approx_trimmed_mean,
+            options=("trim_percentage", "sample_size"),
+            exact=False, accumulator=functools.partial(st.ReservoirAccumulator, "trimmed_mean"))
+    builtin("approx_tukeys_biweight", em.calculate_approx_tukeys_biweight, options=("sample_size",),
+            exact=False, accumulator=functools.partial(st.ReservoirAccumulator, "tukeys_biweight"))
+
+
+_register_builtin_methods()
@@ -0,0 +1,393 @@
+"""
+Single-pass streaming accumulators for aggregation methods.
+
+Each accumulator folds batches of vectors into per-group running state, so
+peak memory scales with the number of groups instead of the number of chunks.
+Groups are addressed by compact integer IDs (0, 1, 2, ...) assigned by the
+caller in order of first appearance.
+"""
+import numpy as np
+from .embedding_methods import DEFAULT_SAMPLE_SIZE
+
+
+class StreamingAccumulator:
+    """
+    Base class for per-group running accumulators.
+
+    Subclasses define the per-group state arrays in `_init_state` and fold a
+    batch into them in `_fold`. State arrays grow on demand as new group IDs
+    appear, so the number of groups does not need to be known upfront.
+    `_state_names` lists the state array attributes, used to save and restore
+    the accumulator.
+    """
+
+    _state_names = ()
+
+    def __init__(self):
+        self.dimension = None
+        self.capacity = 0
+        self.size = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _init_state(self, capacity, dimension):
+        raise NotImplementedError
+
+    def _grow_state(self, capacity):
+        raise NotImplementedError
+
+    def _fold(self, group_ids, vectors, positions):
+        raise NotImplementedError
+
+    def _finalize_groups(self):
+        raise NotImplementedError
+
+    def _ensure_capacity(self, n_groups, dimension):
+        if self.dimension is None:
+            self.dimension = dimension
+            self.capacity = max(n_groups, 16)
+            self.counts = np.zeros(self.capacity, dtype=np.int64)
+            self._init_state(self.capacity, dimension)
+        elif dimension != self.dimension:
+            raise ValueError(
+                f"Vector dimension mismatch: expected {self.dimension}, got {dimension}."
+            )
+        if n_groups > self.capacity:
+            capacity = max(n_groups, self.capacity * 2)
+            counts = np.zeros(capacity, dtype=np.int64)
+            counts[:self.capacity] = self.counts
+            self.counts = counts
+            self._grow_state(capacity)
+            self.capacity = capacity
+
+    def update(self, group_ids, vectors):
+        """
+        Fold a batch of vectors into the running state.
+
+        Parameters:
+            group_ids (np.ndarray): Integer group ID of each vector, shape (n,)
+            vectors (np.ndarray): Batch of vectors, shape (n, n_dimensions)
+        """
+        group_ids = np.asarray(group_ids, dtype=np.int64)
+        vectors = np.asarray(vectors)
+        if group_ids.shape[0] == 0:
+            return
+        self._ensure_capacity(int(group_ids.max()) + 1, vectors.shape[1])
+        self.size = max(self.size, int(group_ids.max()) + 1)
+        positions = _positions_within_groups(group_ids, self.counts)
+        self._fold(group_ids, vectors, positions)
+        np.add.at(self.counts, group_ids, 1)
+
+    def state_dict(self):
+        """
+        Export the running state as a dictionary of NumPy arrays.
+
+        Returns:
+            dict: Arrays trimmed to the groups seen so far, suitable for `np.savez`
+        """
+        state = {'counts': self.counts[:self.size]}
+        if self.dimension is None:
+            return state
+        for name in self._state_names:
+            state[name] = getattr(self, name)[:self.size]
+        return state
+
+    def load_state_dict(self, state):
+        """
+        Restore the running state exported by `state_dict`.
+
+        Parameters:
+            state (dict): Arrays returned by `state_dict`
+        """
+        counts = np.asarray(state['counts'], dtype=np.int64)
+        self.size = counts.shape[0]
+        if self.size == 0:
+            return
+        dimension = np.asarray(state[self._state_names[0]]).shape[-1] if self._state_names else 0
+        self.dimension = None
+        self._ensure_capacity(self.size, dimension)
+        self.counts[:self.size] = counts
+        for name in self._state_names:
+            getattr(self, name)[:self.size] = state[name]
+
+    def finalize(self):
+        """
+        Compute the aggregated embedding of every group.
+
+        Returns:
+            np.ndarray: Array of shape (n_groups, n_dimensions), row i is group i
+        """
+        if self.dimension is None:
+            return np.zeros((0, 0))
+        return self._finalize_groups()[:self.size]
+
+
+class MeanAccumulator(StreamingAccumulator):
+    """Running sum and count; finalizes to the arithmetic mean."""
+
+    _state_names = ('sums',)
+
+    def _init_state(self, capacity, dimension):
+        self.sums = np.zeros((capacity, dimension), dtype=np.float64)
+
+    def _grow_state(self, capacity):
+        self.sums = _grow_rows(self.sums, capacity, 0.0)
+
+    def _fold(self, group_ids, vectors, positions):
+        np.add.at(self.sums, group_ids, vectors)
+
+    def _finalize_groups(self):
+        return self.sums / np.maximum(self.counts, 1)[:, np.newaxis]
+
+
+class WeightedMeanAccumulator(StreamingAccumulator):
+    """
+    Running weighted sum; weight i applies to the i-th chunk of each group.
+
+    As with `np.average`, every group must have exactly `len(weights)` chunks.
+    """
+
+    _state_names = ('sums', 'weight_sums')
+
+    def __init__(self, weights):
+        super().__init__()
+        if weights is None:
+            raise ValueError("Weights must be provided for weighted average.")
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+    def _init_state(self, capacity, dimension):
+        self.sums = np.zeros((capacity, dimension), dtype=np.float64)
+        self.weight_sums = np.zeros(capacity, dtype=np.float64)
+
+    def _grow_state(self, capacity):
+        self.sums = _grow_rows(self.sums, capacity, 0.0)
+        self.weight_sums = _grow_rows(self.weight_sums, capacity, 0.0)
+
+    def _fold(self, group_ids, vectors, positions):
+        if positions.max() >= len(self.weights):
+            raise ValueError(
+                "Length of weights not compatible with the number of chunks in a group."
+            )
+        row_weights = self.weights[positions]
+        np.add.at(self.sums, group_ids, vectors * row_weights[:, np.newaxis])
+        np.add.at(self.weight_sums, group_ids, row_weights)
+
+    def _finalize_groups(self):
+        incomplete = (self.counts > 0) & (self.counts != len(self.weights))
+        if incomplete.any():
+            raise ValueError(
+                "Length of weights not compatible with the number of chunks in a group."
+            )
+        if np.any(self.weight_sums[self.counts > 0] == 0):
+            raise ZeroDivisionError("Weights sum to zero, can't be normalized")
+        return self.sums / np.where(self.weight_sums == 0, 1.0, self.weight_sums)[:, np.newaxis]
+
+
+class MaxAccumulator(StreamingAccumulator):
+    """Running element-wise maximum."""
+
+    _state_names = ('values',)
+
+    def _init_state(self, capacity, dimension):
+        self.values = np.full((capacity, dimension), -np.inf)
+
+    def _grow_state(self, capacity):
+        self.values = _grow_rows(self.values, capacity, -np.inf)
+
+    def _fold(self, group_ids, vectors, positions):
+        np.maximum.at(self.values, group_ids, vectors)
+
+    def _finalize_groups(self):
+        return self.values
+
+
+class MinAccumulator(StreamingAccumulator):
+    """Running element-wise minimum."""
+
+    _state_names = ('values',)
+
+    def _init_state(self, capacity, dimension):
+        self.values = np.full((capacity, dimension), np.inf)
+
+    def _grow_state(self, capacity):
+        self.values = _grow_rows(self.values, capacity, np.inf)
+
+    def _fold(self, group_ids, vectors, positions):
+        np.minimum.at(self.values, group_ids, vectors)
+
+    def _finalize_groups(self):
+        return self.values
+
+
+class GeometricMeanAccumulator(MeanAccumulator):
+    """Running sum of logarithms; finalizes to the geometric mean."""
+
+    def _fold(self, group_ids, vectors, positions):
+        if np.any(vectors <= 0):
+            raise ValueError("Geometric mean is only defined for positive numbers.")
+        np.add.at(self.sums, group_ids, np.log(vectors))
+
+    def _finalize_groups(self):
+        return np.exp(super()._finalize_groups())
+
+
+class HarmonicMeanAccumulator(MeanAccumulator):
+    """Running sum of reciprocals; finalizes to the harmonic mean."""
+
+    def _fold(self, group_ids, vectors, positions):
+        if np.any(vectors <= 0):
+            raise ValueError("Harmonic mean is only defined for positive numbers.")
+        np.add.at(self.sums, group_ids, 1.0 / vectors)
+
+    def _finalize_groups(self):
+        return np.maximum(self.counts, 1)[:, np.newaxis] / np.where(self.sums == 0, 1.0, self.sums)
+
+
+class ReservoirAccumulator(StreamingAccumulator):
+    """
+    Fixed-size uniform sample of each group (reservoir sampling, Algorithm R).
+
+    Memory per group is bounded by `sample_size` rows. At finalization the
+    exact method runs on each group's sample; groups with at most
+    `sample_size` chunks are therefore computed exactly. See
+    `embedding_methods.sample_rows` for the error bound.
+
+    Parameters:
+        method (str): Exact method applied to the sample (e.g. "median",
+            "trimmed_mean" or "tukeys_biweight")
+        sample_size (int, optional): Rows kept per group (default: DEFAULT_SAMPLE_SIZE)
+        trim_percentage (float): Fraction to trim for trimmed_mean (default: 0.1)
+        seed (int): Seed of the random generator (default: 0)
+    """
+
+    def __init__(self, method, sample_size=None, trim_percentage=0.1, seed=0):
+        super().__init__()
+        self.method = method
+        self.sample_size = sample_size or DEFAULT_SAMPLE_SIZE
+        self.trim_percentage = trim_percentage
+        self.rng = np.random.default_rng(seed)
+
+    def _init_state(self, capacity, dimension):
+        self.samples = [None] * capacity
+
+    def _grow_state(self, capacity):
+        self.samples.extend([None] * (capacity - len(self.samples)))
+
+    def _fold(self, group_ids, vectors, positions):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        # Draw the replacement slot of every row past the reservoir size at once
+        slots = np.where(
+            positions < self.sample_size,
+            positions,
+            np.floor(self.rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+        )
+        keep = slots < self.sample_size
+        if not keep.any():
+            return
+        order = np.argsort(group_ids[keep], kind="stable")
+        kept_groups = group_ids[keep][order]
+        kept_slots = slots[keep][order]
+        kept_vectors = vectors[keep][order]
+        bounds = np.flatnonzero(np.r_[True, kept_groups[1:] != kept_groups[:-1], True])
+
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            group_id = kept_groups[start]
+            group_slots = kept_slots[start:end]
+            sample = self.samples[group_id]
+            needed = int(group_slots.max()) + 1
+            if sample is None or sample.shape[0] < needed:
+                # Grow by doubling, up to the reservoir size
+                size = min(self.sample_size, max(needed, 2 * (0 if sample is None else sample.shape[0]), 8))
+                grown = np.zeros((size, self.dimension), dtype=np.float32)
+                if sample is not None:
+                    grown[:sample.shape[0]] = sample
+                sample = self.samples[group_id] = grown
+            sample[group_slots] = kept_vectors[start:end]
+
+    def _finalize_groups(self):
+        from .embedding_methods import calculate_embedding
+
+        results = np.zeros((self.size, self.dimension))
+        for group_id in range(self.size):
+            n = min(int(self.counts[group_id]), self.sample_size)
+            if n == 0:
+                continue
+            sample = self.samples[group_id][:n].astype(np.float64)
+            results[group_id] = calculate_embedding(
+                sample, self.method, trim_percentage=self.trim_percentage
+            )
+        return results
+
+    def state_dict(self):
+        if self.dimension is None:
+            return super().state_dict()
+        lengths = np.array([
+            0 if sample is None else min(int(count), self.sample_size)
+            for sample, count in zip(self.samples[:self.size], self.counts[:self.size])
+        ], dtype=np.int64)
+        rows = [self.samples[i][:lengths[i]] for i in range(self.size) if lengths[i]]
+        return {
+            'counts': self.counts[:self.size],
+            'sample_lengths': lengths,
+            'samples': np.concatenate(rows) if rows else np.zeros((0, self.dimension or 0), dtype=np.float32),
+        }
+
+    def load_state_dict(self, state):
+        counts = np.asarray(state['counts'], dtype=np.int64)
+        self.size = counts.shape[0]
+        if self.size == 0:
+            return
+        self.dimension = None
+        self._ensure_capacity(self.size, state['samples'].shape[1])
+        self.counts[:self.size] = counts
+        offsets = np.r_[0, np.cumsum(state['sample_lengths'])]
+        for group_id in range(self.size):
+            if state['sample_lengths'][group_id]:
+                self.samples[group_id] = np.array(state['samples'][offsets[group_id]:offsets[group_id + 1]])
+
+
+def supports_streaming(method):
+    """Return True if `method` can be computed in a single streaming pass."""
+    from .registry import get_method
+    return get_method(method).streaming
+
+
+def make_accumulator(method, weights=None, trim_percentage=0.1, sample_size=None):
+    """
+    Create the streaming accumulator for an aggregation method.
+
+    Parameters:
+        method (str): Aggregation method name
+        weights (list, optional): Weights for weighted_average method
+        trim_percentage (float): Fraction to trim for approx_trimmed_mean (default: 0.1)
+        sample_size (int, optional): Reservoir size of the approx_* methods
+
+    Returns:
+        StreamingAccumulator: Accumulator instance
+
+    Raises:
+        ValueError: If the method cannot be computed in a single pass
+    """
+    from .registry import get_method
+    return get_method(method).make_accumulator(weights, trim_percentage, sample_size)
+
+
+def _grow_rows(array, capacity, fill_value):
+    grown = np.full((capacity,) + array.shape[1:], fill_value, dtype=array.dtype)
+    grown[:array.shape[0]] = array
+    return grown
+
+
+def _positions_within_groups(group_ids, counts):
+    """
+    Position of each row within its group, continuing from previous batches.
+
+    Rows keep their batch order, so the i-th chunk seen for a group gets position i.
+    """
+    order = np.argsort(group_ids, kind="stable")
+    sorted_ids = group_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    run_lengths = np.diff(np.r_[starts, len(sorted_ids)])
+    ranks = np.arange(len(sorted_ids)) - np.repeat(starts, run_lengths)
+    positions = np.empty_like(group_ids)
+    positions[order] = counts[sorted_ids] + ranks
+    return positions
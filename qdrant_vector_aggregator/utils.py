@@ -1,9 +1,18 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, Batch, PointIdsList, Filter, FilterSelector, HasIdCondition,
+    UpdateStatus
+)
+from qdrant_client.local.qdrant_local import QdrantLocal
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from concurrent.futures import ThreadPoolExecutor
+from .qdrant_collection_helpers import VectorBatch
+from . import config
 import pickle
 import os
+import time
 
-def load_qdrant_collection(collection_name, qdrant_url="http://localhost:6333", api_key=None):
+def load_qdrant_collection(collection_name, qdrant_url="http://localhost:6333", api_key=None, **connection_options):
     """
     Load a Qdrant collection.
 
@@ -11,45 +20,376 @@ def load_qdrant_collection(collection_name, qdrant_url="http://localhost:6333",
         collection_name (str): Name of the Qdrant collection
         qdrant_url (str): URL of the Qdrant server (default: http://localhost:6333)
         api_key (str, optional): API key for Qdrant Cloud
+        **connection_options: prefer_grpc, grpc_port, grpc_compression, keepalive,
+            pool_size and timeout (see `client_kwargs`)
 
     Returns:
         QdrantClient: Connected Qdrant client
     """
-    client = QdrantClient(url=qdrant_url, api_key=api_key, timeout=120)
+    client = QdrantClient(url=qdrant_url, api_key=api_key, **client_kwargs(**connection_options))
     return client
 
-def save_qdrant_collection(client, collection_name, points, vector_size, distance=Distance.COSINE):
+def client_kwargs(
+    prefer_grpc=None,
+    grpc_port=None,
+    grpc_compression=None,
+    keepalive=None,
+    pool_size=None,
+    timeout=None
+):
+    """
+    Build the transport keyword arguments of `QdrantClient` / `AsyncQdrantClient`.
+
+    gRPC sends vectors as packed floats instead of JSON number lists, which
+    cuts encoding CPU and transfer size of bulk scroll and upsert calls.
+    Options left as None come from the config module (QDRANT_PREFER_GRPC,
+    QDRANT_GRPC_PORT, QDRANT_GRPC_COMPRESSION, QDRANT_KEEPALIVE,
+    QDRANT_POOL_SIZE and QDRANT_TIMEOUT in the environment or .env).
+
+    Parameters:
+        prefer_grpc (bool, optional): Use gRPC where available (default: False)
+        grpc_port (int, optional): gRPC port of the server (default: 6334)
+        grpc_compression (str, optional): "gzip" to compress gRPC messages (default: none)
+        keepalive (float, optional): Keep-alive in seconds: the gRPC keep-alive ping
+            interval, or how long idle REST connections stay open (default: client default)
+        pool_size (int, optional): Number of gRPC channels, or of pooled REST
+            connections (default: client default)
+        timeout (int, optional): Request timeout in seconds (default: 120)
+
+    Returns:
+        dict: Keyword arguments for the client constructor
+    """
+    if prefer_grpc is None:
+        prefer_grpc = config.QDRANT_PREFER_GRPC
+    if grpc_port is None:
+        grpc_port = config.QDRANT_GRPC_PORT
+    if grpc_compression is None:
+        grpc_compression = config.QDRANT_GRPC_COMPRESSION
+    if keepalive is None:
+        keepalive = config.QDRANT_KEEPALIVE
+    if pool_size is None:
+        pool_size = config.QDRANT_POOL_SIZE
+    if timeout is None:
+        timeout = config.QDRANT_TIMEOUT
+
+    kwargs = {'timeout': timeout}
+    if prefer_grpc:
+        kwargs.update(prefer_grpc=True, grpc_port=grpc_port)
+        if pool_size is not None:
+            kwargs['pool_size'] = pool_size
+        if grpc_compression:
+            if grpc_compression != 'gzip':
+                raise ValueError(f"Unsupported gRPC compression: {grpc_compression}")
+            from grpc import Compression
+            kwargs['grpc_compression'] = Compression.Gzip
+        if keepalive is not None:
+            kwargs['grpc_options'] = {
+                'grpc.keepalive_time_ms': int(keepalive * 1000),
+                'grpc.keepalive_permit_without_calls': 1,
+            }
+    elif keepalive is not None:
+        # The REST pool size is part of the connection limits; without one, keep
+        # httpx's default caps rather than None, which would leave the pool unbounded
+        import httpx
+        if pool_size is None:
+            max_connections, max_keepalive_connections = 100, 20
+        else:
+            max_connections = max_keepalive_connections = pool_size
+        kwargs['limits'] = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive
+        )
+    elif pool_size is not None:
+        kwargs['pool_size'] = pool_size
+    return kwargs
+
+def save_qdrant_collection(
+    client,
+    collection_name,
+    points,
+    vector_size,
+    distance=Distance.COSINE,
+    batch_size=100,
+    parallel=1,
+    wait=True,
+    max_retries=3,
+    retry_backoff=0.5,
+    consistency_timeout=300,
+    show_progress=True,
+    recreate=True,
+    progress_callback=None
+):
     """
     Save points to a Qdrant collection with batch upload.
 
     Parameters:
         client (QdrantClient): Qdrant client instance
         collection_name (str): Name of the collection to create/update
-        points (list): List of PointStruct objects
-        vector_size (int): Dimension of the vectors
-        distance (Distance): Distance metric to use (default: COSINE)
+        points (list, Batch or VectorBatch): List of PointStruct objects, or a columnar batch
+        vector_size (int or dict): Dimension of the vectors, or of each named vector
+        distance (Distance or dict): Distance metric to use (default: COSINE), or
+            the metric of each named vector
+        batch_size, parallel, wait, max_retries, retry_backoff,
+        consistency_timeout, show_progress, progress_callback: See `upload_points`
+        recreate (bool): Drop and recreate the collection (default: True). With
+            False, an existing collection is kept and points are upserted in place
+
+    Returns:
+        dict: Upload statistics (see `upload_points`)
     """
-    # Recreate collection
-    client.recreate_collection(
-        collection_name=collection_name,
-        vectors_config=VectorParams(size=vector_size, distance=distance),
+    if recreate:
+        # Recreate collection
+        client.recreate_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config(vector_size, distance),
+        )
+    else:
+        ensure_qdrant_collection(client, collection_name, vector_size, distance)
+
+    return upload_points(
+        client, collection_name, points,
+        batch_size=batch_size,
+        parallel=parallel,
+        wait=wait,
+        max_retries=max_retries,
+        retry_backoff=retry_backoff,
+        consistency_timeout=consistency_timeout,
+        show_progress=show_progress,
+        progress_callback=progress_callback
     )
 
-    # Upload points in batches to avoid timeouts
-    batch_size = 100
-    total_points = len(points)
+def ensure_qdrant_collection(client, collection_name, vector_size, distance=Distance.COSINE):
+    """
+    Create a collection unless it already exists.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        vector_size (int or dict): Dimension of the vectors, or of each named vector
+        distance (Distance or dict): Distance metric to use (default: COSINE)
+    """
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config(vector_size, distance),
+        )
+
+def vectors_config(vector_size, distance=Distance.COSINE):
+    """
+    Build the vectors config of a collection.
+
+    Parameters:
+        vector_size (int or dict): Dimension of the single unnamed vector, or a
+            dict mapping vector names to dimensions
+        distance (Distance or dict): Distance metric, or a dict mapping vector
+            names to metrics (default: COSINE)
+
+    Returns:
+        VectorParams or dict: Vectors config for `create_collection`
+    """
+    if not isinstance(vector_size, dict):
+        return VectorParams(size=vector_size, distance=distance)
+    return {
+        name: VectorParams(
+            size=size,
+            distance=distance[name] if isinstance(distance, dict) else distance
+        )
+        for name, size in vector_size.items()
+    }
+
+def delete_stale_points(client, collection_name, keep_ids, batch_size=1000):
+    """
+    Delete every point of a collection whose ID is not in `keep_ids`.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        keep_ids (iterable): Point IDs to keep
+        batch_size (int): Number of IDs scrolled per call (default: 1000)
+
+    Returns:
+        int: Number of deleted points
+    """
+    keep_ids = {str(point_id) for point_id in keep_ids}
+    stale_ids = []
+    offset = None
 
-    for i in range(0, total_points, batch_size):
-        batch = points[i:i + batch_size]
-        client.upsert(
+    while True:
+        points, next_offset = client.scroll(
             collection_name=collection_name,
-            points=batch,
-            wait=True  # Wait for each batch to complete
+            limit=batch_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False
+        )
+        stale_ids.extend(point.id for point in points if str(point.id) not in keep_ids)
+        if not points or next_offset is None:
+            break
+        offset = next_offset
+
+    for i in range(0, len(stale_ids), batch_size):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=stale_ids[i:i + batch_size]),
+            wait=True
+        )
+    return len(stale_ids)
+
+def upload_points(
+    client,
+    collection_name,
+    points,
+    batch_size=100,
+    parallel=1,
+    wait=True,
+    max_retries=3,
+    retry_backoff=0.5,
+    consistency_timeout=300,
+    show_progress=True,
+    progress_callback=None
+):
+    """
+    Upsert points into an existing collection in batches.
+
+    Parameters:
+        client (QdrantClient): Qdrant client instance
+        collection_name (str): Name of the collection
+        points (list, Batch or VectorBatch): List of PointStruct objects, or a columnar batch
+        batch_size (int): Number of points per upsert call (default: 100)
+        parallel (int): Number of batches uploaded concurrently (default: 1).
+            Ignored for local-mode clients, whose storage is not thread-safe
+        wait (bool): Wait for each batch to be applied (default: True). With
+            False, batches are acknowledged on receipt and a final consistency
+            barrier waits until all of them are applied
+        max_retries (int): Retries per batch on transient errors (default: 3)
+        retry_backoff (float): Initial retry delay in seconds, doubled on each retry (default: 0.5)
+        consistency_timeout (float): Seconds to wait at the final barrier when wait=False (default: 300)
+        show_progress (bool): Print an upload summary (default: True)
+        progress_callback (callable, optional): Called after each batch as
+            `progress_callback(n_points, prepare_seconds, upsert_seconds)`, where
+            preparing covers slicing, vector conversion and payload loading.
+            May be called from several threads when parallel > 1
+
+    Returns:
+        dict: Upload statistics with `points`, `batches`, `seconds` and `points_per_second`
+    """
+    # Upload points in batches to avoid timeouts. Each batch is sliced (and its
+    # vectors converted) only when it is sent
+    total_points = _count_points(points)
+    batch_starts = range(0, total_points, batch_size)
+    start_time = time.perf_counter()
+
+    def upload(start):
+        prepare_start = time.perf_counter()
+        batch = _batch_at(points, start, batch_size)
+        upsert_start = time.perf_counter()
+        _upsert_with_retry(client, collection_name, batch, wait, max_retries, retry_backoff)
+        if progress_callback is not None:
+            progress_callback(
+                min(batch_size, total_points - start),
+                upsert_start - prepare_start,
+                time.perf_counter() - upsert_start
+            )
+
+    # The local (":memory:" / path) backend is not thread-safe for writes
+    if parallel > 1 and not _is_local_client(client):
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            # Consume results to surface the first failed batch
+            for _ in executor.map(upload, batch_starts):
+                pass
+    else:
+        for start in batch_starts:
+            upload(start)
+
+    if not wait:
+        _wait_for_updates(client, collection_name, consistency_timeout)
+
+    seconds = time.perf_counter() - start_time
+    stats = {
+        'points': total_points,
+        'batches': len(batch_starts),
+        'seconds': seconds,
+        'points_per_second': total_points / seconds if seconds > 0 else float('inf'),
+    }
+
+    if show_progress:
+        print(
+            f"  Uploaded {total_points} points in {len(batch_starts)} batches "
+            f"({seconds:.2f}s, {stats['points_per_second']:.0f} points/sec)"
+        )
+
+    return stats
+
+def _split_batches(points, batch_size):
+    """Split a list of points or a columnar batch into upsert-sized batches."""
+    for start in range(0, _count_points(points), batch_size):
+        yield _batch_at(points, start, batch_size)
+
+def _batch_at(points, start, batch_size):
+    """Return the upsert batch of up to `batch_size` points beginning at `start`."""
+    stop = start + batch_size
+    if isinstance(points, VectorBatch):
+        return points.to_batch(start, stop)
+    if isinstance(points, Batch):
+        return Batch(
+            ids=points.ids[start:stop],
+            vectors=points.vectors[start:stop],
+            payloads=points.payloads[start:stop] if points.payloads is not None else None,
+        )
+    return points[start:stop]
+
+def _is_local_client(client):
+    """Return True if the client runs the in-process local backend."""
+    return isinstance(getattr(client, '_client', None), QdrantLocal)
+
+def _count_points(points):
+    return len(points.ids) if isinstance(points, (Batch, VectorBatch)) else len(points)
+
+def _is_transient_error(error):
+    """Return True for errors worth retrying: timeouts, dropped connections, 429 and 5xx responses."""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in (429, 500, 502, 503, 504)
+    import grpc
+    if isinstance(error, grpc.RpcError):
+        return error.code() in (
+            grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED, grpc.StatusCode.RESOURCE_EXHAUSTED
         )
+    return isinstance(error, (ResponseHandlingException, ConnectionError, TimeoutError))
+
+def _upsert_with_retry(client, collection_name, batch, wait, max_retries, retry_backoff):
+    """Upsert one batch, retrying transient errors with exponential backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            return client.upsert(collection_name=collection_name, points=batch, wait=wait)
+        except Exception as e:
+            if attempt == max_retries or not _is_transient_error(e):
+                raise
+            time.sleep(retry_backoff * 2 ** attempt)
+
+def _wait_for_updates(client, collection_name, timeout):
+    """
+    Consistency barrier: wait until every earlier update of the collection is applied.
+
+    Updates are applied in order on each shard, so a no-op delete sent with
+    wait=True to all shards completes only after the batches upserted before it
+    with wait=False. Points are then visible to reads; index optimization may
+    still be running, which does not affect them.
 
-        # Print progress
-        progress = min(i + batch_size, total_points)
-        print(f"  Uploaded {progress}/{total_points} points ({progress/total_points*100:.1f}%)")
+    Raises:
+        TimeoutError: If the updates are not applied within `timeout` seconds
+    """
+    result = client.delete(
+        collection_name=collection_name,
+        points_selector=FilterSelector(filter=Filter(must=[HasIdCondition(has_id=[])])),
+        wait=True,
+        timeout=int(timeout)
+    )
+    if result.status != UpdateStatus.COMPLETED:
+        raise TimeoutError(
+            f"Updates of collection '{collection_name}' were not applied after {timeout}s "
+            f"(status: {result.status})."
+        )
 
 def load_metadata(metadata_path):
     """Load metadata from pickle file."""
@@ -22,7 +22,6 @@ setup(
         'qdrant-client>=1.7.0',
         'numpy>=1.21.0',
         'scipy>=1.7.0',
-        'scikit-learn>=1.0.0',
         'python-dotenv>=0.19.0',
     ],
     extras_require={
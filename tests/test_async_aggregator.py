@@ -0,0 +1,104 @@
+import asyncio
+
+import numpy as np
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from qdrant_vector_aggregator import async_aggregator
+from qdrant_vector_aggregator.aggregator import aggregate_embeddings
+from qdrant_vector_aggregator.async_aggregator import aggregate_embeddings_async
+
+N_GROUPS = 12
+
+
+def _points(n_points=120):
+    rng = np.random.default_rng(0)
+    return [
+        PointStruct(
+            id=i, vector=rng.standard_normal(8).tolist(),
+            payload={"metadata": {"doc": f"doc{i % N_GROUPS}", "chunk_index": i}, "page_content": f"text {i}"}
+        )
+        for i in range(n_points)
+    ]
+
+
+async def _async_client(points):
+    client = AsyncQdrantClient(":memory:")
+    await client.create_collection("chunks", vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    if points:
+        await client.upsert("chunks", points)
+    return client
+
+
+async def _read(client, collection_name):
+    points, _ = await client.scroll(collection_name, limit=10 * N_GROUPS, with_vectors=True)
+    return {point.payload["metadata"]["doc"]: np.array(point.vector) for point in points}
+
+
+@pytest.mark.parametrize("method", ["average", "median"])
+def test_matches_sync_aggregation(method):
+    sync_client = QdrantClient(":memory:")
+    sync_client.create_collection("chunks", vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    sync_client.upsert("chunks", _points())
+    aggregate_embeddings("chunks", "metadata.doc", "output", method=method, client=sync_client)
+    points, _ = sync_client.scroll("output", limit=10 * N_GROUPS, with_vectors=True)
+    expected = {point.payload["metadata"]["doc"]: np.array(point.vector) for point in points}
+
+    async def run():
+        client = await _async_client(_points())
+        await aggregate_embeddings_async(
+            "chunks", "metadata.doc", "output", method=method, client=client,
+            scroll_batch_size=25, upload_batch_size=5
+        )
+        return await _read(client, "output")
+
+    result = asyncio.run(run())
+
+    assert set(result) == set(expected)
+    for doc, vector in expected.items():
+        np.testing.assert_allclose(result[doc], vector, rtol=1e-6)
+
+
+def test_empty_input_raises():
+    async def run():
+        client = await _async_client([])
+        with pytest.raises(ValueError, match="No points"):
+            await aggregate_embeddings_async("chunks", "metadata.doc", "output", client=client)
+        assert not await client.collection_exists("output")
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("points", [_points(), []], ids=["success", "failure"])
+def test_own_client_is_closed(monkeypatch, points):
+    clients = []
+
+    async def run():
+        client = await _async_client(points)
+        closed = []
+
+        async def close(**kwargs):
+            closed.append(True)
+
+        client.close = close
+        clients.append(closed)
+        monkeypatch.setattr(async_aggregator, "AsyncQdrantClient", lambda **kwargs: client)
+        try:
+            await aggregate_embeddings_async("chunks", "metadata.doc", "output", qdrant_url="http://unused")
+        except ValueError:
+            pass
+
+    asyncio.run(run())
+
+    assert clients == [[True]]
+
+
+def test_passed_client_is_left_open():
+    async def run():
+        client = await _async_client(_points())
+        await aggregate_embeddings_async("chunks", "metadata.doc", "output", client=client)
+        # Still usable
+        assert (await client.count("output")).count == N_GROUPS
+
+    asyncio.run(run())
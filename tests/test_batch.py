@@ -0,0 +1,40 @@
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from qdrant_vector_aggregator.batch import aggregate_collections
+from qdrant_vector_aggregator.instrumentation import Instrumentation
+
+
+def _client(collection_names, n_points=60):
+    rng = np.random.default_rng(0)
+    client = QdrantClient(":memory:")
+    for name in collection_names:
+        client.create_collection(name, vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+        client.upsert(name, [
+            PointStruct(id=i, vector=rng.standard_normal(8).tolist(), payload={"metadata": {"doc": f"doc{i % 6}"}})
+            for i in range(n_points)
+        ])
+    return client
+
+
+def test_default_instrumentation_is_not_shared():
+    client = _client(["a", "b", "c"])
+    template_events, job_events = [], []
+    template = Instrumentation(hooks=[lambda event, fields: template_events.append(event)])
+
+    summaries = aggregate_collections(
+        [(name, "metadata.doc", f"{name}_out") for name in ["a", "b", "c"]],
+        client=client, instrumentation=template,
+        hooks=[lambda event, fields: job_events.append((event, fields["job"]))]
+    )
+
+    assert [summary['status'] for summary in summaries] == ['ok'] * 3
+    # The template is left untouched
+    assert len(template.hooks) == 1
+    assert template.counters == {} and template.histograms == {}
+    # Each job counts only its own points, and each event reaches the hook once
+    assert [summary['counters']['points_scrolled'] for summary in summaries] == [60] * 3
+    assert template_events.count('groups_finalized') == 3
+    assert sorted(job for event, job in job_events if event == 'groups_finalized') == [0, 1, 2]
+    assert sorted(job for event, job in job_events if event == 'job_end') == [0, 1, 2]
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from qdrant_vector_aggregator.aggregator import aggregate_embeddings
+
+N_POINTS = 400
+N_GROUPS = 50
+
+
+def _client():
+    rng = np.random.default_rng(0)
+    client = QdrantClient(":memory:")
+    client.create_collection("chunks", vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    client.upsert("chunks", [
+        PointStruct(
+            id=i, vector=rng.standard_normal(8).tolist(),
+            payload={"metadata": {"doc": f"doc{i % N_GROUPS}", "chunk_index": i}, "page_content": f"text {i}"}
+        )
+        for i in range(N_POINTS)
+    ])
+    return client
+
+
+def _read(client, collection_name):
+    points, _ = client.scroll(collection_name, limit=10 * N_GROUPS, with_payload=True, with_vectors=True)
+    return {point.payload["metadata"]["doc"]: (np.array(point.vector), point.payload) for point in points}
+
+
+def _failing_upsert(client, fail_at):
+    upsert = client.upsert
+    calls = {"count": 0}
+
+    def failing(**kwargs):
+        calls["count"] += 1
+        if calls["count"] == fail_at:
+            raise RuntimeError("upsert failed")
+        return upsert(**kwargs)
+
+    return failing, upsert
+
+
+@pytest.mark.parametrize("method", ["average", "median"])
+@pytest.mark.parametrize("resume_batch_size", [40, 7])
+def test_resume_upload_with_other_batch_size(tmp_path, method, resume_batch_size):
+    client = _client()
+    aggregate_embeddings("chunks", "metadata.doc", "reference", method=method, client=client)
+    expected = _read(client, "reference")
+
+    options = dict(
+        method=method, client=client, job_id="job", checkpoint_dir=str(tmp_path),
+        checkpoint_every=2, scroll_batch_size=50
+    )
+    client.upsert, upsert = _failing_upsert(client, fail_at=3)
+    with pytest.raises(RuntimeError):
+        aggregate_embeddings("chunks", "metadata.doc", "output", upload_batch_size=10, **options)
+    client.upsert = upsert
+    assert os.path.exists(tmp_path / "job")
+
+    aggregate_embeddings("chunks", "metadata.doc", "output", upload_batch_size=resume_batch_size, **options)
+
+    result = _read(client, "output")
+    assert set(result) == set(expected)
+    for doc, (vector, payload) in expected.items():
+        np.testing.assert_allclose(result[doc][0], vector, rtol=1e-6)
+        assert result[doc][1] == payload
+    assert not os.listdir(tmp_path)
+
+
+def test_resume_after_scan_failure(tmp_path):
+    client = _client()
+    aggregate_embeddings("chunks", "metadata.doc", "reference", client=client)
+    expected = _read(client, "reference")
+
+    scroll = client.scroll
+    calls = {"count": 0}
+
+    def failing(**kwargs):
+        calls["count"] += 1
+        if calls["count"] == 6:
+            raise RuntimeError("scroll failed")
+        return scroll(**kwargs)
+
+    options = dict(client=client, job_id="job", checkpoint_dir=str(tmp_path), checkpoint_every=2, scroll_batch_size=50)
+    client.scroll = failing
+    with pytest.raises(RuntimeError):
+        aggregate_embeddings("chunks", "metadata.doc", "output", **options)
+    client.scroll = scroll
+
+    aggregate_embeddings("chunks", "metadata.doc", "output", **options)
+
+    result = _read(client, "output")
+    assert {doc: payload for doc, (_, payload) in result.items()} == \
+        {doc: payload for doc, (_, payload) in expected.items()}
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+from qdrant_vector_aggregator.embedding_methods import _mean_distances, calculate_exemplar
+from qdrant_vector_aggregator.grouped_methods import SharedGroups, shared_exemplar
+
+
+def _embeddings(n, seed=0, dimension=8):
+    return np.random.default_rng(seed).standard_normal((n, dimension))
+
+
+def _cdist_exemplar(embeddings, metric):
+    return embeddings[np.argmin(cdist(embeddings, embeddings, metric=metric).mean(axis=1))]
+
+
+@pytest.mark.parametrize("metric", ["cosine", "sqeuclidean"])
+@pytest.mark.parametrize("n", [1, 2, 17, 300])
+def test_closed_form_matches_cdist(metric, n):
+    embeddings = _embeddings(n)
+
+    mean_distances = _mean_distances(embeddings, metric, block_size=1024)
+
+    np.testing.assert_allclose(
+        mean_distances, cdist(embeddings, embeddings, metric=metric).mean(axis=1), atol=1e-10
+    )
+
+
+@pytest.mark.parametrize("metric", ["cosine", "sqeuclidean"])
+@pytest.mark.parametrize("n", [1, 17, 300])
+def test_exemplar_matches_cdist(metric, n):
+    # n=2 is left out: both rows are equally central, up to rounding
+    embeddings = _embeddings(n)
+
+    np.testing.assert_array_equal(calculate_exemplar(embeddings, metric), _cdist_exemplar(embeddings, metric))
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "cityblock"])
+@pytest.mark.parametrize("block_size", [1, 7, 1024])
+def test_blocked_fallback_matches_cdist(metric, block_size):
+    embeddings = _embeddings(50, seed=1)
+
+    mean_distances = _mean_distances(embeddings, metric, block_size)
+
+    np.testing.assert_allclose(
+        mean_distances, cdist(embeddings, embeddings, metric=metric).mean(axis=1), rtol=1e-12
+    )
+
+
+def test_blocked_fallback_on_large_group():
+    # More rows than one block, with a partial last block
+    embeddings = _embeddings(2500, seed=2, dimension=4)
+
+    exemplar = calculate_exemplar(embeddings, metric="euclidean", block_size=1024)
+
+    np.testing.assert_array_equal(exemplar, _cdist_exemplar(embeddings, "euclidean"))
+
+
+@pytest.mark.parametrize("metric", ["cosine", "cityblock"])
+def test_ties_pick_the_first_row(metric):
+    # Every row has exactly the same mean distance to the others
+    embeddings = np.array([[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0], [0.0, -1.0]])
+
+    np.testing.assert_array_equal(calculate_exemplar(embeddings, metric), embeddings[0])
+    np.testing.assert_array_equal(calculate_exemplar(embeddings, metric, top_k=4), embeddings)
+
+
+def test_top_k_ordered_by_centrality():
+    embeddings = _embeddings(40, seed=3)
+    order = np.argsort(cdist(embeddings, embeddings, metric="cosine").mean(axis=1))
+
+    np.testing.assert_array_equal(calculate_exemplar(embeddings, top_k=5), embeddings[order[:5]])
+
+
+def test_zero_rows_do_not_fail():
+    embeddings = np.vstack([np.zeros(3), _embeddings(5, dimension=3)])
+
+    assert np.isfinite(_mean_distances(embeddings, "cosine", block_size=1024)).all()
+
+
+@pytest.mark.parametrize("shuffle", [False, True], ids=["sorted", "unsorted"])
+def test_shared_matches_per_group(shuffle):
+    rng = np.random.default_rng(4)
+    group_ids = np.repeat(np.arange(5), [6, 1, 9, 2, 13])
+    if shuffle:
+        group_ids = rng.permutation(group_ids)
+    embeddings = rng.standard_normal((len(group_ids), 8))
+
+    exemplars = shared_exemplar(SharedGroups(embeddings, group_ids))
+
+    expected = np.array([calculate_exemplar(embeddings[group_ids == g]) for g in range(5)])
+    np.testing.assert_array_equal(exemplars, expected)
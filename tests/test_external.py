@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from qdrant_vector_aggregator.external import SpilledEmbeddings
+
+
+def _spill(tmp_path, group_sizes, dimension=4, sort_memory_bytes=256, shuffle=True, seed=0):
+    rng = np.random.default_rng(seed)
+    group_ids = np.repeat(np.arange(len(group_sizes)), group_sizes)
+    if shuffle:
+        group_ids = rng.permutation(group_ids)
+    vectors = rng.standard_normal((len(group_ids), dimension)).astype(np.float32)
+    spilled = SpilledEmbeddings(str(tmp_path), sort_block_rows=13, sort_memory_bytes=sort_memory_bytes)
+    for start in range(0, len(group_ids), 29):
+        spilled.append(vectors[start:start + 29], group_ids[start:start + 29])
+    return spilled, vectors, group_ids
+
+
+@pytest.mark.parametrize("group_sizes", [
+    [3, 22, 2, 13],
+    [1] * 50,
+    [200],
+    [5, 90, 1, 1, 70, 4, 4],
+], ids=["mixed", "single_rows", "one_group", "oversized"])
+@pytest.mark.parametrize("sort_memory_bytes", [16, 256, 2**20])
+def test_sort_keeps_append_order_within_groups(tmp_path, group_sizes, sort_memory_bytes):
+    spilled, vectors, group_ids = _spill(tmp_path, group_sizes, sort_memory_bytes=sort_memory_bytes)
+    with spilled:
+        spilled.sort()
+        for group_id in range(len(group_sizes)):
+            np.testing.assert_array_equal(spilled.group(group_id), vectors[group_ids == group_id])
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["vectors.sorted.raw"]
+    assert not list(tmp_path.iterdir())
+
+
+def test_oversized_groups_get_their_own_bucket(tmp_path):
+    # 10-row buckets of 4-dimensional float32 rows
+    spilled = SpilledEmbeddings(str(tmp_path), sort_memory_bytes=10 * 16)
+    with spilled:
+        spilled.dimension = 4
+        spilled.n_rows = 40
+        spilled.offsets = np.array([0, 3, 25, 27, 40])
+
+        np.testing.assert_array_equal(spilled._bucket_bounds(), [0, 1, 2, 3, 4])
+
+
+def test_bucket_sizes(tmp_path):
+    rng = np.random.default_rng(1)
+    counts = rng.integers(1, 40, size=300)
+    bucket_rows = 50
+    spilled = SpilledEmbeddings(str(tmp_path), sort_memory_bytes=bucket_rows * 16)
+    with spilled:
+        spilled.dimension = 4
+        spilled.offsets = np.r_[0, np.cumsum(counts)]
+        spilled.n_rows = int(spilled.offsets[-1])
+
+        bounds = spilled._bucket_bounds()
+
+        assert bounds[0] == 0 and bounds[-1] == len(counts)
+        for first, end in zip(bounds[:-1], bounds[1:]):
+            rows = spilled.offsets[end] - spilled.offsets[first]
+            assert end - first == 1 or rows <= 2 * bucket_rows
+
+
+def test_empty(tmp_path):
+    with SpilledEmbeddings(str(tmp_path)) as spilled:
+        spilled.sort()
+        assert spilled.n_rows == 0
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from qdrant_vector_aggregator.embedding_methods import calculate_embedding
+from qdrant_vector_aggregator.grouped_methods import calculate_grouped_embeddings
+from qdrant_vector_aggregator.registry import available_methods, get_method
+
+BATCHED_METHODS = [name for name in available_methods() if get_method(name).batched]
+
+
+def _per_group(embeddings, group_ids, method, weights=None):
+    """Reference: calculate_embedding on each group, rows in their original order."""
+    results = []
+    for group in np.unique(group_ids):
+        rows = group_ids == group
+        group_weights = weights[rows] if weights is not None else None
+        results.append(calculate_embedding(embeddings[rows], method, weights=group_weights))
+    return np.array(results)
+
+
+def _case(group_sizes, shuffle, seed=0, dimension=8):
+    rng = np.random.default_rng(seed)
+    group_ids = np.repeat(np.arange(len(group_sizes)), group_sizes)
+    if shuffle:
+        group_ids = rng.permutation(group_ids)
+    embeddings = rng.standard_normal((len(group_ids), dimension))
+    weights = rng.random(len(group_ids)) + 0.1
+    return embeddings, group_ids, weights
+
+
+@pytest.mark.parametrize("method", BATCHED_METHODS)
+@pytest.mark.parametrize("group_sizes", [
+    [5, 3, 7, 1],
+    [1, 1, 1],
+    [12],
+], ids=["mixed", "single_rows", "one_group"])
+@pytest.mark.parametrize("shuffle", [False, True], ids=["sorted", "unsorted"])
+def test_grouped_matches_per_group(method, group_sizes, shuffle):
+    embeddings, group_ids, weights = _case(group_sizes, shuffle)
+    if "weights" not in get_method(method).options:
+        weights = None
+
+    grouped = calculate_grouped_embeddings(embeddings, group_ids, method, weights)
+
+    np.testing.assert_allclose(grouped, _per_group(embeddings, group_ids, method, weights), rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize("method", BATCHED_METHODS)
+def test_float32_input(method):
+    embeddings, group_ids, weights = _case([4, 9, 2], shuffle=True, seed=1)
+    embeddings = embeddings.astype(np.float32)
+    if "weights" not in get_method(method).options:
+        weights = None
+
+    grouped = calculate_grouped_embeddings(embeddings, group_ids, method, weights)
+
+    np.testing.assert_allclose(grouped, _per_group(embeddings, group_ids, method, weights), rtol=1e-5, atol=1e-6)
+
+
+def test_unbatched_method_rejected():
+    embeddings, group_ids, _ = _case([2, 2], shuffle=False)
+    with pytest.raises(ValueError):
+        calculate_grouped_embeddings(embeddings, group_ids, "median")
+
+
+def test_empty_matrix():
+    result = calculate_grouped_embeddings(np.zeros((0, 4)), np.zeros(0, dtype=np.int64), "average")
+    assert result.shape == (0, 4)
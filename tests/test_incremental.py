@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, FieldCondition, Filter, PointStruct, VectorParams
+
+from qdrant_vector_aggregator.aggregator import aggregate_embeddings
+from qdrant_vector_aggregator.incremental import _match_values, aggregate_embeddings_incremental
+
+
+def _point(point_id, key, version=0, seed=None):
+    rng = np.random.default_rng(point_id if seed is None else seed)
+    return PointStruct(
+        id=point_id, vector=rng.standard_normal(8).tolist(),
+        payload={"metadata": {"doc": key, "version": version, "chunk_index": point_id}, "page_content": f"text {point_id}"}
+    )
+
+
+def _client(keys, chunks_per_group=4):
+    client = QdrantClient(":memory:")
+    client.create_collection("chunks", vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    client.upsert("chunks", [
+        _point(i * chunks_per_group + j, key)
+        for i, key in enumerate(keys) for j in range(chunks_per_group)
+    ])
+    return client
+
+
+def _read(client, collection_name):
+    points, _ = client.scroll(collection_name, limit=1000, with_vectors=True)
+    result = {point.payload["metadata"]["doc"]: np.array(point.vector) for point in points}
+    assert len(result) == len(points), "more than one point per group"
+    return result
+
+
+def _assert_matches_full_rebuild(client, output_collection_name="output"):
+    if client.collection_exists("reference"):
+        client.delete_collection("reference")
+    aggregate_embeddings("chunks", "metadata.doc", "reference", client=client)
+    expected = _read(client, "reference")
+    result = _read(client, output_collection_name)
+    assert set(result) == set(expected)
+    for key, vector in expected.items():
+        np.testing.assert_allclose(result[key], vector, rtol=1e-5, atol=1e-6)
+
+
+def _run(client, tmp_path, **kwargs):
+    return aggregate_embeddings_incremental(
+        "chunks", "metadata.doc", "output", str(tmp_path / "state.json"),
+        client=client, version_field="metadata.version", scroll_batch_size=5, groups_per_fetch=2, **kwargs
+    )
+
+
+def test_new_changed_and_deleted_chunks(tmp_path):
+    keys = [f"doc{i}" for i in range(6)]
+    client = _client(keys)
+
+    assert _run(client, tmp_path) == {"new": 6, "changed": 0, "deleted": 0, "unchanged": 0}
+    _assert_matches_full_rebuild(client)
+
+    # New chunk in a new group, modified chunk in doc1, added chunk in doc2, doc3 removed
+    client.upsert("chunks", [
+        _point(100, "doc6"),
+        _point(4, "doc1", version=1, seed=1000),
+        _point(101, "doc2"),
+    ])
+    client.delete("chunks", points_selector=[12, 13, 14, 15])
+
+    assert _run(client, tmp_path) == {"new": 1, "changed": 2, "deleted": 1, "unchanged": 3}
+    _assert_matches_full_rebuild(client)
+
+    # A chunk moving between groups changes both
+    client.upsert("chunks", [_point(0, "doc4")])
+    assert _run(client, tmp_path) == {"new": 0, "changed": 2, "deleted": 0, "unchanged": 4}
+    _assert_matches_full_rebuild(client)
+
+
+def test_unchanged_run_and_state_file(tmp_path):
+    client = _client(["a", "b", "c"])
+    _run(client, tmp_path)
+
+    with open(tmp_path / "state.json", encoding="utf-8") as f:
+        state = json.load(f)
+    assert sorted(state["groups"]) == ['"a"', '"b"', '"c"']
+    assert state["groups"]['"a"']["chunks"] == {"0": 0, "1": 0, "2": 0, "3": 0}
+    assert not (tmp_path / "state.json.tmp").exists()
+
+    assert _run(client, tmp_path) == {"new": 0, "changed": 0, "deleted": 0, "unchanged": 3}
+    # Other settings recompute every group
+    assert _run(client, tmp_path, method="median") == {"new": 0, "changed": 3, "deleted": 0, "unchanged": 0}
+
+
+@pytest.mark.parametrize("keys", [
+    [0.5, 1.25, -3.0],
+    [True, False],
+    ["x", "y", "z"],
+    [1, 2, 3],
+], ids=["float", "bool", "str", "int"])
+def test_key_types(tmp_path, keys):
+    client = _client(keys)
+    _run(client, tmp_path)
+
+    client.upsert("chunks", [_point(1, keys[0], version=1, seed=1000), _point(100, keys[-1])])
+
+    assert _run(client, tmp_path) == {"new": 0, "changed": 2, "deleted": 0, "unchanged": len(keys) - 2}
+    _assert_matches_full_rebuild(client)
+
+
+def test_first_run_deletes_stale_points(tmp_path):
+    client = _client(["a", "b", "c", "d"])
+    # Points of an earlier full aggregation, under random IDs
+    aggregate_embeddings("chunks", "metadata.doc", "output", client=client)
+    client.delete("chunks", points_selector=[0, 1, 2, 3])
+
+    assert _run(client, tmp_path) == {"new": 3, "changed": 0, "deleted": 0, "unchanged": 0}
+    assert client.count("output").count == 3
+    _assert_matches_full_rebuild(client)
+
+
+def test_match_values():
+    assert isinstance(_match_values("k", ["a", "b"]), FieldCondition)
+    assert _match_values("k", [1.5]).range.gte == 1.5
+    assert _match_values("k", [True]).match.value is True
+
+    mixed = _match_values("k", ["a", 1, True, 0.5])
+    assert isinstance(mixed, Filter) and len(mixed.should) == 4
+
+    with pytest.raises(ValueError):
+        _match_values("k", [None])
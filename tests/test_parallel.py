@@ -0,0 +1,68 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from qdrant_vector_aggregator import parallel
+from qdrant_vector_aggregator.embedding_methods import calculate_embedding
+from qdrant_vector_aggregator.parallel import calculate_embeddings_parallel
+
+
+def _per_group(embeddings, group_ids, method):
+    return np.array([
+        calculate_embedding(embeddings[group_ids == group], method)
+        for group in np.unique(group_ids)
+    ])
+
+
+def _case(seed=0, dtype=np.float64):
+    rng = np.random.default_rng(seed)
+    group_ids = rng.permutation(np.repeat(np.arange(6), [5, 1, 9, 3, 3, 7]))
+    embeddings = rng.standard_normal((len(group_ids), 4)).astype(dtype)
+    return embeddings, group_ids
+
+
+@pytest.mark.parametrize("method", ["average", "median"])
+@pytest.mark.parametrize("chunk_rows", [1, 8, 4096])
+def test_own_pool_matches_per_group(method, chunk_rows):
+    embeddings, group_ids = _case()
+
+    results = calculate_embeddings_parallel(embeddings, group_ids, method, workers=2, chunk_rows=chunk_rows)
+
+    np.testing.assert_allclose(results, _per_group(embeddings, group_ids, method))
+
+
+def test_shared_executor_across_calls():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for seed in range(3):
+            embeddings, group_ids = _case(seed)
+            results = calculate_embeddings_parallel(
+                embeddings, group_ids, "average", chunk_rows=4, executor=executor
+            )
+            np.testing.assert_allclose(results, _per_group(embeddings, group_ids, "average"))
+
+
+def test_results_are_float64():
+    embeddings, group_ids = _case(dtype=np.float32)
+
+    results = calculate_embeddings_parallel(embeddings, group_ids, "average", workers=2)
+
+    assert results.dtype == np.float64
+    np.testing.assert_allclose(results, _per_group(embeddings, group_ids, "average"), rtol=1e-6)
+    assert calculate_embeddings_parallel(embeddings[:0], group_ids[:0], "average").dtype == np.float64
+
+
+@pytest.mark.parametrize("shared_executor", [False, True])
+def test_pickled_fallback(monkeypatch, shared_executor):
+    monkeypatch.setattr(parallel, "shared_memory", None)
+    embeddings, group_ids = _case()
+
+    if shared_executor:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = calculate_embeddings_parallel(
+                embeddings, group_ids, "median", chunk_rows=4, executor=executor
+            )
+    else:
+        results = calculate_embeddings_parallel(embeddings, group_ids, "median", workers=2, chunk_rows=4)
+
+    np.testing.assert_allclose(results, _per_group(embeddings, group_ids, "median"))
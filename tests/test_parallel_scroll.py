@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from qdrant_vector_aggregator.parallel_scroll import (
+    id_range_segments, parallel_scroll, payload_value_segments, scroll_segment
+)
+
+N_POINTS = 257
+N_GROUPS = 5
+
+
+def _collection(point_id):
+    client = QdrantClient(":memory:")
+    client.create_collection("chunks", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert("chunks", [
+        PointStruct(id=point_id(i), vector=[1.0, float(i), 0.5, 2.0], payload={"group": i % N_GROUPS})
+        for i in range(N_POINTS)
+    ])
+    return client
+
+
+def _int_collection():
+    # Sparse IDs, so the ID ranges below are not aligned with the points
+    return _collection(lambda i: 3 * i + 1)
+
+
+def _uuid_collection():
+    return _collection(lambda i: str(uuid.uuid5(uuid.NAMESPACE_OID, str(i))))
+
+
+def _ids(pages):
+    ids = [point.id for points in pages for point in points]
+    assert len(ids) == len(set(ids)), "a point was read twice"
+    return set(ids)
+
+
+def _sequential_ids(client):
+    return _ids(scroll_segment(client, "chunks", None, limit=32, with_vectors=False))
+
+
+@pytest.mark.parametrize("segments", [
+    id_range_segments(0, 3 * N_POINTS, 4),
+    id_range_segments(100, 200, 7),
+    [(None, None)],
+], ids=["covering", "narrow", "single"])
+def test_integer_id_ranges_match_sequential(segments):
+    client = _int_collection()
+
+    pages = parallel_scroll(client, "chunks", segments, workers=3, limit=32, with_vectors=False)
+
+    assert _ids(pages) == _sequential_ids(client)
+
+
+@pytest.mark.parametrize("make_client", [_int_collection, _uuid_collection], ids=["int", "uuid"])
+def test_payload_segments_match_sequential(make_client):
+    client = make_client()
+    segments = payload_value_segments("group", range(N_GROUPS))
+
+    pages = parallel_scroll(client, "chunks", segments, workers=3, limit=32, with_vectors=False)
+
+    assert _ids(pages) == _sequential_ids(client)
+    assert len(_sequential_ids(client)) == N_POINTS
+
+
+def test_uuid_ids_with_id_ranges_raise():
+    client = _uuid_collection()
+    segments = id_range_segments(0, N_POINTS, 4)
+
+    with pytest.raises(ValueError, match="integer point IDs"):
+        list(parallel_scroll(client, "chunks", segments, workers=2, limit=32, with_vectors=False))
+
+
+def test_uuid_ids_with_open_range():
+    client = _uuid_collection()
+
+    pages = parallel_scroll(client, "chunks", [(None, None)], workers=1, limit=32, with_vectors=False)
+
+    assert _ids(pages) == _sequential_ids(client)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from qdrant_vector_aggregator.embedding_methods import _first_principal_component, calculate_pca
+
+
+def _case(n_samples, n_dimensions, seed=0):
+    """Noisy samples along one dominant direction, so the first component is well separated."""
+    rng = np.random.default_rng(seed)
+    direction = rng.standard_normal(n_dimensions)
+    scores = rng.standard_normal(n_samples) * 5.0
+    return np.outer(scores, direction) + rng.standard_normal((n_samples, n_dimensions)) + 1.0
+
+
+def _sign_normalized(vector):
+    return vector * np.sign(vector[np.argmax(np.abs(vector))])
+
+
+def _svd_component(embeddings):
+    _, _, vt = np.linalg.svd(embeddings - embeddings.mean(axis=0), full_matrices=False)
+    return vt[0]
+
+
+@pytest.mark.parametrize("shape", [(5, 32), (31, 32), (32, 32), (200, 16)],
+                         ids=["gram", "gram_square", "svd_square", "svd"])
+def test_component_matches_svd(shape):
+    embeddings = _case(*shape)
+
+    pc1 = _first_principal_component(embeddings)
+
+    assert np.isclose(np.linalg.norm(pc1), 1.0)
+    np.testing.assert_allclose(_sign_normalized(pc1), _sign_normalized(_svd_component(embeddings)), atol=1e-8)
+
+
+@pytest.mark.parametrize("shape", [(5, 32), (200, 16)], ids=["gram", "svd"])
+def test_component_matches_sklearn(shape):
+    decomposition = pytest.importorskip("sklearn.decomposition")
+    embeddings = _case(*shape, seed=1)
+
+    expected = decomposition.PCA(n_components=1).fit(embeddings).components_[0]
+
+    np.testing.assert_allclose(
+        _sign_normalized(_first_principal_component(embeddings)), _sign_normalized(expected), atol=1e-8
+    )
+
+
+@pytest.mark.parametrize("shape", [(5, 32), (200, 16)], ids=["gram", "svd"])
+def test_pca_matches_svd_reconstruction(shape):
+    embeddings = _case(*shape, seed=2)
+    pc1 = _svd_component(embeddings)
+
+    np.testing.assert_allclose(calculate_pca(embeddings), (embeddings @ pc1).mean() * pc1, atol=1e-10)
+    # Negating the data negates the result, whatever sign the component comes out with
+    np.testing.assert_allclose(calculate_pca(embeddings), calculate_pca(-embeddings) * -1, atol=1e-10)
+
+
+@pytest.mark.parametrize("shape", [(1, 8), (4, 8), (20, 8)])
+def test_identical_rows(shape):
+    # Zero variance: the Gram branch falls back to the SVD
+    embeddings = np.tile(np.arange(1.0, shape[1] + 1), (shape[0], 1))
+
+    pc1 = _first_principal_component(embeddings)
+
+    assert np.isfinite(pc1).all() and np.isclose(np.linalg.norm(pc1), 1.0)
+    assert np.isfinite(calculate_pca(embeddings)).all()
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from qdrant_vector_aggregator.embedding_methods import calculate_embedding
+from qdrant_vector_aggregator.registry import available_methods, get_method
+from qdrant_vector_aggregator.streaming import make_accumulator
+
+STREAMING_METHODS = [name for name in available_methods() if get_method(name).streaming]
+POSITIVE_METHODS = {"geometric_mean", "harmonic_mean"}
+N_CHUNKS = 4
+
+
+def _per_group(embeddings, group_ids, method, weights=None):
+    """Reference: calculate_embedding on each group, rows in their original order."""
+    return np.array([
+        calculate_embedding(embeddings[group_ids == group], method, weights=weights)
+        for group in range(group_ids.max() + 1)
+    ])
+
+
+def _case(method, seed=0, n_groups=40, dimension=6):
+    """Groups in first-seen order; every group has N_CHUNKS chunks for weighted_average."""
+    rng = np.random.default_rng(seed)
+    if method == "weighted_average":
+        sizes = np.full(n_groups, N_CHUNKS)
+    else:
+        sizes = rng.integers(1, 9, n_groups)
+    group_ids = rng.permutation(np.repeat(np.arange(n_groups), sizes))
+    # Renumber so that IDs follow first appearance, as GroupIndex does
+    _, first = np.unique(group_ids, return_index=True)
+    rank = np.empty(n_groups, dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(n_groups)
+    group_ids = rank[group_ids]
+    embeddings = rng.standard_normal((len(group_ids), dimension))
+    if method in POSITIVE_METHODS:
+        embeddings = np.abs(embeddings) + 0.1
+    weights = rng.random(N_CHUNKS) + 0.1 if method == "weighted_average" else None
+    return embeddings, group_ids, weights
+
+
+def _pages(embeddings, group_ids, page_rows):
+    for start in range(0, len(group_ids), page_rows):
+        yield group_ids[start:start + page_rows], embeddings[start:start + page_rows]
+
+
+def _accumulator(method, weights):
+    # Reservoirs larger than every group keep all rows, so approx_* methods are exact
+    return make_accumulator(method, weights=weights, sample_size=16)
+
+
+def _reference_method(method):
+    return method[len("approx_"):] if method.startswith("approx_") else method
+
+
+@pytest.mark.parametrize("method", STREAMING_METHODS)
+@pytest.mark.parametrize("page_rows", [1, 7, 64, 10_000])
+def test_pages_match_per_group(method, page_rows):
+    embeddings, group_ids, weights = _case(method)
+    accumulator = _accumulator(method, weights)
+
+    for page_group_ids, page in _pages(embeddings, group_ids, page_rows):
+        accumulator.update(page_group_ids, page)
+
+    expected = _per_group(embeddings, group_ids, _reference_method(method), weights)
+    rtol = 1e-6 if method.startswith("approx_") else 1e-10
+    np.testing.assert_allclose(accumulator.finalize(), expected, rtol=rtol, atol=1e-6)
+
+
+@pytest.mark.parametrize("method", STREAMING_METHODS)
+def test_state_dict_round_trip(method, tmp_path):
+    embeddings, group_ids, weights = _case(method, seed=1)
+    pages = list(_pages(embeddings, group_ids, 11))
+    uninterrupted = _accumulator(method, weights)
+    for page_group_ids, page in pages:
+        uninterrupted.update(page_group_ids, page)
+
+    accumulator = _accumulator(method, weights)
+    for page_group_ids, page in pages[:len(pages) // 2]:
+        accumulator.update(page_group_ids, page)
+    np.savez(tmp_path / "state.npz", **accumulator.state_dict())
+    with np.load(tmp_path / "state.npz") as state:
+        resumed = _accumulator(method, weights)
+        resumed.load_state_dict(dict(state))
+    for page_group_ids, page in pages[len(pages) // 2:]:
+        resumed.update(page_group_ids, page)
+
+    np.testing.assert_allclose(resumed.finalize(), uninterrupted.finalize(), rtol=1e-12)
+
+
+@pytest.mark.parametrize("method", STREAMING_METHODS)
+def test_empty_state_round_trip(method):
+    _, _, weights = _case(method)
+    resumed = _accumulator(method, weights)
+    resumed.load_state_dict(_accumulator(method, weights).state_dict())
+
+    assert resumed.finalize().shape[0] == 0
+
+
+def test_reservoir_keeps_rows_of_the_group():
+    embeddings, group_ids, _ = _case("approx_median", seed=2)
+    accumulator = make_accumulator("approx_median", sample_size=2)
+
+    for page_group_ids, page in _pages(embeddings, group_ids, 5):
+        accumulator.update(page_group_ids, page)
+
+    for group in range(group_ids.max() + 1):
+        rows = embeddings[group_ids == group].astype(np.float32)
+        sample = accumulator.samples[group][:min(len(rows), 2)]
+        assert all((rows == row).all(axis=1).any() for row in sample)
+
+
+def test_weighted_mean_rejects_extra_chunks():
+    accumulator = make_accumulator("weighted_average", weights=[1.0, 2.0])
+
+    with pytest.raises(ValueError):
+        accumulator.update(np.zeros(3, dtype=np.int64), np.ones((3, 2)))
+
+
+def test_dimension_mismatch():
+    accumulator = make_accumulator("average")
+    accumulator.update([0], np.ones((1, 3)))
+
+    with pytest.raises(ValueError):
+        accumulator.update([0], np.ones((1, 4)))